@@ -0,0 +1,47 @@
+from typing import Any
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+
+from app.core.serialization import project
+
+# Largest number of IDs accepted by one batch request
+MAX_BATCH_IDS = 1000
+
+
+def parse_ids(raw: str) -> list[int]:
+    """
+    Parse a comma separated list of IDs, e.g. "1,2,3".
+
+    - **raw**: The query parameter value
+    """
+    try:
+        ids = [int(part) for part in raw.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma separated integers")
+    if not ids:
+        raise HTTPException(status_code=400, detail="At least one id is required")
+    if len(ids) > MAX_BATCH_IDS:
+        raise HTTPException(
+            status_code=400, detail=f"At most {MAX_BATCH_IDS} ids per request"
+        )
+    return ids
+
+
+def batch_result(schema: type[BaseModel], ids: list[int], entities: list[Any]) -> dict:
+    """
+    Response body of a batch lookup, in request order.
+
+    - **schema**: The read schema of the items
+    - **ids**: The requested IDs
+    - **entities**: The entity for each ID, None when it does not exist
+    """
+    return {
+        "items": [
+            {"id": id, "found": entity is not None, "item": project(schema, entity)}
+            for id, entity in zip(ids, entities)
+        ],
+        "not_found": list(dict.fromkeys(
+            id for id, entity in zip(ids, entities) if entity is None
+        )),
+    }
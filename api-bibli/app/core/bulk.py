@@ -0,0 +1,52 @@
+import json
+from typing import Any, AsyncIterator
+
+from fastapi import Request
+
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonlines")
+
+
+class InvalidPayloadError(ValueError):
+    """Raised when a bulk request body is neither a JSON array nor NDJSON."""
+
+
+async def iter_records(request: Request) -> AsyncIterator[tuple[int, Any]]:
+    """
+    Yield (index, record) from a JSON array body or an NDJSON stream.
+
+    NDJSON bodies are parsed line by line as they arrive; a line that is not
+    valid JSON is yielded as a ValueError so it can be reported for that row.
+
+    - **request**: The incoming request
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+
+    if content_type in NDJSON_TYPES:
+        index = 0
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield index, _parse_line(line)
+                    index += 1
+        if buffer.strip():
+            yield index, _parse_line(buffer)
+        return
+
+    try:
+        payload = json.loads(await request.body())
+    except ValueError:
+        raise InvalidPayloadError("Body must be a JSON array or NDJSON")
+    if not isinstance(payload, list):
+        raise InvalidPayloadError("Body must be a JSON array or NDJSON")
+    for index, record in enumerate(payload):
+        yield index, record
+
+
+def _parse_line(line: bytes):
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return ValueError(f"Invalid JSON: {e}")
@@ -0,0 +1,130 @@
+import time
+from collections import OrderedDict
+from typing import Any
+
+
+def _normalize(value: Any):
+    value = getattr(value, "value", value)
+    if isinstance(value, str):
+        return value.strip().lower()
+    return value
+
+
+def normalize_filters(filters: dict) -> tuple:
+    """
+    Build a hashable cache key from a filter set, ignoring unset filters.
+
+    Values are kept as given (enums by value): some filters compare
+    case-sensitively (e.g. `language`), so "fr" and "FR" may count different rows.
+
+    - **filters**: Mapping of filter name to value
+    """
+    return tuple(
+        sorted(
+            (name, getattr(value, "value", value))
+            for name, value in filters.items()
+            if value not in (None, False, "")
+        )
+    )
+
+
+class CountCache:
+    """Bounded memo of exact COUNT(*) results, keyed by table and normalized filters."""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[tuple, tuple[float, int]] = OrderedDict()
+
+    def get(self, table: str, key: tuple) -> int | None:
+        entry = self._entries.get((table, key))
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if time.monotonic() - stored_at > self.ttl_seconds:
+            del self._entries[(table, key)]
+            return None
+        self._entries.move_to_end((table, key))
+        return value
+
+    def set(self, table: str, key: tuple, value: int) -> None:
+        self._entries[(table, key)] = (time.monotonic(), value)
+        self._entries.move_to_end((table, key))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, table: str) -> None:
+        for cache_key in [k for k in self._entries if k[0] == table]:
+            del self._entries[cache_key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class TableCounters:
+    """
+    Row counters per table, optionally broken down by one grouping column
+    (e.g. books per category). Used for estimated totals.
+
+    Deltas only cover the writes of this process: counters are seeded again
+    from COUNT(*) once older than `ttl_seconds`, so the writes of other
+    workers are picked up.
+    """
+
+    def __init__(self, ttl_seconds: float = 60.0):
+        self.ttl_seconds = ttl_seconds
+        self._counters: dict[str, dict] = {}
+
+    def is_seeded(self, table: str) -> bool:
+        counters = self._counters.get(table)
+        if counters is None:
+            return False
+        if time.monotonic() - counters["seeded_at"] > self.ttl_seconds:
+            del self._counters[table]
+            return False
+        return True
+
+    def seed(self, table: str, groups: dict) -> None:
+        normalized = {}
+        for group, count in groups.items():
+            normalized[_normalize(group)] = normalized.get(_normalize(group), 0) + count
+        self._counters[table] = {
+            "total": sum(normalized.values()),
+            "groups": normalized,
+            "seeded_at": time.monotonic(),
+        }
+
+    def get(self, table: str, group: Any = None) -> int | None:
+        counters = self._counters.get(table)
+        if counters is None:
+            return None
+        if group is None:
+            return counters["total"]
+        return counters["groups"].get(_normalize(group), 0)
+
+    def increment(self, table: str, group: Any = None, delta: int = 1) -> None:
+        counters = self._counters.get(table)
+        if counters is None:
+            # Not seeded yet, the next seed will include this row
+            return
+        counters["total"] += delta
+        if group is not None:
+            key = _normalize(group)
+            counters["groups"][key] = counters["groups"].get(key, 0) + delta
+
+    def move(self, table: str, old_group: Any, new_group: Any, count: int = 1) -> None:
+        """Move rows from one group to another (e.g. a book changing category)."""
+        if _normalize(old_group) == _normalize(new_group):
+            return
+        self.increment(table, old_group, -count)
+        self.increment(table, new_group, count)
+
+    def invalidate(self, table: str) -> None:
+        self._counters.pop(table, None)
+
+    def clear(self) -> None:
+        self._counters.clear()
+
+
+count_cache = CountCache()
+table_counters = TableCounters()
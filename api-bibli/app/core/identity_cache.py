@@ -0,0 +1,173 @@
+"""
+Per-model identity cache for primary key and unique key lookups.
+
+Entities are stored as snapshots of their column values, never as live ORM
+objects, so no two sessions ever share an instance. A snapshot is turned back
+into an entity detached from any session, for read-only use: entities about to
+be modified are always read from the database.
+
+The cache is process-local and only evicted by this process's writes, so it is
+off by default (LIBRARY_IDENTITY_CACHE_SIZE) and snapshots expire after
+LIBRARY_IDENTITY_CACHE_TTL seconds, which bounds how stale a read can be when
+other processes write to the same database.
+"""
+import time
+from collections import OrderedDict
+from typing import Any
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.core.config import env_int
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL_SECONDS = 30
+
+
+class ModelCache:
+    """Bounded LRU of one model's snapshots, with secondary unique key indexes."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # id -> (snapshot, unique keys of the snapshot, expiry time)
+        self._snapshots: OrderedDict[Any, tuple[dict, list[tuple], float]] = OrderedDict()
+        self._keys: dict[tuple, Any] = {}
+        # Bumped by every eviction, see IdentityCache.token
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+    def get(self, id: Any) -> dict | None:
+        entry = self._snapshots.get(id)
+        if entry is not None and entry[2] <= time.monotonic():
+            self._drop(id)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._snapshots.move_to_end(id)
+        self.hits += 1
+        return entry[0]
+
+    def get_by_key(self, key: tuple) -> dict | None:
+        id = self._keys.get(key)
+        if id is None:
+            self.misses += 1
+            return None
+        return self.get(id)
+
+    def put(self, id: Any, snapshot: dict, keys: list[tuple]) -> None:
+        self.evict(id)
+        self._snapshots[id] = (snapshot, keys, time.monotonic() + self.ttl)
+        for key in keys:
+            self._keys[key] = id
+        while len(self._snapshots) > self.max_entries:
+            self._drop(next(iter(self._snapshots)))
+
+    def evict(self, id: Any) -> None:
+        self.generation += 1
+        self._drop(id)
+
+    def _drop(self, id: Any) -> None:
+        entry = self._snapshots.pop(id, None)
+        if entry is not None:
+            for key in entry[1]:
+                self._keys.pop(key, None)
+
+
+class IdentityCache:
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl: float = DEFAULT_TTL_SECONDS):
+        # 0 disables the cache
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._models: dict[type, ModelCache] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _cache(self, model: type) -> ModelCache:
+        cache = self._models.get(model)
+        if cache is None:
+            cache = self._models[model] = ModelCache(self.max_entries, self.ttl)
+        return cache
+
+    def get(self, model: type, id: Any) -> dict | None:
+        return self._cache(model).get(id)
+
+    def get_by_key(self, model: type, names: tuple[str, ...], values: tuple) -> dict | None:
+        return self._cache(model).get_by_key(("+".join(names), *values))
+
+    def token(self, model: type) -> int:
+        """
+        Take before reading an entity from the database, and pass to `put`: a
+        write evicting in between makes the read possibly stale, so it is not stored.
+        """
+        return self._cache(model).generation
+
+    def put(
+        self,
+        entity,
+        unique_keys: tuple[tuple[str, ...], ...] = (),
+        token: int | None = None,
+    ) -> None:
+        """
+        Store a snapshot of a loaded entity (skipped if a column is not loaded).
+
+        - **entity**: The ORM entity
+        - **unique_keys**: Column tuples uniquely identifying the entity besides its ID
+        - **token**: Value of `token` taken before the entity was read
+        """
+        if not self.enabled:
+            return
+        cache = self._cache(type(entity))
+        if token is not None and token != cache.generation:
+            return
+        state = inspect(entity)
+        columns = [attr.key for attr in state.mapper.column_attrs]
+        if any(name not in state.dict for name in columns):
+            return
+        snapshot = {name: state.dict[name] for name in columns}
+        keys = [
+            ("+".join(names), *(snapshot[name] for name in names)) for names in unique_keys
+        ]
+        cache.put(snapshot["id"], snapshot, keys)
+
+    def evict(self, model: type, id: Any) -> None:
+        if model in self._models:
+            self._models[model].evict(id)
+
+    def clear(self) -> None:
+        self._models.clear()
+
+    def stats(self) -> dict[str, dict]:
+        return {
+            model.__tablename__: {
+                "hits": cache.hits,
+                "misses": cache.misses,
+                "size": len(cache),
+            }
+            for model, cache in self._models.items()
+        }
+
+
+def to_entity(model: type, snapshot: dict):
+    """
+    Build a read-only entity, detached from any session, from a snapshot.
+
+    - **model**: The ORM model
+    - **snapshot**: Column values stored by the cache
+    """
+    entity = model(**snapshot)
+    make_transient_to_detached(entity)
+    return entity
+
+
+identity_cache = IdentityCache(
+    env_int("LIBRARY_IDENTITY_CACHE_SIZE", 0),
+    env_int("LIBRARY_IDENTITY_CACHE_TTL", DEFAULT_TTL_SECONDS),
+)
@@ -0,0 +1,27 @@
+from datetime import datetime
+
+# Longest range of the monthly report (10 years)
+MAX_REPORT_MONTHS = 120
+
+
+def add_months(date: datetime, months: int) -> datetime:
+    """First day of the month `months` after the month of `date`."""
+    index = date.year * 12 + date.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def month_range(start: str, end: str) -> list[str]:
+    """
+    Every "YYYY-MM" month from start to end, both included.
+
+    - **start**: First month, "YYYY-MM"
+    - **end**: Last month, "YYYY-MM"
+    """
+    first = datetime.strptime(start, "%Y-%m")
+    last = datetime.strptime(end, "%Y-%m")
+    count = (last.year - first.year) * 12 + last.month - first.month + 1
+    if count < 1:
+        raise ValueError("The end month is before the start month")
+    if count > MAX_REPORT_MONTHS:
+        raise ValueError(f"A report covers at most {MAX_REPORT_MONTHS} months")
+    return [add_months(first, i).strftime("%Y-%m") for i in range(count)]
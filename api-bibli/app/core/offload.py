@@ -0,0 +1,86 @@
+"""
+Process pool for CPU-bound report work.
+
+Rolling up report rows or encoding large exports holds the event loop (and
+the GIL) for as long as it runs, so every other request of the worker waits.
+`report_pool.run` runs such a function in a worker process instead, when its
+input is large enough to be worth pickling; small inputs run inline.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Any, Callable
+
+from app.core.config import ReportPoolSettings
+
+logger = logging.getLogger(__name__)
+
+
+class ReportPool:
+    """
+    Lazily started process pool.
+
+    - **processes**: Worker processes, 0 runs everything inline
+    - **min_rows**: Smallest input (in rows) sent to a worker
+    """
+
+    def __init__(self, processes: int, min_rows: int):
+        self.processes = processes
+        self.min_rows = min_rows
+        self._executor: ProcessPoolExecutor | None = None
+
+    @classmethod
+    def from_settings(cls, settings: ReportPoolSettings) -> "ReportPool":
+        return cls(settings.processes, settings.min_rows)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Spawned, not forked: the parent runs an event loop and driver threads
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.processes, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def start(self) -> None:
+        """Start the worker processes now rather than on the first large report."""
+        if self.processes <= 0:
+            return
+        executor = self._get_executor()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            *(loop.run_in_executor(executor, os.getpid) for _ in range(self.processes))
+        )
+
+    async def run(self, func: Callable, *args: Any, rows: int) -> Any:
+        """
+        Call `func(*args)` in a worker process, or inline for small inputs.
+
+        `func` must be a module level function; its arguments and result are pickled.
+
+        - **func**: The function
+        - **args**: Its arguments
+        - **rows**: Size of the input, compared to `min_rows`
+        """
+        if self.processes <= 0 or rows < self.min_rows:
+            return func(*args)
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._get_executor(), partial(func, *args))
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory): start a new pool next time
+            logger.exception("Report worker process died, running inline")
+            self._executor = None
+            return func(*args)
+
+    def shutdown(self) -> None:
+        """Stop the worker processes, if started."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+report_pool = ReportPool.from_settings(ReportPoolSettings.from_env())
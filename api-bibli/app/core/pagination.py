@@ -0,0 +1,86 @@
+import base64
+import binascii
+import datetime
+import json
+from typing import Any
+
+from sqlalchemy import tuple_
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded or does not match the query."""
+
+
+def _dump_value(value: Any):
+    if isinstance(value, datetime.datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {"d": value.isoformat()}
+    return value
+
+
+def _load_value(value: Any):
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return datetime.date.fromisoformat(value["d"])
+    return value
+
+
+def encode_cursor(sort_by: str, order: str, sort_value: Any, id: int) -> str:
+    """
+    Build an opaque cursor pointing right after the given row.
+
+    - **sort_by**: Name of the sort column
+    - **order**: Sort order (asc or desc)
+    - **sort_value**: Value of the sort column for the last row of the page
+    - **id**: ID of the last row of the page, used as tiebreaker
+    """
+    payload = {"s": sort_by, "o": order, "v": _dump_value(sort_value), "id": id}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_by: str, order: str) -> tuple[Any, int]:
+    """
+    Decode a cursor produced by `encode_cursor` and return (sort_value, id).
+
+    - **cursor**: The opaque cursor
+    - **sort_by**: Sort column expected by the current query
+    - **order**: Sort order expected by the current query
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        sort_value, last_id = _load_value(payload["v"]), int(payload["id"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise InvalidCursorError("Invalid cursor")
+
+    if payload.get("s") != sort_by or payload.get("o") != order:
+        raise InvalidCursorError("Cursor does not match the requested sort order")
+    return sort_value, last_id
+
+
+def apply_keyset(statement, sort_column, id_column, order: str, cursor_values=None):
+    """
+    Order a statement by (sort_column, id_column) and seek past the cursor position.
+
+    - **statement**: The select statement to paginate
+    - **sort_column**: The column used for sorting
+    - **id_column**: The primary key column used as tiebreaker
+    - **order**: Sort order (asc or desc)
+    - **cursor_values**: (sort_value, id) decoded from the cursor, or None for the first page
+    """
+    if cursor_values is not None:
+        sort_value, last_id = cursor_values
+        row = tuple_(sort_column, id_column)
+        position = tuple_(sort_value, last_id)
+        if order == "desc":
+            statement = statement.where(row < position)
+        else:
+            statement = statement.where(row > position)
+
+    if order == "desc":
+        return statement.order_by(sort_column.desc(), id_column.desc())
+    return statement.order_by(sort_column, id_column)
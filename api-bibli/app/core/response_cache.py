@@ -0,0 +1,285 @@
+"""
+HTTP response cache with conditional requests for catalogue reads.
+
+GET responses under the configured path prefixes are stored per path and
+normalized query string, with the route's headers and its ETag and
+Last-Modified validators (the latter on single entities only). A request
+whose If-None-Match / If-Modified-Since matches gets a 304 without a body. Every namespace (table) has a generation number that is part of the
+cache key; writes bump it, which drops every cached response of that table at
+once, in process or in a shared Redis.
+"""
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from urllib.parse import parse_qsl, urlencode
+
+from fastapi import Request, Response
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.core.config import ResponseCacheSettings
+
+
+class MemoryCacheBackend:
+    """In-process LRU with a TTL per entry."""
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._generations: dict[str, int] = {}
+
+    async def get(self, key: str) -> dict | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if time.monotonic() > expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: dict, ttl: int) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def generation(self, namespace: str) -> int:
+        return self._generations.get(namespace, 0)
+
+    async def bump(self, namespace: str) -> None:
+        self._generations[namespace] = self._generations.get(namespace, 0) + 1
+        # Entries of older generations can never be read again
+        prefix = f"{namespace}:"
+        for key in [k for k in self._entries if k.startswith(prefix)]:
+            del self._entries[key]
+
+    async def clear(self) -> None:
+        self._entries.clear()
+        self._generations.clear()
+
+
+class RedisCacheBackend:
+    """Cache shared by every worker, stored in Redis (requires the redis package)."""
+
+    def __init__(self, url: str, prefix: str = "library:http:"):
+        try:
+            from redis import asyncio as redis
+        except ImportError as e:
+            raise RuntimeError(
+                "LIBRARY_RESPONSE_CACHE_URL requires the 'redis' package"
+            ) from e
+        self._redis = redis.from_url(url)
+        self.prefix = prefix
+
+    async def get(self, key: str) -> dict | None:
+        raw = await self._redis.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: dict, ttl: int) -> None:
+        await self._redis.set(self.prefix + key, json.dumps(value), ex=ttl)
+
+    async def generation(self, namespace: str) -> int:
+        value = await self._redis.get(f"{self.prefix}generation:{namespace}")
+        return int(value) if value is not None else 0
+
+    async def bump(self, namespace: str) -> None:
+        # Old entries are left to expire with their TTL
+        await self._redis.incr(f"{self.prefix}generation:{namespace}")
+
+    async def clear(self) -> None:
+        async for key in self._redis.scan_iter(f"{self.prefix}*"):
+            await self._redis.delete(key)
+
+
+class ResponseCache:
+    def __init__(self, settings: ResponseCacheSettings):
+        self.ttl_seconds = settings.ttl_seconds
+        self._settings = settings
+        self._backend = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def backend(self):
+        # Created on first use, so importing the app never needs Redis
+        if self._backend is None:
+            if self._settings.url:
+                self._backend = RedisCacheBackend(self._settings.url)
+            else:
+                self._backend = MemoryCacheBackend(self._settings.max_entries)
+        return self._backend
+
+    async def key(self, namespace: str, request: Request) -> str:
+        query = urlencode(sorted(parse_qsl(request.url.query, keep_blank_values=True)))
+        generation = await self.backend.generation(namespace)
+        return f"{namespace}:{generation}:{request.url.path}?{query}"
+
+    async def get(self, key: str) -> dict | None:
+        entry = await self.backend.get(key)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    async def set(self, key: str, entry: dict) -> None:
+        await self.backend.set(key, entry, self.ttl_seconds)
+
+    async def invalidate(self, *namespaces: str) -> None:
+        """
+        Drop every cached response of the given tables.
+
+        - **namespaces**: Table names
+        """
+        for namespace in namespaces:
+            await self.backend.bump(namespace)
+
+    async def clear(self) -> None:
+        await self.backend.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+response_cache = ResponseCache(ResponseCacheSettings.from_env())
+
+
+def entity_etag(namespace: str, entity, *extra) -> str:
+    """Strong ETag of one entity, from its row version and representation metadata."""
+    etag = f"{namespace}-{entity.id}-v{getattr(entity, 'version', None)}"
+    if extra:
+        etag += "-" + hashlib.sha1(repr(extra).encode()).hexdigest()[:12]
+    return f'"{etag}"'
+
+
+def collection_etag(namespace: str, entities, *extra) -> str:
+    """Strong ETag of a page, from the (id, version) of its items and page metadata."""
+    digest = hashlib.sha1(namespace.encode())
+    for entity in entities:
+        digest.update(f"{entity.id}:{getattr(entity, 'version', None)};".encode())
+    digest.update(repr(extra).encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def last_modified(entities) -> str | None:
+    """
+    HTTP date of the most recent `updated_at` among the entities, if any.
+
+    For single entities only: deleting an item of a page does not raise the
+    date of the remaining ones, so collections are validated by ETag alone.
+    """
+    dates = [
+        value
+        for value in (getattr(entity, "updated_at", None) for entity in entities)
+        if isinstance(value, datetime)
+    ]
+    if not dates:
+        return None
+    newest = max(dates).astimezone(timezone.utc)
+    return format_datetime(newest.replace(microsecond=0), usegmt=True)
+
+
+def set_validators(response: Response, etag: str, modified: str | None = None) -> None:
+    """Attach ETag and Last-Modified headers to a route response."""
+    response.headers["ETag"] = etag
+    if modified:
+        response.headers["Last-Modified"] = modified
+
+
+def _not_modified(request: Request, entry: dict) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {tag.strip() for tag in if_none_match.split(",")}
+        return "*" in tags or entry["etag"] in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and entry.get("last_modified"):
+        try:
+            return parsedate_to_datetime(entry["last_modified"]) <= parsedate_to_datetime(
+                if_modified_since
+            )
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+# Recomputed for each replay, or set by the middleware itself
+_REBUILT_HEADERS = {
+    "content-length", "content-type", "etag", "last-modified", "cache-control", "x-cache"
+}
+
+
+class ResponseCacheMiddleware(BaseHTTPMiddleware):
+    """
+    Serve cached GET responses for the configured path prefixes.
+
+    Register it before CORSMiddleware (so that CORS wraps it): hits never reach
+    the inner layers, whose headers would otherwise be missing.
+
+    - **prefixes**: Mapping of path prefix to namespace (the table invalidating it)
+    - **cache**: The response cache
+    """
+
+    def __init__(self, app, prefixes: dict[str, str], cache: ResponseCache = response_cache):
+        super().__init__(app)
+        self.prefixes = prefixes
+        self.cache = cache
+
+    def _namespace(self, path: str) -> str | None:
+        for prefix, namespace in self.prefixes.items():
+            if path == prefix or path.startswith(prefix + "/"):
+                return namespace
+        return None
+
+    async def dispatch(self, request: Request, call_next):
+        namespace = self._namespace(request.url.path)
+        if request.method != "GET" or namespace is None:
+            return await call_next(request)
+
+        # The key holds the generation read before the route runs, so a write
+        # committed meanwhile makes this entry unreachable
+        key = await self.cache.key(namespace, request)
+        entry = await self.cache.get(key)
+        status = "HIT"
+        route_headers = entry["headers"] if entry is not None else []
+        if entry is None:
+            status = "MISS"
+            response = await call_next(request)
+            if response.status_code != 200:
+                return response
+            body = b"".join([chunk async for chunk in response.body_iterator])
+            route_headers = [
+                [name, value]
+                for name, value in response.headers.items()
+                if name not in _REBUILT_HEADERS
+            ]
+            etag = response.headers.get("etag") or (
+                f'"{hashlib.sha1(body).hexdigest()}"'
+            )
+            entry = {
+                # latin-1 maps bytes to text one to one (entries must be JSON for Redis)
+                "body": body.decode("latin-1"),
+                "media_type": response.headers.get("content-type"),
+                "etag": etag,
+                "last_modified": response.headers.get("last-modified"),
+                # Cookies belong to the client of this request only
+                "headers": [
+                    header for header in route_headers if header[0] != "set-cookie"
+                ],
+            }
+            await self.cache.set(key, entry)
+
+        headers = {"ETag": entry["etag"], "Cache-Control": "no-cache", "X-Cache": status}
+        if entry.get("last_modified"):
+            headers["Last-Modified"] = entry["last_modified"]
+        if _not_modified(request, entry):
+            response = Response(status_code=304, headers=headers)
+        else:
+            response = Response(
+                entry["body"].encode("latin-1"), media_type=entry["media_type"], headers=headers
+            )
+        for name, value in route_headers:
+            response.headers.append(name, value)
+        return response
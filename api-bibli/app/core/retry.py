@@ -0,0 +1,51 @@
+import asyncio
+import random
+from typing import Awaitable, Callable, TypeVar
+
+from sqlalchemy.exc import OperationalError
+
+T = TypeVar("T")
+
+LOCK_ERRORS = ("database is locked", "database table is locked", "deadlock detected")
+
+
+class DatabaseBusyError(Exception):
+    """Raised when a transaction still hits a lock after every retry."""
+
+
+def is_lock_error(error: OperationalError) -> bool:
+    """Whether an OperationalError is a transient lock conflict worth retrying."""
+    message = str(error.orig if error.orig is not None else error).lower()
+    return any(text in message for text in LOCK_ERRORS)
+
+
+async def retry_on_lock(
+    session,
+    operation: Callable[[], Awaitable[T]],
+    attempts: int = 6,
+    base_delay: float = 0.01,
+    max_delay: float = 0.5,
+) -> T:
+    """
+    Run a transaction, rolling back and retrying it when the database is locked.
+
+    Delays grow exponentially with full jitter, so concurrent writers that
+    collided do not retry in lockstep.
+
+    - **session**: The session the operation runs its transaction on
+    - **operation**: Coroutine function doing the whole transaction, commit included
+    - **attempts**: Maximum number of tries
+    - **base_delay**: Delay before the first retry, in seconds
+    - **max_delay**: Upper bound of a single delay, in seconds
+    """
+    for attempt in range(attempts):
+        try:
+            return await operation()
+        except OperationalError as e:
+            await session.rollback()
+            if not is_lock_error(e):
+                raise
+            if attempt == attempts - 1:
+                raise DatabaseBusyError("Database is busy, please retry") from e
+        delay = min(max_delay, base_delay * 2 ** attempt)
+        await asyncio.sleep(random.uniform(0, delay))
@@ -0,0 +1,127 @@
+"""
+Fast JSON responses for rows read from the database.
+
+Read routes declare a `response_model` for the documentation, but FastAPI would
+validate every returned row against it again before serializing it. Rows read
+from our own tables already satisfy the read schemas, so those routes project
+them straight to dicts of the schema's fields and serialize them once with
+orjson (or pydantic-core when orjson is not installed), skipping validation.
+"""
+from functools import lru_cache
+from typing import Any
+
+from fastapi import HTTPException, Response
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import BaseModel, TypeAdapter, create_model
+from pydantic_core import to_json
+
+from app.core.config import env_bool
+
+try:
+    import orjson
+except ImportError:  # optional, pydantic-core serializes the same content
+    orjson = None
+
+# Response class of the whole app
+DefaultResponse = ORJSONResponse if orjson is not None else JSONResponse
+
+# Validate trusted content against its schema anyway (LIBRARY_VALIDATE_RESPONSES),
+# to catch a projection drifting from its schema in development
+VALIDATE_RESPONSES = env_bool("LIBRARY_VALIDATE_RESPONSES", False)
+
+
+@lru_cache(maxsize=None)
+def adapter(schema: Any) -> TypeAdapter:
+    """TypeAdapter of a schema, built once (building one compiles its validator)."""
+    return TypeAdapter(schema)
+
+
+@lru_cache(maxsize=None)
+def _fields(schema: type[BaseModel]) -> tuple[tuple[str, Any], ...]:
+    return tuple(
+        (name, None if field.is_required() else field.get_default(call_default_factory=True))
+        for name, field in schema.model_fields.items()
+    )
+
+
+def select_fields(
+    schema: type[BaseModel], raw: str | None, deferred: tuple[str, ...] = ()
+) -> tuple[str, ...]:
+    """
+    Fields of a schema selected by a `fields=` query parameter, in schema order.
+    The ID is always selected.
+
+    - **schema**: The read schema
+    - **raw**: Comma separated field names or "*" for all, None selects all but `deferred`
+    - **deferred**: Heavy fields left out unless requested
+    """
+    names = list(schema.model_fields)
+    if raw is None:
+        requested = set(names) - set(deferred)
+    elif raw.strip() == "*":
+        requested = set(names)
+    else:
+        requested = {part.strip() for part in raw.split(",") if part.strip()}
+        unknown = requested - set(names)
+        if unknown:
+            raise HTTPException(
+                status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}"
+            )
+    requested.add("id")
+    return tuple(name for name in names if name in requested)
+
+
+@lru_cache(maxsize=256)
+def trimmed_schema(schema: type[BaseModel], fields: tuple[str, ...]) -> type[BaseModel]:
+    """
+    Schema with only some fields of `schema` (the schema itself when all are kept).
+
+    - **schema**: The read schema
+    - **fields**: Fields returned by `select_fields`
+    """
+    if fields == tuple(schema.model_fields):
+        return schema
+    definitions = {name: schema.model_fields[name] for name in fields}
+    return create_model(
+        f"{schema.__name__}Fields",
+        **{name: (field.annotation, field) for name, field in definitions.items()},
+    )
+
+
+def project(schema: type[BaseModel], entity) -> dict | None:
+    """
+    Dict of the schema's fields read from an entity, without validation.
+
+    - **schema**: The read schema, e.g. BookRead
+    - **entity**: ORM row (or any object with those attributes), None passes through
+    """
+    if entity is None:
+        return None
+    return {name: getattr(entity, name, default) for name, default in _fields(schema)}
+
+
+def render(content: Any) -> bytes:
+    """Serialize projected content to JSON."""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return to_json(content)
+
+
+def trusted_response(schema: Any, content: Any, response: Response | None = None) -> Response:
+    """
+    JSON response of projected content, bypassing `response_model` validation.
+
+    - **schema**: Type the content follows, e.g. PaginatedResponse[BookRead]
+    - **content**: Content built with `project`
+    - **response**: The route's injected response, whose headers are kept
+    """
+    if VALIDATE_RESPONSES:
+        adapter(schema).validate_python(content)
+    result = Response(render(content), media_type="application/json")
+    if response is not None:
+        result.headers.raw.extend(
+            (name, value)
+            for name, value in response.headers.raw
+            if name not in (b"content-length", b"content-type")
+        )
+    return result
@@ -0,0 +1,80 @@
+from dataclasses import replace
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from app.core.config import DatabaseSettings
+
+
+def _is_memory_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def build_engine(settings: DatabaseSettings, read_only: bool = False) -> AsyncEngine:
+    """
+    Create the async engine described by the settings.
+
+    SQLite connections get the configured pragmas (WAL, synchronous, busy
+    timeout, mmap) when they are opened; other backends get a sized pool whose
+    connections are pinged before use and recycled periodically.
+
+    - **settings**: The database settings
+    - **read_only**: Make every connection refuse writes
+    """
+    url = make_url(settings.url)
+    options = {"echo": settings.echo}
+    if not _is_memory_sqlite(url):
+        # In-memory SQLite keeps its single static connection
+        options.update(
+            pool_size=settings.pool_size,
+            max_overflow=settings.max_overflow,
+            pool_recycle=settings.pool_recycle,
+            pool_timeout=settings.pool_timeout,
+        )
+    if url.get_backend_name() != "sqlite":
+        options["pool_pre_ping"] = True
+        if read_only and url.get_backend_name() == "postgresql":
+            options["connect_args"] = {
+                "server_settings": {"default_transaction_read_only": "on"}
+            }
+
+    engine = create_async_engine(url, **options)
+
+    if url.get_backend_name() == "sqlite" and (settings.sqlite_pragmas or read_only):
+        pragmas = dict(settings.sqlite_pragmas)
+        if read_only:
+            pragmas["query_only"] = "ON"
+        if _is_memory_sqlite(url):
+            # No journal file or mapping for an in-memory database
+            pragmas.pop("journal_mode", None)
+            pragmas.pop("mmap_size", None)
+
+        @event.listens_for(engine.sync_engine, "connect")
+        def apply_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+            cursor.close()
+
+    return engine
+
+
+def build_read_engine(settings: DatabaseSettings, primary: AsyncEngine) -> AsyncEngine:
+    """
+    Create the engine used by read-only sessions.
+
+    Reads get their own connection pool, so they never wait behind writers for
+    a connection: on the replica when `read_url` is set, otherwise on the
+    primary database (in WAL mode SQLite readers do not block the writer).
+    An in-memory SQLite database only exists on its own connection, so the
+    primary engine is shared in that case.
+
+    - **settings**: The database settings
+    - **primary**: The engine used for writes
+    """
+    if settings.read_url:
+        return build_engine(replace(settings, url=settings.read_url), read_only=True)
+    if _is_memory_sqlite(make_url(settings.url)):
+        return primary
+    return build_engine(settings, read_only=True)
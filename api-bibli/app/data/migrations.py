@@ -0,0 +1,74 @@
+"""
+Upgrade of databases created by an older version of the schema.
+
+`Base.metadata.create_all` creates the missing tables but never alters the
+existing ones, so columns and indexes added to the ORM since a database was
+created would be missing (e.g. "no such column: books.version").
+`upgrade_schema` runs right after it at startup and adds them, then fills
+the search indexes that `create_all` created empty; it is idempotent, a
+database that is up to date is left untouched.
+"""
+from sqlalchemy import Column, bindparam, inspect, text
+from sqlalchemy.engine import Connection
+
+from app.data.orm import Base
+from app.data.search import sync_search_index
+
+
+def _column_ddl(column: Column, connection: Connection) -> str:
+    dialect = connection.dialect
+    ddl = (
+        f"{dialect.identifier_preparer.format_column(column)} "
+        f"{column.type.compile(dialect=dialect)}"
+    )
+    if column.server_default is not None:
+        compiler = dialect.ddl_compiler(dialect, None)
+        ddl += f" DEFAULT {compiler.get_column_default_string(column)}"
+        if not column.nullable:
+            # NOT NULL needs a default for the existing rows
+            ddl += " NOT NULL"
+    return ddl
+
+
+def upgrade_schema(connection: Connection) -> dict[str, list[str]]:
+    """
+    Add the columns and indexes of the ORM tables missing from the database.
+
+    New columns are nullable unless they have a server default; existing rows
+    get the column's scalar default (if any), otherwise NULL. The SQLite FTS
+    indexes missing rows are rebuilt.
+    Runs on a sync connection, e.g. `await conn.run_sync(upgrade_schema)`.
+
+    - **connection**: The connection, in a transaction
+
+    Returns the added columns by table.
+    """
+    preparer = connection.dialect.identifier_preparer
+    inspector = inspect(connection)
+    added: dict[str, list[str]] = {}
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            table_name = preparer.format_table(table)
+            column_name = preparer.format_column(column)
+            connection.exec_driver_sql(
+                f"ALTER TABLE {table_name} ADD COLUMN {_column_ddl(column, connection)}"
+            )
+            if column.default is not None and column.default.is_scalar:
+                # Plain UPDATE: no onupdate column (version, updated_at) is bumped
+                connection.execute(
+                    text(
+                        f"UPDATE {table_name} SET {column_name} = :value "
+                        f"WHERE {column_name} IS NULL"
+                    ).bindparams(bindparam("value", column.default.arg, type_=column.type))
+                )
+            added.setdefault(table.name, []).append(column.name)
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+    # Before any update or delete trigger runs on rows the index never saw
+    sync_search_index(connection)
+    return added
@@ -64,6 +64,14 @@ class LoanStatus(str, Enum):
     OVERDUE = "Overdue"
 
 
+# Background job status
+class JobStatus(str, Enum):
+    PENDING = "Pending"
+    RUNNING = "Running"
+    SUCCEEDED = "Succeeded"
+    FAILED = "Failed"
+
+
 class Loan(BaseModel):
     id: int
     book_id: int
@@ -88,5 +96,8 @@ class LoanHistory(BaseModel):
     id: int
     book_id: int
     total_loans: int = 0
+    returned_loans: int = 0
+    times_late: int = 0
     average_duration_days: float = 0.0
     popularity_score: int = 0
+    popularity_rank: int | None = None
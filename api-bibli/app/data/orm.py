@@ -9,23 +9,49 @@ from sqlalchemy import (
     Text,
     Enum as SqEnum,
     Boolean,
+    Index,
+    literal_column,
 )
 from sqlalchemy.orm import declarative_base, sessionmaker, relationship
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from app.data.models import BookCategory, LoanStatus
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import DatabaseSettings
+from app.data.engine import build_engine, build_read_engine
+from app.data.models import BookCategory, JobStatus, LoanStatus
+from app.data.search import register_search_index
 
+from datetime import datetime
 from typing import Annotated
 from fastapi import Depends
 
-DATABASE_URL = "sqlite+aiosqlite:///./library.db"
+settings = DatabaseSettings.from_env()
+DATABASE_URL = settings.url
 
-engine = create_async_engine(DATABASE_URL, echo=False)
+engine = build_engine(settings)
+read_engine = build_read_engine(settings, engine)
 
 AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+AsyncReadSessionLocal = sessionmaker(
+    read_engine, class_=AsyncSession, expire_on_commit=False
+)
 
 Base = declarative_base()
 
 
+def version_column():
+    """Row version, bumped by every UPDATE (ORM or Core); used for HTTP ETags."""
+    return Column(
+        Integer,
+        nullable=False,
+        default=1,
+        server_default="1",
+        onupdate=literal_column("version") + 1,
+    )
+
+
+def updated_at_column():
+    return Column(DateTime, nullable=True, default=datetime.now, onupdate=datetime.now)
+
+
 class Author(Base):
     __tablename__ = "authors"
 
@@ -37,10 +63,22 @@ class Author(Base):
     nationality = Column(String, nullable=False)
     biography = Column(Text, nullable=True)
     website = Column(String, nullable=True)
+    version = version_column()
+    updated_at = updated_at_column()
 
     # Relationships
     books = relationship("Book", back_populates="author")
 
+    # Fetch the new version with RETURNING instead of expiring it
+    __mapper_args__ = {"eager_defaults": True}
+
+    __table_args__ = (
+        # get_by_fullname and sorting by last name
+        Index("ix_authors_full_name", "last_name", "first_name"),
+        Index("ix_authors_first_name", "first_name"),
+        Index("ix_authors_nationality", "nationality", "last_name"),
+    )
+
 
 class Book(Base):
     __tablename__ = "books"
@@ -57,12 +95,28 @@ class Book(Base):
     language = Column(String, nullable=False)
     pages = Column(Integer, nullable=False)
     publisher = Column(String, nullable=False)
+    # When the book entered the catalogue (monthly "new books")
+    created_at = Column(DateTime, nullable=True, default=datetime.now)
+    version = version_column()
+    updated_at = updated_at_column()
 
     # Relationships
     author = relationship("Author", back_populates="books")
     loans = relationship("Loan", back_populates="book")
     history = relationship("LoanHistory", back_populates="book", uselist=False)
 
+    # Fetch the new version with RETURNING instead of expiring it
+    __mapper_args__ = {"eager_defaults": True}
+
+    __table_args__ = (
+        Index("ix_books_title", "title"),
+        Index("ix_books_year", "year"),
+        Index("ix_books_author_id", "author_id"),
+        Index("ix_books_category", "category", "title"),
+        Index("ix_books_language", "language", "title"),
+        Index("ix_books_created_at", "created_at"),
+    )
+
 
 class Loan(Base):
     __tablename__ = "loans"
@@ -82,6 +136,23 @@ class Loan(Base):
     # Relationships
     book = relationship("Book", back_populates="loans")
 
+    __table_args__ = (
+        # Default listing order (most recent first) and keyset pagination
+        Index("ix_loans_loan_date", "loan_date"),
+        Index("ix_loans_book_id", "book_id", "loan_date"),
+        Index("ix_loans_status", "status", "loan_date"),
+        # Loan limit check on checkout
+        Index("ix_loans_borrower_status", "borrower_mail", "status"),
+        Index("ix_loans_return_date", "return_date"),
+        # Active loans only: overdue detection and late loan counts
+        Index(
+            "ix_loans_active_due_date",
+            "due_date",
+            sqlite_where=return_date.is_(None),
+            postgresql_where=return_date.is_(None),
+        ),
+    )
+
 
 class LoanHistory(Base):
     __tablename__ = "loan_histories"
@@ -89,12 +160,68 @@ class LoanHistory(Base):
     id = Column(Integer, primary_key=True, index=True)
     book_id = Column(Integer, ForeignKey("books.id"), unique=True, nullable=False)
     total_loans = Column(Integer, default=0)
+    returned_loans = Column(Integer, default=0)
+    times_late = Column(Integer, default=0)
     average_duration_days = Column(Float, default=0.0)
     popularity_score = Column(Integer, default=0)
+    popularity_rank = Column(Integer, nullable=True)
 
     # Relationships
     book = relationship("Book", back_populates="history")
 
+    __table_args__ = (Index("ix_loan_histories_popularity", "popularity_score"),)
+
+
+class BorrowerActivity(Base):
+    """Per-borrower loan counters, maintained on checkouts and returns when enabled."""
+
+    __tablename__ = "borrower_activity"
+
+    borrower_mail = Column(String, primary_key=True)
+    borrower_name = Column(String, nullable=False)
+    total_loans = Column(Integer, default=0, nullable=False)
+    current_loans = Column(Integer, default=0, nullable=False)
+    late_returns = Column(Integer, default=0, nullable=False)
+
+
+class LibraryStats(Base):
+    """Single-row snapshot of the global counters, maintained on every write."""
+
+    __tablename__ = "library_stats"
+
+    id = Column(Integer, primary_key=True)
+    total_books = Column(Integer, default=0, nullable=False)
+    total_copies = Column(Integer, default=0, nullable=False)
+    available_copies = Column(Integer, default=0, nullable=False)
+    total_authors = Column(Integer, default=0, nullable=False)
+    total_loans = Column(Integer, default=0, nullable=False)
+    active_loans = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, nullable=True)
+
+
+class Job(Base):
+    """Report or export run in the background, result written to a file."""
+
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)
+    params = Column(Text, nullable=False, default="{}")
+    status = Column(SqEnum(JobStatus), nullable=False, default=JobStatus.PENDING)
+    rows_done = Column(Integer, nullable=False, default=0)
+    rows_total = Column(Integer, nullable=True)
+    result_name = Column(String, nullable=False)
+    result_path = Column(String, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.now)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (Index("ix_jobs_status", "status"),)
+
+
+register_search_index(Base.metadata)
+
 
 def init_db():
     """Creates the database tables."""
@@ -106,4 +233,11 @@ async def get_db():
         yield session
 
 
+async def get_read_db():
+    """Session on the read-only engine, for endpoints that never write."""
+    async with AsyncReadSessionLocal() as session:
+        yield session
+
+
 SessionDep = Annotated[AsyncSession, Depends(get_db)]
+ReadSessionDep = Annotated[AsyncSession, Depends(get_read_db)]
@@ -0,0 +1,142 @@
+"""
+Full-text search index (SQLite FTS5) for books and authors.
+
+The FTS tables are external-content tables: they only store the index and read
+the text back from `books` / `authors`. Triggers keep them in sync with the ORM
+tables. Indexes missing rows are rebuilt at startup by `upgrade_schema`; rebuild
+them by hand with:
+
+    python -m app.data.search --rebuild
+"""
+import argparse
+import asyncio
+import re
+
+from sqlalchemy import DDL, column, event, inspect, table, text
+
+# Indexed columns per source table
+SEARCH_INDEXES = {
+    "books": ("title", "description"),
+    "authors": ("first_name", "last_name", "biography", "website"),
+}
+
+books_fts = table("books_fts", column("rowid"), column("rank"), column("books_fts"))
+authors_fts = table(
+    "authors_fts", column("rowid"), column("rank"), column("authors_fts")
+)
+
+
+def _index_ddl(source: str, columns: tuple[str, ...]) -> list[str]:
+    fts = f"{source}_fts"
+    cols = ", ".join(columns)
+    new_values = ", ".join(f"new.{c}" for c in columns)
+    old_values = ", ".join(f"old.{c}" for c in columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{cols}, content='{source}', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {source} BEGIN "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {source} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) "
+        f"VALUES ('delete', old.id, {old_values}); END",
+        # Only re-index when an indexed column changes (not on copy counts etc.)
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {source} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) "
+        f"VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_values}); END",
+    ]
+
+
+def register_search_index(metadata) -> None:
+    """
+    Create the FTS tables and their triggers whenever `metadata.create_all` runs on SQLite.
+
+    - **metadata**: The SQLAlchemy metadata holding the `books` and `authors` tables
+    """
+    for source, columns in SEARCH_INDEXES.items():
+        for statement in _index_ddl(source, columns):
+            event.listen(
+                metadata, "after_create", DDL(statement).execute_if(dialect="sqlite")
+            )
+
+
+def build_match_query(term: str) -> str | None:
+    """
+    Turn a free-text search term into an FTS5 query matching every word as a prefix.
+
+    - **term**: The user search term
+    """
+    tokens = re.findall(r"\w+", term)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def supports_fts(session) -> bool:
+    """Whether the session is bound to a SQLite database (the only backend with FTS5 here)."""
+    return session.get_bind().dialect.name == "sqlite"
+
+
+def rebuild_search_index(connection) -> None:
+    """
+    Rebuild every FTS index from its source table.
+
+    - **connection**: A synchronous SQLAlchemy connection
+    """
+    for source in SEARCH_INDEXES:
+        fts = f"{source}_fts"
+        connection.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+        connection.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('optimize')"))
+
+
+def sync_search_index(connection) -> list[str]:
+    """
+    Rebuild the FTS indexes that do not cover every row of their source table.
+
+    `create_all` creates the FTS tables empty on a database that already has
+    books and authors; until rebuilt, searches miss those rows and the update
+    and delete triggers remove entries that were never indexed, which corrupts
+    the index. The rows indexed are counted in the `<fts>_docsize` shadow table.
+    Does nothing on other backends or before `create_all`.
+
+    - **connection**: A synchronous SQLAlchemy connection
+
+    Returns the rebuilt indexes.
+    """
+    if connection.dialect.name != "sqlite":
+        return []
+    inspector = inspect(connection)
+    rebuilt = []
+    for source in SEARCH_INDEXES:
+        fts = f"{source}_fts"
+        if not inspector.has_table(fts):
+            continue
+        indexed = connection.execute(text(f"SELECT count(*) FROM {fts}_docsize")).scalar()
+        rows = connection.execute(text(f"SELECT count(*) FROM {source}")).scalar()
+        if indexed != rows:
+            connection.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+            rebuilt.append(fts)
+    return rebuilt
+
+
+async def _rebuild():
+    from app.data.orm import Base, engine
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(rebuild_search_index)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the full-text search index")
+    parser.add_argument(
+        "--rebuild", action="store_true", help="Rebuild the index from the tables"
+    )
+    args = parser.parse_args()
+    if args.rebuild:
+        asyncio.run(_rebuild())
+        print("Search index rebuilt")
+    else:
+        parser.print_help()
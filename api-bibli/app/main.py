@@ -1,4 +1,5 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -8,7 +9,19 @@ from starlette.exceptions import HTTPException as StarletteHTTPException
 from app.routers.author_router import router as author_router
 from app.routers.book_router import router as book_router
 from app.routers.loan_router import router as loan_router
-from app.data.orm import engine, Base
+from app.routers.stats_router import router as stats_router
+from app.routers.job_router import router as job_router
+from app.data.orm import engine, Base, AsyncSessionLocal, AsyncReadSessionLocal
+from app.data.migrations import upgrade_schema
+from app.core.config import JobQueueSettings
+from app.core.offload import report_pool
+from app.core.response_cache import ResponseCacheMiddleware
+from app.core.serialization import DefaultResponse
+from app.services import borrower_activity
+from app.services.job_queue import JobQueue
+from app.services.leaderboard import rebuild_leaderboards
+from app.services.loan_history import rebuild_loan_history
+from app.services.overdue_sweeper import run_sweeper
 from app.core.error_handlers import (
     http_exception_handler,
     validation_exception_handler,
@@ -20,8 +33,37 @@ from app.core.error_handlers import (
 async def lifespan(app: FastAPI):
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        # Columns and indexes added since the database was created
+        added = await conn.run_sync(upgrade_schema)
+    async with AsyncSessionLocal() as session:
+        if "loan_histories" in added:
+            # New counters (returned loans, late returns, ranks) start from the loans
+            await rebuild_loan_history(session)
+            await session.commit()
+        await rebuild_leaderboards(session)
+        if borrower_activity.COUNTERS_ENABLED:
+            # Loans written while the counters were off are not in the table
+            await borrower_activity.rebuild_borrower_activity(session)
+            await session.commit()
+    # Flag overdue loans in the background (first sweep runs immediately)
+    sweeper = asyncio.create_task(run_sweeper(AsyncSessionLocal))
+    # Warm the report worker processes, when enabled
+    await report_pool.start()
+    # Reports and exports submitted to /jobs
+    job_settings = JobQueueSettings.from_env()
+    app.state.job_queue = JobQueue(
+        AsyncSessionLocal,
+        AsyncReadSessionLocal,
+        results_dir=job_settings.results_dir,
+        workers=job_settings.workers,
+    )
+    await app.state.job_queue.start()
     yield
-    pass
+    await app.state.job_queue.stop()
+    report_pool.shutdown()
+    sweeper.cancel()
+    with suppress(asyncio.CancelledError):
+        await sweeper
 
 
 apiVersion = "v1"
@@ -31,12 +73,23 @@ app = FastAPI(
     description="REST API for managing a modern library",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=DefaultResponse,
 )
 
 app.add_exception_handler(StarletteHTTPException, http_exception_handler)
 app.add_exception_handler(RequestValidationError, validation_exception_handler)
 app.add_exception_handler(Exception, general_exception_handler)
 
+# Catalogue reads are served from the response cache, invalidated on writes.
+# Added first so that CORS (added last, outermost) also wraps cached responses
+app.add_middleware(
+    ResponseCacheMiddleware,
+    prefixes={
+        f"/api/{apiVersion}/books": "books",
+        f"/api/{apiVersion}/authors": "authors",
+    },
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -49,3 +102,5 @@ app.add_middleware(
 app.include_router(author_router, prefix=f"/api/{apiVersion}")
 app.include_router(book_router, prefix=f"/api/{apiVersion}")
 app.include_router(loan_router, prefix=f"/api/{apiVersion}")
+app.include_router(stats_router, prefix=f"/api/{apiVersion}")
+app.include_router(job_router, prefix=f"/api/{apiVersion}")
@@ -1,19 +1,49 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
-from app.schemas.common import PaginatedResponse
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from app.core.batch import batch_result, parse_ids
+from app.core.bulk import InvalidPayloadError, iter_records
+from app.core.pagination import InvalidCursorError
+from app.core.serialization import (
+    project,
+    select_fields,
+    trimmed_schema,
+    trusted_response,
+)
+from app.core.response_cache import (
+    collection_etag,
+    entity_etag,
+    last_modified,
+    set_validators,
+)
+from app.schemas.common import (
+    BatchGetRequest,
+    BatchResponse,
+    BulkImportResponse,
+    CursorPage,
+    PaginatedResponse,
+)
 from app.services.author_service import AuthorService
 from app.data.orm import Author as AuthorORM
 from app.schemas.author import AuthorBase, AuthorRead, AuthorUpdate
 
 router = APIRouter(prefix="/authors", tags=["Authors"])
 
+# Heavy text columns left out of list pages unless requested with `fields`
+LIST_DEFERRED_FIELDS = ("biography",)
+
 @router.get("/", response_model=PaginatedResponse[AuthorRead])
 async def list_authors(
+    response: Response,
     page: int = 1,
     page_size: int = 20,
     search: str | None = None,
     nationality: str | None = None,
-    sort_by: str = Query("last_name", pattern="^(last_name|first_name|birth_date)$"),
+    sort_by: str = Query(
+        "last_name", pattern="^(last_name|first_name|birth_date|relevance)$"
+    ),
     order: str = Query("asc", pattern="^(asc|desc)$"),
+    include_total: bool = True,
+    count: str = Query("exact", pattern="^(exact|estimated)$"),
+    fields: str | None = None,
     service: AuthorService = Depends(),
 ):
     """
@@ -21,11 +51,16 @@ async def list_authors(
 
     - **page**: Page number (default: 1)
     - **page_size**: Number of items per page (default: 20)
-    - **search**: Search term for author's name
+    - **search**: Full-text search on name, biography and website (prefix matching)
     - **nationality**: Filter by nationality
-    - **sort_by**: Sort by field (last_name, first_name, or birth_date)
+    - **sort_by**: Sort by field (last_name, first_name, birth_date, or relevance)
     - **order**: Sort order (asc or desc)
+    - **include_total**: Compute the total count (default: true)
+    - **count**: Count strategy, exact or estimated from maintained counters
+    - **fields**: Comma separated fields to return, "*" for all (default: all but biography)
     """
+    fields = select_fields(AuthorRead, fields, LIST_DEFERRED_FIELDS)
+    schema = trimmed_schema(AuthorRead, fields)
     try:
         authors, total = await service.get_all_filtered(
             page=page,
@@ -34,19 +69,85 @@ async def list_authors(
             nationality=nationality,
             sort_by=sort_by,
             order=order,
+            include_total=include_total,
+            count_mode=count,
+            columns=fields,
         )
-        total_pages = (total + page_size - 1) // page_size
-        return PaginatedResponse(
-            items=authors,
-            total=total,
-            page=page,
-            page_size=page_size,
-            total_pages=total_pages,
+        total_pages = (
+            (total + page_size - 1) // page_size if total is not None else None
+        )
+        set_validators(
+            response,
+            collection_etag("authors", authors, total, page, page_size, fields),
+        )
+        return trusted_response(
+            PaginatedResponse[schema],
+            {
+                "items": [project(schema, author) for author in authors],
+                "total": total,
+                "page": page,
+                "page_size": page_size,
+                "total_pages": total_pages,
+            },
+            response,
         )
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error listing authors: {str(e)}")
 
 
+@router.get("/cursor", response_model=CursorPage[AuthorRead])
+async def list_authors_cursor(
+    response: Response,
+    page_size: int = Query(20, ge=1, le=100),
+    cursor: str | None = None,
+    search: str | None = None,
+    nationality: str | None = None,
+    sort_by: str = Query("last_name", pattern="^(last_name|first_name)$"),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    fields: str | None = None,
+    service: AuthorService = Depends(),
+):
+    """
+    Retrieve authors using cursor pagination, for deep browsing of the catalogue.
+
+    - **page_size**: Number of items per page (default: 20)
+    - **cursor**: Value of `next_cursor` from the previous page (omit for the first page)
+    - **search**: Search term for author's name
+    - **nationality**: Filter by nationality
+    - **sort_by**: Sort by field (last_name or first_name)
+    - **order**: Sort order (asc or desc)
+    - **fields**: Comma separated fields to return, "*" for all (default: all but biography)
+    """
+    fields = select_fields(AuthorRead, fields, LIST_DEFERRED_FIELDS)
+    schema = trimmed_schema(AuthorRead, fields)
+    try:
+        authors, next_cursor = await service.get_all_keyset(
+            page_size=page_size,
+            cursor=cursor,
+            search=search,
+            nationality=nationality,
+            sort_by=sort_by,
+            order=order,
+            columns=fields,
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_validators(
+        response,
+        collection_etag("authors", authors, next_cursor, fields),
+    )
+    return trusted_response(
+        CursorPage[schema],
+        {
+            "items": [project(schema, author) for author in authors],
+            "page_size": page_size,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None,
+        },
+        response,
+    )
+
+
 @router.post("/", response_model=AuthorRead)
 async def create_author(
     author: AuthorBase, service: AuthorService = Depends()
@@ -70,19 +171,89 @@ async def create_author(
         raise HTTPException(status_code=400, detail=f"Error creating author: {str(e)}")
 
 
+@router.post("/bulk", response_model=BulkImportResponse)
+async def bulk_create_authors(
+    request: Request,
+    batch_size: int = Query(500, ge=1, le=5000),
+    service: AuthorService = Depends(),
+):
+    """
+    Import many authors at once from a JSON array or an NDJSON stream
+    (`Content-Type: application/x-ndjson`).
+
+    Every row is validated like `POST /authors/`; invalid or duplicate rows are
+    reported by index and the others are inserted in one transaction.
+
+    - **batch_size**: Number of rows inserted per batch (default: 500)
+    """
+    try:
+        return await service.bulk_import(iter_records(request), AuthorBase, batch_size)
+    except InvalidPayloadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error importing authors: {str(e)}")
+
+
+@router.get("/batch", response_model=BatchResponse[AuthorRead])
+async def get_authors_batch(
+    response: Response,
+    ids: str = Query(..., description="Comma separated IDs, e.g. 1,2,3"),
+    service: AuthorService = Depends(),
+):
+    """
+    Retrieve many authors by ID in one request.
+
+    Results follow the order of `ids`; missing authors are returned with
+    `found: false` and listed in `not_found`.
+
+    - **ids**: Comma separated IDs (at most 1000)
+    """
+    ids = parse_ids(ids)
+    authors = await service.get_by_ids(ids)
+    found = [author for author in authors if author is not None]
+    set_validators(response, collection_etag("authors", found, ids))
+    return trusted_response(
+        BatchResponse[AuthorRead], batch_result(AuthorRead, ids, authors), response
+    )
+
+
+@router.post("/batch-get", response_model=BatchResponse[AuthorRead])
+async def batch_get_authors(request: BatchGetRequest, service: AuthorService = Depends()):
+    """
+    Retrieve many authors by ID, for ID lists too long for a query string.
+
+    - **ids**: The IDs to retrieve (at most 1000), results follow their order
+    """
+    authors = await service.get_by_ids(request.ids)
+    return trusted_response(
+        BatchResponse[AuthorRead], batch_result(AuthorRead, request.ids, authors)
+    )
+
+
 @router.get("/{author_id}", response_model=AuthorRead)
 async def get_author(
-    author_id: int, service: AuthorService = Depends()
+    author_id: int,
+    response: Response,
+    fields: str | None = None,
+    service: AuthorService = Depends(),
 ):
     """
     Retrieve an author by ID.
 
     - **author_id**: The ID of the author to retrieve
+    - **fields**: Comma separated fields to return (default: all)
     """
-    author = await service.get_by_id(author_id)
+    columns, schema = None, AuthorRead
+    if fields is not None:
+        columns = select_fields(AuthorRead, fields)
+        schema = trimmed_schema(AuthorRead, columns)
+    author = await service.get_by_id(author_id, read_only=True, columns=columns)
     if not author:
         raise HTTPException(status_code=404, detail="Author not found")
-    return author
+    # Every field selection is a representation with its own ETag
+    extra = (columns,) if columns else ()
+    set_validators(response, entity_etag("authors", author, *extra), last_modified([author]))
+    return trusted_response(schema, project(schema, author), response)
 
 
 @router.put("/{author_id}", response_model=AuthorRead)
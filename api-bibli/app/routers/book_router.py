@@ -1,21 +1,49 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
-from app.schemas.common import PaginatedResponse
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from app.core.batch import batch_result, parse_ids
+from app.core.bulk import InvalidPayloadError, iter_records
+from app.core.pagination import InvalidCursorError
+from app.core.serialization import (
+    project,
+    select_fields,
+    trimmed_schema,
+    trusted_response,
+)
+from app.core.response_cache import (
+    collection_etag,
+    entity_etag,
+    last_modified,
+    set_validators,
+)
+from app.schemas.common import (
+    BatchGetRequest,
+    BatchResponse,
+    BulkImportResponse,
+    CursorPage,
+    PaginatedResponse,
+)
 from app.data.orm import Book as BookORM
 from app.services.book_service import BookService
-from app.schemas.book import BookRead, BookBase, BookUpdate
+from app.schemas.book import BookCategory, BookRead, BookBase, BookUpdate
 
 router = APIRouter(prefix="/books", tags=["Books"])
 
+# Heavy text columns left out of list pages unless requested with `fields`
+LIST_DEFERRED_FIELDS = ("description",)
+
 
 @router.get("/", response_model=PaginatedResponse[BookRead])
 async def list_books(
+    response: Response,
     page: int = 1,
     page_size: int = 20,
     search: str | None = None,
-    category: str | None = None,
+    category: BookCategory | None = None,
     language: str | None = None,
-    sort_by: str = Query("title", pattern="^(title|year|author_id)$"),
+    sort_by: str = Query("title", pattern="^(title|year|author_id|relevance)$"),
     order: str = Query("asc", pattern="^(asc|desc)$"),
+    include_total: bool = True,
+    count: str = Query("exact", pattern="^(exact|estimated)$"),
+    fields: str | None = None,
     service: BookService = Depends(),
 ):
     """
@@ -23,12 +51,17 @@ async def list_books(
 
     - **page**: Page number (default: 1)
     - **page_size**: Number of items per page (default: 20)
-    - **search**: Search term for book title or author
+    - **search**: Full-text search on title and description (prefix matching)
     - **category**: Filter by category
     - **language**: Filter by language
-    - **sort_by**: Sort by field (title, year, or author_id)
+    - **sort_by**: Sort by field (title, year, author_id, or relevance when searching)
     - **order**: Sort order (asc or desc)
+    - **include_total**: Compute the total count (default: true)
+    - **count**: Count strategy, exact or estimated from maintained counters
+    - **fields**: Comma separated fields to return, "*" for all (default: all but description)
     """
+    fields = select_fields(BookRead, fields, LIST_DEFERRED_FIELDS)
+    schema = trimmed_schema(BookRead, fields)
     items, total = await service.get_all_filtered(
         page=page,
         page_size=page_size,
@@ -37,14 +70,78 @@ async def list_books(
         language=language,
         sort_by=sort_by,
         order=order,
+        include_total=include_total,
+        count_mode=count,
+        columns=fields,
     )
-    total_pages = (total + page_size - 1) // page_size
-    return PaginatedResponse(
-        items=items,
-        total=total,
-        page=page,
-        page_size=page_size,
-        total_pages=total_pages,
+    total_pages = (total + page_size - 1) // page_size if total is not None else None
+    set_validators(
+        response,
+        collection_etag("books", items, total, page, page_size, fields),
+    )
+    return trusted_response(
+        PaginatedResponse[schema],
+        {
+            "items": [project(schema, book) for book in items],
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            "total_pages": total_pages,
+        },
+        response,
+    )
+
+
+@router.get("/cursor", response_model=CursorPage[BookRead])
+async def list_books_cursor(
+    response: Response,
+    page_size: int = Query(20, ge=1, le=100),
+    cursor: str | None = None,
+    search: str | None = None,
+    category: BookCategory | None = None,
+    language: str | None = None,
+    sort_by: str = Query("title", pattern="^(title|year|author_id)$"),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    fields: str | None = None,
+    service: BookService = Depends(),
+):
+    """
+    Retrieve books using cursor pagination, for deep browsing of the catalogue.
+
+    - **page_size**: Number of items per page (default: 20)
+    - **cursor**: Value of `next_cursor` from the previous page (omit for the first page)
+    - **search**: Search term for book title or author
+    - **category**: Filter by category
+    - **language**: Filter by language
+    - **sort_by**: Sort by field (title, year, or author_id)
+    - **order**: Sort order (asc or desc)
+    - **fields**: Comma separated fields to return, "*" for all (default: all but description)
+    """
+    fields = select_fields(BookRead, fields, LIST_DEFERRED_FIELDS)
+    schema = trimmed_schema(BookRead, fields)
+    try:
+        items, next_cursor = await service.get_all_keyset(
+            page_size=page_size,
+            cursor=cursor,
+            search=search,
+            category=category,
+            language=language,
+            sort_by=sort_by,
+            order=order,
+            columns=fields,
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_validators(response, collection_etag("books", items, next_cursor, fields))
+    return trusted_response(
+        CursorPage[schema],
+        {
+            "items": [project(schema, book) for book in items],
+            "page_size": page_size,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None,
+        },
+        response,
     )
 
 
@@ -69,17 +166,89 @@ async def create_book(book: BookBase, service: BookService = Depends()):
         raise HTTPException(status_code=400, detail=f"Error creating book: {str(e)}")
 
 
+@router.post("/bulk", response_model=BulkImportResponse)
+async def bulk_create_books(
+    request: Request,
+    batch_size: int = Query(500, ge=1, le=5000),
+    service: BookService = Depends(),
+):
+    """
+    Import many books at once from a JSON array or an NDJSON stream
+    (`Content-Type: application/x-ndjson`).
+
+    Every row is validated like `POST /books/`; invalid or duplicate rows are
+    reported by index and the others are inserted in one transaction.
+
+    - **batch_size**: Number of rows inserted per batch (default: 500)
+    """
+    try:
+        return await service.bulk_import(iter_records(request), BookBase, batch_size)
+    except InvalidPayloadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error importing books: {str(e)}")
+
+
+@router.get("/batch", response_model=BatchResponse[BookRead])
+async def get_books_batch(
+    response: Response,
+    ids: str = Query(..., description="Comma separated IDs, e.g. 1,2,3"),
+    service: BookService = Depends(),
+):
+    """
+    Retrieve many books by ID in one request.
+
+    Results follow the order of `ids`; missing books are returned with
+    `found: false` and listed in `not_found`.
+
+    - **ids**: Comma separated IDs (at most 1000)
+    """
+    ids = parse_ids(ids)
+    books = await service.get_by_ids(ids)
+    found = [book for book in books if book is not None]
+    set_validators(response, collection_etag("books", found, ids))
+    return trusted_response(
+        BatchResponse[BookRead], batch_result(BookRead, ids, books), response
+    )
+
+
+@router.post("/batch-get", response_model=BatchResponse[BookRead])
+async def batch_get_books(request: BatchGetRequest, service: BookService = Depends()):
+    """
+    Retrieve many books by ID, for ID lists too long for a query string.
+
+    - **ids**: The IDs to retrieve (at most 1000), results follow their order
+    """
+    books = await service.get_by_ids(request.ids)
+    return trusted_response(
+        BatchResponse[BookRead], batch_result(BookRead, request.ids, books)
+    )
+
+
 @router.get("/{book_id}", response_model=BookRead)
-async def get_book(book_id: int, service: BookService = Depends()):
+async def get_book(
+    book_id: int,
+    response: Response,
+    fields: str | None = None,
+    service: BookService = Depends(),
+):
     """
     Retrieve a book by ID.
 
     - **book_id**: The ID of the book to retrieve
+    - **fields**: Comma separated fields to return (default: all)
     """
-    book = await service.get_by_id(book_id)
+    columns, schema = None, BookRead
+    if fields is not None:
+        columns = select_fields(BookRead, fields)
+        schema = trimmed_schema(BookRead, columns)
+    book = await service.get_by_id(book_id, read_only=True, columns=columns)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
-    return book
+    # Every field selection is a representation with its own ETag
+    extra = (columns,) if columns else ()
+    set_validators(response, entity_etag("books", book, *extra), last_modified([book]))
+    return trusted_response(schema, project(schema, book), response)
 
 
 @router.patch("/{book_id}", response_model=BookRead)
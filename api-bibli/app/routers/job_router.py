@@ -0,0 +1,69 @@
+from pathlib import Path
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import FileResponse
+
+from app.data.models import JobStatus
+from app.schemas.job import JobCreate, JobRead
+from app.services.job_queue import JobQueue, media_type
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+def get_job_queue(request: Request) -> JobQueue:
+    return request.app.state.job_queue
+
+
+@router.post("/", response_model=JobRead, status_code=202)
+async def submit_job(
+    job: JobCreate,
+    request: Request,
+    response: Response,
+    queue: JobQueue = Depends(get_job_queue),
+):
+    """
+    Run a report or an export in the background; poll `GET /jobs/{id}` until it
+    succeeds, then download the file from `GET /jobs/{id}/result`.
+
+    - **kind**: monthly_report (`from`, `to`), fines_report (`limit`),
+      borrower_activity, never_borrowed (`format`, `gzip`) or export (`table`, `format`, `gzip`)
+    - **params**: Parameters of the job kind
+    """
+    try:
+        created = await queue.submit(job.kind, job.params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response.headers["Location"] = str(request.url_for("get_job", job_id=created.id))
+    return created
+
+
+@router.get("/{job_id}", response_model=JobRead)
+async def get_job(job_id: int, queue: JobQueue = Depends(get_job_queue)):
+    """
+    Retrieve the status and progress of a job.
+
+    - **job_id**: The ID of the job
+    """
+    job = await queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/{job_id}/result")
+async def get_job_result(job_id: int, queue: JobQueue = Depends(get_job_queue)):
+    """
+    Download the result file of a succeeded job.
+
+    - **job_id**: The ID of the job
+    """
+    job = await queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status != JobStatus.SUCCEEDED:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status.value.lower()}")
+    if not job.result_path or not Path(job.result_path).is_file():
+        raise HTTPException(status_code=404, detail="Job result not found")
+    return FileResponse(
+        job.result_path, media_type=media_type(job.result_name), filename=job.result_name
+    )
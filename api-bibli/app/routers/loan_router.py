@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from app.core.bulk import InvalidPayloadError, iter_records
+from app.core.pagination import InvalidCursorError
+from app.core.serialization import project, trusted_response
 from app.services.loan_service import LoanService
 from app.schemas.loan import LoanCreate, LoanRead, LoanReturn
-from app.schemas.common import PaginatedResponse
+from app.schemas.common import BulkImportResponse, CursorPage, PaginatedResponse
 from app.data.models import LoanStatus
 
 router = APIRouter(prefix="/loans", tags=["Loans"])
@@ -24,6 +27,30 @@ async def create_loan(
         raise HTTPException(status_code=400, detail=f"Error creating loan: {str(e)}")
 
 
+@router.post("/bulk", response_model=BulkImportResponse)
+async def bulk_create_loans(
+    request: Request,
+    batch_size: int = Query(500, ge=1, le=5000),
+    service: LoanService = Depends(),
+):
+    """
+    Create many loans at once from a JSON array or an NDJSON stream
+    (`Content-Type: application/x-ndjson`).
+
+    Every row is validated and checked like `POST /loans/` (availability and
+    borrower loan limit, in row order); rejected rows are reported by index and
+    the others are created in one transaction.
+
+    - **batch_size**: Number of rows inserted per batch (default: 500)
+    """
+    try:
+        return await service.bulk_import(iter_records(request), LoanCreate, batch_size)
+    except InvalidPayloadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error importing loans: {str(e)}")
+
+
 @router.get("/", response_model=PaginatedResponse[LoanRead])
 async def list_loans(
     page: int = 1,
@@ -33,6 +60,8 @@ async def list_loans(
     book_id: int | None = None,
     active_only: bool = False,
     late_only: bool = False,
+    include_total: bool = True,
+    count: str = Query("exact", pattern="^(exact|estimated)$"),
     service: LoanService = Depends(),
 ):
     """
@@ -45,6 +74,8 @@ async def list_loans(
     - **book_id**: Filter by book ID
     - **active_only**: Show only active loans
     - **late_only**: Show only late loans
+    - **include_total**: Compute the total count (default: true)
+    - **count**: Count strategy, exact or estimated from maintained counters
     """
     loans, total = await service.get_all_filtered(
         page=page,
@@ -54,15 +85,65 @@ async def list_loans(
         book_id=book_id,
         active_only=active_only,
         late_only=late_only,
+        include_total=include_total,
+        count_mode=count,
     )
 
-    total_pages = (total + page_size - 1) // page_size
-    return PaginatedResponse(
-        items=loans,
-        total=total,
-        page=page,
-        page_size=page_size,
-        total_pages=total_pages,
+    total_pages = (total + page_size - 1) // page_size if total is not None else None
+    return trusted_response(
+        PaginatedResponse[LoanRead],
+        {
+            "items": [project(LoanRead, loan) for loan in loans],
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            "total_pages": total_pages,
+        },
+    )
+
+
+@router.get("/cursor", response_model=CursorPage[LoanRead])
+async def list_loans_cursor(
+    page_size: int = Query(20, ge=1, le=100),
+    cursor: str | None = None,
+    status: LoanStatus | None = None,
+    borrower_mail: str | None = None,
+    book_id: int | None = None,
+    active_only: bool = False,
+    late_only: bool = False,
+    service: LoanService = Depends(),
+):
+    """
+    Retrieve loans, most recent first, using cursor pagination.
+
+    - **page_size**: Number of items per page (default: 20)
+    - **cursor**: Value of `next_cursor` from the previous page (omit for the first page)
+    - **status**: Filter by loan status
+    - **borrower_mail**: Filter by borrower's email
+    - **book_id**: Filter by book ID
+    - **active_only**: Show only active loans
+    - **late_only**: Show only late loans
+    """
+    try:
+        loans, next_cursor = await service.get_all_keyset(
+            page_size=page_size,
+            cursor=cursor,
+            status=status,
+            borrower_mail=borrower_mail,
+            book_id=book_id,
+            active_only=active_only,
+            late_only=late_only,
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return trusted_response(
+        CursorPage[LoanRead],
+        {
+            "items": [project(LoanRead, loan) for loan in loans],
+            "page_size": page_size,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None,
+        },
     )
 
 
@@ -73,7 +154,8 @@ async def get_loan(loan_id: int, service: LoanService = Depends()):
 
     - **loan_id**: The ID of the loan to retrieve
     """
-    return await service.get_loan_details(loan_id)
+    loan = await service.get_loan_details(loan_id)
+    return trusted_response(LoanRead, project(LoanRead, loan))
 
 
 @router.post("/{loan_id}/return", response_model=LoanRead)
@@ -1,26 +1,40 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Path, Query
 from fastapi.responses import StreamingResponse
 import csv
 import io
 
 from app.schemas.common import (
     StatsResponse, BookStatsResponse, AuthorStatsResponse, 
-    MonthlyReportResponse, NeverBorrowedBookResponse
+    MonthlyReportResponse, NeverBorrowedBookResponse, LeaderboardEntry,
+    SweepMetricsResponse, FinesReportResponse, CacheStatsResponse, CursorPage,
+    UserActivityResponse
 )
+from app.core.pagination import InvalidCursorError
 from app.services.stats_service import StatsService
-from app.data.orm import SessionDep
+from app.services.export_service import ExportService
+from app.services.overdue_sweeper import sweep_metrics
+from app.core.identity_cache import identity_cache
+from app.core.response_cache import response_cache
+from app.data.orm import ReadSessionDep, SessionDep
 
 router = APIRouter(prefix="/stats", tags=["Statistics"])
 
-def get_service(session: SessionDep):
-    return StatsService(session)
+MONTH_PATTERN = r"^\d{4}-(0[1-9]|1[0-2])$"
+
+def get_service(session: SessionDep, read_session: ReadSessionDep):
+    return StatsService(session, read_session)
+
+def get_export_service(session: ReadSessionDep):
+    return ExportService(session)
 
 @router.get("/", response_model=StatsResponse)
-async def get_statistics(service: StatsService = Depends(get_service)):
+async def get_statistics(fresh: bool = False, service: StatsService = Depends(get_service)):
     """
     Retrieve global statistics.
+
+    - **fresh**: Recompute the statistics snapshot from the tables (default: false)
     """
-    return await service.get_global_stats()
+    return await service.get_global_stats(fresh=fresh)
 
 @router.get("/books/{book_id}", response_model=BookStatsResponse)
 async def get_book_statistics(book_id: int, service: StatsService = Depends(get_service)):
@@ -46,22 +60,149 @@ async def get_author_statistics(author_id: int, service: StatsService = Depends(
         raise HTTPException(status_code=404, detail="Author not found")
     return stats
 
-@router.get("/reports/monthly", response_model=MonthlyReportResponse)
-async def get_monthly_report(year: int, month: int, service: StatsService = Depends(get_service)):
+@router.get("/borrowers", response_model=CursorPage[UserActivityResponse])
+async def get_borrowers_activity(
+    page_size: int = Query(100, ge=1, le=1000),
+    cursor: str | None = None,
+    service: StatsService = Depends(get_service),
+):
+    """
+    Retrieve loan counters (total, current, late returns) per borrower, by email.
+
+    - **page_size**: Number of borrowers per page (default: 100)
+    - **cursor**: Value of `next_cursor` from the previous page (omit for the first page)
+    """
+    try:
+        items, next_cursor = await service.get_borrower_activity(page_size, cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return CursorPage(
+        items=items,
+        page_size=page_size,
+        next_cursor=next_cursor,
+        has_more=next_cursor is not None,
+    )
+
+@router.get("/borrowers/{borrower_mail}", response_model=UserActivityResponse)
+async def get_borrower_activity(borrower_mail: str, service: StatsService = Depends(get_service)):
+    """
+    Retrieve the loan counters of one borrower.
+
+    - **borrower_mail**: The borrower's email
+    """
+    activity = await service.get_borrower_activity_for(borrower_mail)
+    if not activity:
+        raise HTTPException(status_code=404, detail="Borrower not found")
+    return activity
+
+@router.get("/leaderboard/{kind}", response_model=list[LeaderboardEntry])
+async def get_leaderboard(
+    kind: str = Path(..., pattern="^(books|authors)$"),
+    window: str = Query("30d", pattern="^(7d|30d|all)$"),
+    limit: int = Query(10, ge=1, le=100),
+    service: StatsService = Depends(get_service),
+):
+    """
+    Retrieve the most borrowed books or authors.
+
+    - **kind**: books or authors
+    - **window**: Time window (7d, 30d or all, default: 30d)
+    - **limit**: Number of entries (default: 10)
+    """
+    return await service.get_leaderboard(kind, window, limit)
+
+@router.get("/sweeper", response_model=SweepMetricsResponse)
+async def get_sweeper_metrics():
+    """
+    Retrieve the overdue sweeper metrics (runs, duration, loans updated) of this process.
+    """
+    return sweep_metrics.as_dict()
+
+@router.get("/cache", response_model=CacheStatsResponse)
+async def get_cache_metrics():
+    """
+    Retrieve hit/miss counters of the response cache and of the per-model identity cache.
+    """
+    return {
+        "responses": {"hits": response_cache.hits, "misses": response_cache.misses},
+        "identities": identity_cache.stats(),
+    }
+
+@router.get("/reports/monthly", response_model=list[MonthlyReportResponse])
+async def get_monthly_report(
+    start: str = Query(..., alias="from", pattern=MONTH_PATTERN),
+    end: str = Query(..., alias="to", pattern=MONTH_PATTERN),
+    service: StatsService = Depends(get_service),
+):
+    """
+    Retrieve monthly activity (loans, returns, new books, new borrowers) over a range.
+
+    - **from**: First month, YYYY-MM
+    - **to**: Last month (included), YYYY-MM, at most 10 years after `from`
     """
-    Retrieve a monthly report.
+    try:
+        return await service.get_monthly_report(start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    - **year**: The year for the report
-    - **month**: The month for the report
+@router.get("/reports/fines", response_model=FinesReportResponse)
+async def get_fines_report(
+    limit: int = Query(100, ge=1, le=1000),
+    service: StatsService = Depends(get_service),
+):
     """
-    return await service.get_monthly_report(year, month)
+    Retrieve late penalties per borrower and per month.
 
-@router.get("/reports/never-borrowed", response_model=list[NeverBorrowedBookResponse])
-async def get_never_borrowed_books(service: StatsService = Depends(get_service)):
+    - **limit**: Number of borrowers, highest fines first (default: 100)
     """
-    Retrieve a list of never borrowed books.
+    return await service.get_fines_report(limit)
+
+@router.get("/reports/never-borrowed", response_model=CursorPage[NeverBorrowedBookResponse])
+async def get_never_borrowed_books(
+    page_size: int = Query(100, ge=1, le=1000),
+    cursor: str | None = None,
+    service: StatsService = Depends(get_service),
+):
+    """
+    Retrieve never borrowed books by title, using cursor pagination.
+
+    - **page_size**: Number of books per page (default: 100)
+    - **cursor**: Value of `next_cursor` from the previous page (omit for the first page)
+    """
+    try:
+        items, next_cursor = await service.get_never_borrowed_books(page_size, cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return CursorPage(
+        items=items,
+        page_size=page_size,
+        next_cursor=next_cursor,
+        has_more=next_cursor is not None,
+    )
+
+@router.get("/reports/never-borrowed/stream")
+async def stream_never_borrowed_books(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    gzip: bool = False,
+    service: ExportService = Depends(get_export_service),
+):
+    """
+    Stream every never borrowed book, whatever the size of the catalogue.
+
+    - **format**: csv or ndjson (default: csv)
+    - **gzip**: Compress the file with gzip (default: false)
     """
-    return await service.get_never_borrowed_books()
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"never_borrowed.{format}"
+    if gzip:
+        media_type = "application/gzip"
+        filename += ".gz"
+
+    return StreamingResponse(
+        service.stream_never_borrowed(format, gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
 
 @router.get("/export/csv")
 async def export_stats_csv(service: StatsService = Depends(get_service)):
@@ -82,3 +223,29 @@ async def export_stats_csv(service: StatsService = Depends(get_service)):
         media_type="text/csv",
         headers={"Content-Disposition": "attachment; filename=library_stats.csv"}
     )
+
+@router.get("/export/{table}")
+async def export_table(
+    table: str = Path(..., pattern="^(books|authors|loans)$"),
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    gzip: bool = False,
+    service: ExportService = Depends(get_export_service),
+):
+    """
+    Export a whole table, streamed in chunks.
+
+    - **table**: books, authors or loans
+    - **format**: csv or ndjson (default: csv)
+    - **gzip**: Compress the file with gzip (default: false)
+    """
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"{table}.{format}"
+    if gzip:
+        media_type = "application/gzip"
+        filename += ".gz"
+
+    return StreamingResponse(
+        service.stream_table(table, format, gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
@@ -1,15 +1,52 @@
+from datetime import datetime
 from typing import Generic, Optional, TypeVar
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from app.core.batch import MAX_BATCH_IDS
 
 T = TypeVar("T")
 
 
 class PaginatedResponse(BaseModel, Generic[T]):
     items: list[T]
-    total: int
+    total: Optional[int] = None
     page: int
     page_size: int
-    total_pages: int
+    total_pages: Optional[int] = None
+
+
+class CursorPage(BaseModel, Generic[T]):
+    items: list[T]
+    page_size: int
+    next_cursor: Optional[str] = None
+    has_more: bool = False
+
+
+class BatchItem(BaseModel, Generic[T]):
+    id: int
+    found: bool
+    item: Optional[T] = None
+
+
+class BatchResponse(BaseModel, Generic[T]):
+    items: list[BatchItem[T]]
+    not_found: list[int]
+
+
+class BatchGetRequest(BaseModel):
+    ids: list[int] = Field(min_length=1, max_length=MAX_BATCH_IDS)
+
+class BulkRowError(BaseModel):
+    index: int
+    message: str
+
+
+class BulkImportResponse(BaseModel):
+    received: int
+    inserted: int
+    failed: int
+    errors: list[BulkRowError]
+
 
 class StatsResponse(BaseModel):
     total_books: int
@@ -33,6 +70,50 @@ class AuthorStatsResponse(BaseModel):
     total_books: int
     total_loans: int
 
+class LeaderboardEntry(BaseModel):
+    rank: int
+    id: int
+    name: str
+    loans: int
+
+class SweepMetricsResponse(BaseModel):
+    runs: int
+    failures: int
+    rows_updated: int
+    last_rows_updated: int
+    last_duration_ms: float
+    max_duration_ms: float
+    last_run_at: Optional[datetime] = None
+
+class CacheCounters(BaseModel):
+    hits: int
+    misses: int
+    size: Optional[int] = None
+
+class CacheStatsResponse(BaseModel):
+    responses: CacheCounters
+    identities: dict[str, CacheCounters]
+
+class BorrowerFines(BaseModel):
+    borrower_mail: str
+    borrower_name: str
+    late_loans: int
+    total_fines: float
+    outstanding_fines: float
+
+class MonthlyFines(BaseModel):
+    month: str
+    late_loans: int
+    total_fines: float
+    outstanding_fines: float
+
+class FinesReportResponse(BaseModel):
+    late_loans: int
+    total_fines: float
+    outstanding_fines: float
+    by_borrower: list[BorrowerFines]
+    by_month: list[MonthlyFines]
+
 class MonthlyReportResponse(BaseModel):
     month: str
     new_books: int
@@ -41,7 +122,7 @@ class MonthlyReportResponse(BaseModel):
     returned_loans: int
 
 class UserActivityResponse(BaseModel):
-    user_id: int
+    borrower_mail: str
     full_name: str
     total_loans: int
     current_loans: int
@@ -50,4 +131,4 @@ class UserActivityResponse(BaseModel):
 class NeverBorrowedBookResponse(BaseModel):
     book_id: int
     title: str
-    added_date: str
\ No newline at end of file
+    added_date: Optional[str] = None
\ No newline at end of file
@@ -0,0 +1,70 @@
+import json
+from datetime import datetime
+from typing import Any, Literal
+
+from pydantic import BaseModel, ConfigDict, Field, computed_field, field_validator, model_validator
+
+from app.data.models import JobStatus
+from app.core.months import month_range
+
+
+class JobCreate(BaseModel):
+    kind: str = Field(
+        ...,
+        description="monthly_report, fines_report, borrower_activity, never_borrowed or export",
+    )
+    params: dict[str, Any] = Field(default_factory=dict)
+
+
+class JobRead(BaseModel):
+    id: int
+    kind: str
+    params: dict[str, Any]
+    status: JobStatus
+    rows_done: int
+    rows_total: int | None = None
+    error: str | None = None
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    model_config = ConfigDict(from_attributes=True)
+
+    @field_validator("params", mode="before")
+    @classmethod
+    def parse_params(cls, value):
+        return json.loads(value) if isinstance(value, str) else value
+
+    @computed_field
+    @property
+    def progress(self) -> float | None:
+        """Share of the rows written, None while the row count is unknown."""
+        if self.status == JobStatus.SUCCEEDED:
+            return 1.0
+        if not self.rows_total:
+            return None
+        return min(self.rows_done / self.rows_total, 1.0)
+
+
+# Parameters of each job kind
+class MonthlyReportParams(BaseModel):
+    start: str = Field(..., alias="from")
+    end: str = Field(..., alias="to")
+    model_config = ConfigDict(populate_by_name=True)
+
+    @model_validator(mode="after")
+    def check_range(self):
+        month_range(self.start, self.end)
+        return self
+
+
+class FinesReportParams(BaseModel):
+    limit: int = Field(100, ge=1, le=100000)
+
+
+class StreamParams(BaseModel):
+    format: Literal["csv", "ndjson"] = "csv"
+    gzip: bool = False
+
+
+class ExportParams(StreamParams):
+    table: Literal["books", "authors", "loans"]
@@ -1,11 +1,19 @@
-from sqlalchemy import func, select
+from typing import Sequence
+
+from sqlalchemy import select, tuple_
+from app.core.pagination import apply_keyset, decode_cursor, encode_cursor
+from app.data.search import authors_fts, build_match_query, supports_fts
 from app.services.template_service import TemplateService
-from app.data.orm import Author, SessionDep
+from app.data.orm import Author, ReadSessionDep, SessionDep
 
 
 class AuthorService(TemplateService[Author]):
-    def __init__(self, session: SessionDep):
-        super().__init__(self, Author)
+    counter_column = "nationality"
+    snapshot_count = "total_authors"
+    unique_keys = (("first_name", "last_name"),)
+
+    def __init__(self, session: SessionDep, read_session: ReadSessionDep = None):
+        super().__init__(session, Author, read_session)
 
     async def get_by_fullname(self, first_name: str, last_name: str):
         """
@@ -14,11 +22,47 @@ class AuthorService(TemplateService[Author]):
         - **first_name**: The first name of the author
         - **last_name**: The last name of the author
         """
-        statement = select(self.model).where(
-            self.model.first_name == first_name, self.model.last_name == last_name
+        return await self.get_by_unique(("first_name", "last_name"), (first_name, last_name))
+
+    def _bulk_key(self, data: dict):
+        return data["first_name"], data["last_name"]
+
+    async def _existing_bulk_keys(self, keys: set) -> set:
+        result = await self.session.execute(
+            select(self.model.first_name, self.model.last_name).where(
+                tuple_(self.model.first_name, self.model.last_name).in_(keys)
+            )
         )
-        result = await self.session.execute(statement)
-        return result.first()
+        return {tuple(row) for row in result.all()}
+
+    def _match_query(self, search: str | None) -> str | None:
+        if not search or not supports_fts(self.read_session):
+            return None
+        return build_match_query(search)
+
+    def _filtered_statement(
+        self, search: str | None = None, nationality: str | None = None
+    ):
+        statement = select(self.model)
+        if search:
+            match_query = self._match_query(search)
+            if match_query:
+                statement = statement.join(
+                    authors_fts, authors_fts.c.rowid == self.model.id
+                ).where(authors_fts.c.authors_fts.match(match_query))
+            else:
+                # No FTS on this backend, or no word to match (e.g. punctuation only)
+                statement = statement.where(
+                    (self.model.first_name.ilike(f"%{search}%"))
+                    | (self.model.last_name.ilike(f"%{search}%"))
+                    | (self.model.biography.ilike(f"%{search}%"))
+                    | (self.model.website.ilike(f"%{search}%"))
+                )
+
+        if nationality:
+            statement = statement.where(self.model.nationality == nationality.upper())
+
+        return statement
 
     async def get_all_filtered(
         self,
@@ -28,6 +72,9 @@ class AuthorService(TemplateService[Author]):
         nationality: str | None = None,
         sort_by: str = "last_name",
         order: str = "asc",
+        include_total: bool = True,
+        count_mode: str = "exact",
+        columns: Sequence[str] | None = None,
     ):
         """
         Retrieve a paginated list of authors with optional filtering.
@@ -36,32 +83,77 @@ class AuthorService(TemplateService[Author]):
         - **page_size**: Number of items per page
         - **search**: Search term for name or biography
         - **nationality**: Filter by nationality
-        - **sort_by**: Sort field
+        - **sort_by**: Sort field, or "relevance" to rank search matches
         - **order**: Sort order (asc or desc)
+        - **include_total**: Whether to compute the total count
+        - **count_mode**: How to compute the total (exact or estimated)
+        - **columns**: Load only these columns (None loads every column)
         """
-        statement = select(self.model)
-        if search:
-            statement = statement.where(
-                (self.model.first_name.ilike(f"%{search}%"))
-                | (self.model.last_name.ilike(f"%{search}%"))
-                | (self.model.biography.ilike(f"%{search}%"))
-                | (self.model.website.ilike(f"%{search}%"))
-            )
-
-        if nationality:
-            statement = statement.where(self.model.nationality == nationality.upper())
+        statement = self._filtered_statement(search, nationality)
+        total = await self.count_filtered(
+            statement,
+            {"search": search, "nationality": nationality},
+            include_total,
+            count_mode,
+        )
 
-        sort_column = getattr(self.model, sort_by)
-        if order == "desc":
-            statement = statement.order_by(sort_column.desc())
+        if sort_by == "relevance":
+            if self._match_query(search):
+                # FTS5 rank is bm25: lower is more relevant
+                statement = statement.order_by(authors_fts.c.rank, self.model.id)
+            else:
+                statement = statement.order_by(self.model.last_name)
         else:
-            statement = statement.order_by(sort_column)
+            sort_column = getattr(self.model, sort_by)
+            if order == "desc":
+                statement = statement.order_by(sort_column.desc())
+            else:
+                statement = statement.order_by(sort_column)
 
-        total_statement = select(func.count()).select_from(statement.subquery())
-        total_result = await self.session.execute(total_statement)
-        total = total_result.scalar_one()
+        statement = self._project_columns(statement, columns)
         offset = (page - 1) * page_size
         statement = statement.offset(offset).limit(page_size)
-        result = await self.session.execute(statement)
+        result = await self.read_session.execute(statement)
         items = result.scalars().all()
         return items, total
+
+    async def get_all_keyset(
+        self,
+        page_size: int,
+        cursor: str | None = None,
+        search: str | None = None,
+        nationality: str | None = None,
+        sort_by: str = "last_name",
+        order: str = "asc",
+        columns: Sequence[str] | None = None,
+    ):
+        """
+        Retrieve a page of authors using keyset (cursor) pagination.
+
+        - **page_size**: Number of items per page
+        - **cursor**: Cursor returned by the previous page, None for the first page
+        - **search**: Search term for name or biography
+        - **nationality**: Filter by nationality
+        - **sort_by**: Sort field
+        - **order**: Sort order (asc or desc)
+        - **columns**: Load only these columns (None loads every column)
+        """
+        statement = self._filtered_statement(search, nationality)
+
+        # The sort column is read back from the last row to build the next cursor
+        statement = self._project_columns(statement, columns, sort_by)
+        cursor_values = decode_cursor(cursor, sort_by, order) if cursor else None
+        sort_column = getattr(self.model, sort_by)
+        statement = apply_keyset(
+            statement, sort_column, self.model.id, order, cursor_values
+        )
+
+        # Fetch one extra row to know whether another page exists
+        result = await self.read_session.execute(statement.limit(page_size + 1))
+        items = result.scalars().all()
+        next_cursor = None
+        if len(items) > page_size:
+            items = items[:page_size]
+            last = items[-1]
+            next_cursor = encode_cursor(sort_by, order, getattr(last, sort_by), last.id)
+        return items, next_cursor
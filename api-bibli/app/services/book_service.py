@@ -1,11 +1,23 @@
-from sqlalchemy import func, select
+from typing import Sequence
+
+from sqlalchemy import select
+from app.core.pagination import apply_keyset, decode_cursor, encode_cursor
+from app.data.search import books_fts, build_match_query, supports_fts
 from app.services.template_service import TemplateService
-from app.data.orm import Book, SessionDep
+from app.data.orm import Book, ReadSessionDep, SessionDep
 
 
 class BookService(TemplateService[Book]):
-    def __init__(self, session: SessionDep):
-        super().__init__(session, Book)
+    counter_column = "category"
+    snapshot_count = "total_books"
+    snapshot_sums = {
+        "total_copies": "total_copies_owned",
+        "available_copies": "available_copies",
+    }
+    unique_keys = (("isbn",),)
+
+    def __init__(self, session: SessionDep, read_session: ReadSessionDep = None):
+        super().__init__(session, Book, read_session)
 
     async def get_by_isbn(self, isbn: str):
         """
@@ -13,9 +25,53 @@ class BookService(TemplateService[Book]):
 
         - **isbn**: The ISBN of the book
         """
-        statement = select(self.model).where(self.model.isbn == isbn)
-        result = await self.session.execute(statement)
-        return result.first()
+        return await self.get_by_unique(("isbn",), (isbn,))
+
+    def _bulk_key(self, data: dict):
+        return data["isbn"]
+
+    async def _existing_bulk_keys(self, keys: set) -> set:
+        result = await self.session.execute(
+            select(self.model.isbn).where(self.model.isbn.in_(keys))
+        )
+        return set(result.scalars().all())
+
+    def _match_query(self, search: str | None) -> str | None:
+        if not search or not supports_fts(self.read_session):
+            return None
+        return build_match_query(search)
+
+    def _filtered_statement(
+        self,
+        search: str | None = None,
+        isbn: str | None = None,
+        category: str | None = None,
+        language: str | None = None,
+    ):
+        statement = select(self.model)
+        if search:
+            match_query = self._match_query(search)
+            if match_query:
+                statement = statement.join(
+                    books_fts, books_fts.c.rowid == self.model.id
+                ).where(books_fts.c.books_fts.match(match_query))
+            else:
+                # No FTS on this backend, or no word to match (e.g. punctuation only)
+                statement = statement.where(
+                    (self.model.title.ilike(f"%{search}%"))
+                    | (self.model.description.ilike(f"%{search}%"))
+                )
+
+        if isbn:
+            statement = statement.where((self.model.isbn.ilike(f"%{isbn}%")))
+
+        if category:
+            statement = statement.where(self.model.category == category)
+
+        if language:
+            statement = statement.where(self.model.language == language)
+
+        return statement
 
     async def get_all_filtered(
         self,
@@ -27,6 +83,9 @@ class BookService(TemplateService[Book]):
         language: str | None = None,
         sort_by: str = "title",
         order: str = "asc",
+        include_total: bool = True,
+        count_mode: str = "exact",
+        columns: Sequence[str] | None = None,
     ):
         """
         Retrieve a paginated list of books with optional filtering.
@@ -37,36 +96,81 @@ class BookService(TemplateService[Book]):
         - **isbn**: Filter by ISBN
         - **category**: Filter by category
         - **language**: Filter by language
-        - **sort_by**: Sort field
+        - **sort_by**: Sort field, or "relevance" to rank search matches
         - **order**: Sort order (asc or desc)
+        - **include_total**: Whether to compute the total count
+        - **count_mode**: How to compute the total (exact or estimated)
+        - **columns**: Load only these columns (None loads every column)
         """
-        statement = select(self.model)
-        if search:
-            statement = statement.where(
-                (self.model.title.ilike(f"%{search}%"))
-                | (self.model.description.ilike(f"%{search}%"))
-            )
+        statement = self._filtered_statement(search, isbn, category, language)
+        total = await self.count_filtered(
+            statement,
+            {"search": search, "isbn": isbn, "category": category, "language": language},
+            include_total,
+            count_mode,
+        )
 
-        if isbn:
-            statement = statement.where((self.model.isbn.ilike(f"%{isbn}%")))
-
-        if category:
-            statement = statement.where(self.model.category == category)
-
-        if language:
-            statement = statement.where(self.model.language == language)
-
-        sort_column = getattr(self.model, sort_by)
-        if order == "desc":
-            statement = statement.order_by(sort_column.desc())
+        if sort_by == "relevance":
+            if self._match_query(search):
+                # FTS5 rank is bm25: lower is more relevant
+                statement = statement.order_by(books_fts.c.rank, self.model.id)
+            else:
+                statement = statement.order_by(self.model.title)
         else:
-            statement = statement.order_by(sort_column)
+            sort_column = getattr(self.model, sort_by)
+            if order == "desc":
+                statement = statement.order_by(sort_column.desc())
+            else:
+                statement = statement.order_by(sort_column)
 
-        total_statement = select(func.count()).select_from(statement.subquery())
-        total_result = await self.session.execute(total_statement)
-        total = total_result.scalar_one()
+        statement = self._project_columns(statement, columns)
         offset = (page - 1) * page_size
         statement = statement.offset(offset).limit(page_size)
-        result = await self.session.execute(statement)
+        result = await self.read_session.execute(statement)
         items = result.scalars().all()
         return items, total
+
+    async def get_all_keyset(
+        self,
+        page_size: int,
+        cursor: str | None = None,
+        search: str | None = None,
+        isbn: str | None = None,
+        category: str | None = None,
+        language: str | None = None,
+        sort_by: str = "title",
+        order: str = "asc",
+        columns: Sequence[str] | None = None,
+    ):
+        """
+        Retrieve a page of books using keyset (cursor) pagination.
+
+        - **page_size**: Number of items per page
+        - **cursor**: Cursor returned by the previous page, None for the first page
+        - **search**: Search term for title or description
+        - **isbn**: Filter by ISBN
+        - **category**: Filter by category
+        - **language**: Filter by language
+        - **sort_by**: Sort field
+        - **order**: Sort order (asc or desc)
+        - **columns**: Load only these columns (None loads every column)
+        """
+        statement = self._filtered_statement(search, isbn, category, language)
+
+        # The sort column is read back from the last row to build the next cursor
+        statement = self._project_columns(statement, columns, sort_by)
+        cursor_values = decode_cursor(cursor, sort_by, order) if cursor else None
+        sort_column = getattr(self.model, sort_by)
+        statement = apply_keyset(
+            statement, sort_column, self.model.id, order, cursor_values
+        )
+
+        # Fetch one extra row to know whether another page exists
+        result = await self.read_session.execute(statement.limit(page_size + 1))
+        items = result.scalars().all()
+        next_cursor = None
+        if len(items) > page_size:
+            items = items[:page_size]
+            last = items[-1]
+            next_cursor = encode_cursor(sort_by, order, getattr(last, sort_by), last.id)
+        return items, next_cursor
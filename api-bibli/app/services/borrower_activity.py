@@ -0,0 +1,136 @@
+"""
+Borrower activity counters: total loans, current loans and late returns.
+
+By default they are computed from the loans table in one conditional
+aggregation grouped by borrower. With LIBRARY_BORROWER_COUNTERS enabled, they
+are also kept in the `borrower_activity` table on every checkout and return
+(rebuilt from the loans on startup): reports read that table, and the checkout
+loan limit reads the borrower's current_loans instead of counting loans.
+"""
+from sqlalchemy import case, delete, func, insert, select, update
+
+from app.core.config import env_bool
+from app.data.orm import BorrowerActivity, Loan
+
+COUNTERS_ENABLED = env_bool("LIBRARY_BORROWER_COUNTERS", False)
+
+
+def _upsert(session):
+    if session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert(BorrowerActivity)
+
+
+def activity_statement():
+    """
+    Counters of every borrower from the loans table, in one grouped pass.
+    Returns the statement and the borrower column to filter and sort on.
+    """
+    statement = select(
+        Loan.borrower_mail.label("borrower_mail"),
+        func.max(Loan.borrower_name).label("full_name"),
+        func.count(Loan.id).label("total_loans"),
+        func.sum(case((Loan.return_date.is_(None), 1), else_=0)).label("current_loans"),
+        func.sum(case((Loan.return_date > Loan.due_date, 1), else_=0)).label("late_returns"),
+    ).group_by(Loan.borrower_mail)
+    return statement, Loan.borrower_mail
+
+
+def counters_statement():
+    """Same columns as `activity_statement`, read from the maintained counters."""
+    statement = select(
+        BorrowerActivity.borrower_mail,
+        BorrowerActivity.borrower_name.label("full_name"),
+        BorrowerActivity.total_loans,
+        BorrowerActivity.current_loans,
+        BorrowerActivity.late_returns,
+    )
+    return statement, BorrowerActivity.borrower_mail
+
+
+def activity_source():
+    """The counters statement when counters are maintained, the aggregation otherwise."""
+    return counters_statement() if COUNTERS_ENABLED else activity_statement()
+
+
+def current_loans_statement(borrower_mail: str):
+    """
+    Scalar select of a borrower's maintained current_loans (0 if unknown).
+
+    - **borrower_mail**: The borrower's email
+    """
+    return select(func.coalesce(func.max(BorrowerActivity.current_loans), 0)).where(
+        BorrowerActivity.borrower_mail == borrower_mail
+    )
+
+
+async def record_borrower_checkouts(session, loans: dict[str, tuple[str, int]]) -> None:
+    """
+    Count new loans per borrower (no-op unless counters are enabled).
+
+    - **session**: The database session (the caller commits)
+    - **loans**: Borrower email to (borrower name, number of new loans)
+    """
+    if not COUNTERS_ENABLED or not loans:
+        return
+    statement = _upsert(session)
+    statement = statement.on_conflict_do_update(
+        index_elements=[BorrowerActivity.borrower_mail],
+        set_={
+            "borrower_name": statement.excluded.borrower_name,
+            "total_loans": BorrowerActivity.total_loans + statement.excluded.total_loans,
+            "current_loans": BorrowerActivity.current_loans + statement.excluded.current_loans,
+        },
+    )
+    await session.execute(
+        statement,
+        [
+            {
+                "borrower_mail": mail,
+                "borrower_name": name,
+                "total_loans": count,
+                "current_loans": count,
+                "late_returns": 0,
+            }
+            for mail, (name, count) in loans.items()
+        ],
+    )
+
+
+async def record_borrower_return(session, loan: Loan) -> None:
+    """
+    Count a returned loan (no-op unless counters are enabled).
+
+    - **session**: The database session (the caller commits)
+    - **loan**: The loan, with its return date set
+    """
+    if not COUNTERS_ENABLED:
+        return
+    late = 1 if loan.return_date > loan.due_date else 0
+    await session.execute(
+        update(BorrowerActivity)
+        .where(BorrowerActivity.borrower_mail == loan.borrower_mail)
+        .values(
+            current_loans=BorrowerActivity.current_loans - 1,
+            late_returns=BorrowerActivity.late_returns + late,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def rebuild_borrower_activity(session) -> None:
+    """
+    Rebuild `borrower_activity` from the loans table in one INSERT ... SELECT.
+
+    - **session**: The database session (the caller commits)
+    """
+    statement, _ = activity_statement()
+    await session.execute(delete(BorrowerActivity))
+    await session.execute(
+        insert(BorrowerActivity).from_select(
+            ["borrower_mail", "borrower_name", "total_loans", "current_loans", "late_returns"],
+            statement,
+        )
+    )
@@ -0,0 +1,133 @@
+import zlib
+from typing import AsyncIterator, Protocol
+
+from sqlalchemy import func, select
+from app.core.offload import report_pool
+from app.data.orm import Author, Book, Loan, ReadSessionDep
+from app.services.borrower_activity import activity_source
+from app.services.report_compute import encode_rows
+from app.services.stats_service import never_borrowed_statement
+
+EXPORT_MODELS = {"books": Book, "authors": Author, "loans": Loan}
+
+# Rows fetched from the server-side cursor and encoded per chunk
+CHUNK_ROWS = 1000
+
+
+class ExportProgress(Protocol):
+    """Receives the row count of an export, then the rows encoded chunk by chunk."""
+
+    async def started(self, total: int | None) -> None: ...
+
+    async def advance(self, rows: int) -> None: ...
+
+
+class ExportService:
+    def __init__(self, session: ReadSessionDep):
+        self.session = session
+
+    async def _rows(self, statement) -> AsyncIterator[tuple[list[str], list]]:
+        result = await self.session.stream(
+            statement.execution_options(yield_per=CHUNK_ROWS)
+        )
+        names = list(result.keys())
+        async for partition in result.partitions(CHUNK_ROWS):
+            yield names, partition
+
+    async def _encode(
+        self, statement, fmt: str, progress: ExportProgress | None = None
+    ) -> AsyncIterator[bytes]:
+        if progress is not None:
+            await progress.started(
+                await self.session.scalar(
+                    select(func.count()).select_from(statement.order_by(None).subquery())
+                )
+            )
+        header_written = False
+        async for names, rows in self._rows(statement):
+            # Full chunks are encoded in a worker process, off the event loop
+            yield await report_pool.run(
+                encode_rows,
+                names,
+                [tuple(row) for row in rows],
+                fmt,
+                fmt == "csv" and not header_written,
+                rows=len(rows),
+            )
+            header_written = True
+            if progress is not None:
+                await progress.advance(len(rows))
+
+        if fmt == "csv" and not header_written:
+            # No rows: still send the header
+            names = [column.name for column in statement.selected_columns]
+            yield (",".join(names) + "\r\n").encode()
+
+    async def _stream(
+        self, statement, fmt: str, compress: bool, progress: ExportProgress | None = None
+    ) -> AsyncIterator[bytes]:
+        if not compress:
+            async for chunk in self._encode(statement, fmt, progress):
+                yield chunk
+            return
+
+        compressor = zlib.compressobj(wbits=31)  # gzip container
+        async for chunk in self._encode(statement, fmt, progress):
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
+
+    def stream_table(
+        self,
+        table: str,
+        fmt: str = "csv",
+        compress: bool = False,
+        progress: ExportProgress | None = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        Stream a whole table as CSV or NDJSON, chunk by chunk.
+
+        Rows are read from a server-side cursor, so memory use does not depend
+        on the table size.
+
+        - **table**: books, authors or loans
+        - **fmt**: csv or ndjson
+        - **compress**: Gzip the stream
+        - **progress**: Told the row count (one more query) and the rows encoded
+        """
+        columns = list(EXPORT_MODELS[table].__table__.columns)
+        statement = select(*columns).order_by(columns[0])
+        return self._stream(statement, fmt, compress, progress)
+
+    def stream_never_borrowed(
+        self,
+        fmt: str = "csv",
+        compress: bool = False,
+        progress: ExportProgress | None = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        Stream every never borrowed book (book_id, title, added_date) by title.
+
+        - **fmt**: csv or ndjson
+        - **compress**: Gzip the stream
+        - **progress**: Told the row count (one more query) and the rows encoded
+        """
+        statement = never_borrowed_statement().order_by(Book.title, Book.id)
+        return self._stream(statement, fmt, compress, progress)
+
+    def stream_borrower_activity(
+        self,
+        fmt: str = "csv",
+        compress: bool = False,
+        progress: ExportProgress | None = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        Stream the loan counters of every borrower, by email.
+
+        - **fmt**: csv or ndjson
+        - **compress**: Gzip the stream
+        - **progress**: Told the row count (one more query) and the rows encoded
+        """
+        statement, mail = activity_source()
+        return self._stream(statement.order_by(mail), fmt, compress, progress)
@@ -0,0 +1,65 @@
+"""
+Late penalties as SQL expressions.
+
+Loan pages and the fines report compute days late and penalties in the
+database, so they cost nothing per row on the Python side.
+"""
+from datetime import datetime
+
+from sqlalchemy import Integer, case, cast, extract, func, literal
+from app.data.orm import Loan
+
+PENALTY_RATE_PER_DAY = 0.5
+MAX_PENALTY = 10.0
+
+
+def calculate_penalty(due_date: datetime, return_date: datetime) -> tuple[float, int]:
+    """
+    Penalty and days late for one loan (same rule as the SQL expressions).
+
+    - **due_date**: The due date
+    - **return_date**: The return date, or now for an active loan
+    """
+    if return_date <= due_date:
+        return 0.0, 0
+
+    days_late = (return_date - due_date).days
+    penalty = min(days_late * PENALTY_RATE_PER_DAY, MAX_PENALTY)
+    return round(penalty, 2), days_late
+
+
+def days_late_expression(dialect: str, now: datetime):
+    """
+    Whole days between the due date and the return date (or now), 0 when on time.
+
+    - **dialect**: Name of the database dialect
+    - **now**: Reference time for active loans
+    """
+    end = func.coalesce(Loan.return_date, literal(now))
+    if dialect == "sqlite":
+        elapsed = cast(func.julianday(end) - func.julianday(Loan.due_date), Integer)
+    else:
+        elapsed = cast(extract("day", end - Loan.due_date), Integer)
+    return case((end > Loan.due_date, elapsed), else_=0)
+
+
+def penalty_expression(days_late):
+    """
+    Penalty for a days late expression, capped at MAX_PENALTY.
+
+    - **days_late**: Expression returned by days_late_expression
+    """
+    penalty = days_late * PENALTY_RATE_PER_DAY
+    return case((penalty > MAX_PENALTY, MAX_PENALTY), else_=penalty)
+
+
+def month_expression(dialect: str, column):
+    """
+    "YYYY-MM" of a datetime column.
+
+    - **dialect**: Name of the database dialect
+    - **column**: The datetime column
+    """
+    if dialect == "sqlite":
+        return func.strftime("%Y-%m", column)
+    return func.to_char(column, "YYYY-MM")
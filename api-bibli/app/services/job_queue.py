@@ -0,0 +1,302 @@
+"""
+Background jobs for heavy reports and exports.
+
+`POST /jobs` records a job in the `jobs` table and returns at once; a fixed
+number of worker tasks started in the application lifespan run the jobs in
+submission order and write their result to a file under the results directory.
+Jobs left pending or interrupted while running are queued again on startup,
+which supposes a single process runs the queue; each job is claimed with a
+conditional update, so a job queued twice still runs once.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable
+
+from pydantic import BaseModel
+from sqlalchemy import select, update
+
+from app.core.serialization import render
+from app.data.models import JobStatus
+from app.data.orm import Job
+from app.schemas.job import (
+    ExportParams, FinesReportParams, MonthlyReportParams, StreamParams
+)
+from app.services.export_service import ExportService
+from app.services.stats_service import StatsService
+
+logger = logging.getLogger(__name__)
+
+# Seconds between two writes of the progress of a running job
+PROGRESS_INTERVAL_SECONDS = 0.5
+
+MEDIA_TYPES = {
+    ".json": "application/json",
+    ".csv": "text/csv",
+    ".ndjson": "application/x-ndjson",
+    ".gz": "application/gzip",
+}
+
+
+def media_type(name: str) -> str:
+    """Media type of a result file, from its extension."""
+    return MEDIA_TYPES.get(Path(name).suffix, "application/octet-stream")
+
+
+class JobProgress:
+    """Rows written by a running job, saved to its row at most every interval."""
+
+    def __init__(self, session_factory, job_id: int):
+        self.session_factory = session_factory
+        self.job_id = job_id
+        self.done = 0
+        self.total: int | None = None
+        self._saved_at = 0.0
+
+    async def started(self, total: int | None) -> None:
+        self.total = total
+        await self._save()
+
+    async def advance(self, rows: int) -> None:
+        self.done += rows
+        if time.monotonic() - self._saved_at >= PROGRESS_INTERVAL_SECONDS:
+            await self._save()
+
+    async def _save(self) -> None:
+        self._saved_at = time.monotonic()
+        async with self.session_factory() as session:
+            await session.execute(
+                update(Job)
+                .where(Job.id == self.job_id)
+                .values(rows_done=self.done, rows_total=self.total)
+            )
+            await session.commit()
+
+
+@dataclass
+class JobContext:
+    stats: StatsService
+    exports: ExportService
+    progress: JobProgress
+
+
+@dataclass(frozen=True)
+class JobDefinition:
+    """
+    A kind of job.
+
+    - **params**: Schema of the job parameters
+    - **run**: Yields the result file content, chunk by chunk
+    - **result_name**: Name of the result file, from the parameters
+    """
+
+    params: type[BaseModel]
+    run: Callable[[JobContext, Any], AsyncIterator[bytes]]
+    result_name: Callable[[Any], str]
+
+
+def _stream_name(base: str, params: StreamParams) -> str:
+    return f"{base}.{params.format}" + (".gz" if params.gzip else "")
+
+
+async def _monthly_report(context: JobContext, params: MonthlyReportParams):
+    report = await context.stats.get_monthly_report(params.start, params.end)
+    await context.progress.advance(len(report))
+    yield render(report)
+
+
+async def _fines_report(context: JobContext, params: FinesReportParams):
+    report = await context.stats.get_fines_report(params.limit)
+    await context.progress.advance(len(report["by_borrower"]))
+    yield render(report)
+
+
+JOB_KINDS: dict[str, JobDefinition] = {
+    "monthly_report": JobDefinition(
+        MonthlyReportParams,
+        _monthly_report,
+        lambda p: f"monthly_report_{p.start}_{p.end}.json",
+    ),
+    "fines_report": JobDefinition(
+        FinesReportParams, _fines_report, lambda p: "fines_report.json"
+    ),
+    "borrower_activity": JobDefinition(
+        StreamParams,
+        lambda c, p: c.exports.stream_borrower_activity(p.format, p.gzip, c.progress),
+        lambda p: _stream_name("borrower_activity", p),
+    ),
+    "never_borrowed": JobDefinition(
+        StreamParams,
+        lambda c, p: c.exports.stream_never_borrowed(p.format, p.gzip, c.progress),
+        lambda p: _stream_name("never_borrowed", p),
+    ),
+    "export": JobDefinition(
+        ExportParams,
+        lambda c, p: c.exports.stream_table(p.table, p.format, p.gzip, c.progress),
+        lambda p: _stream_name(p.table, p),
+    ),
+}
+
+
+class JobQueue:
+    """
+    Runs submitted jobs on `workers` tasks of the event loop.
+
+    - **session_factory**: Callable returning a new AsyncSession, for the jobs table
+    - **read_session_factory**: Sessions the reports read from (default: session_factory)
+    - **results_dir**: Directory of the result files
+    - **workers**: Jobs run at the same time
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        read_session_factory=None,
+        results_dir: str | Path = "./job_results",
+        workers: int = 2,
+    ):
+        self.session_factory = session_factory
+        self.read_session_factory = read_session_factory or session_factory
+        self.results_dir = Path(results_dir)
+        self.workers = workers
+        self.queue: asyncio.Queue[int] = asyncio.Queue()
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self) -> None:
+        """
+        Queue the unfinished jobs again, then start the workers.
+
+        Every RUNNING job is taken as interrupted, so a single application
+        process may run the queue on a given jobs table: a second process
+        starting would run again the jobs of the first one.
+        """
+        self.results_dir.mkdir(parents=True, exist_ok=True)
+        async with self.session_factory() as session:
+            # Interrupted by a shutdown: run again from the start
+            await session.execute(
+                update(Job)
+                .where(Job.status == JobStatus.RUNNING)
+                .values(status=JobStatus.PENDING, started_at=None, rows_done=0)
+            )
+            await session.commit()
+            pending = await session.scalars(
+                select(Job.id).where(Job.status == JobStatus.PENDING).order_by(Job.id)
+            )
+            for job_id in pending:
+                self.queue.put_nowait(job_id)
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Cancel the workers; running jobs stay RUNNING and run again on the next start."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def join(self) -> None:
+        """Wait until every queued job has finished."""
+        await self.queue.join()
+
+    async def submit(self, kind: str, params: dict) -> Job:
+        """
+        Record a job and queue it. Raises ValueError for an unknown kind or invalid parameters.
+
+        - **kind**: One of `JOB_KINDS`
+        - **params**: Parameters of the job kind
+        """
+        definition = JOB_KINDS.get(kind)
+        if definition is None:
+            raise ValueError(f"Unknown job kind: {kind}")
+        values = definition.params.model_validate(params)
+        job = Job(
+            kind=kind,
+            params=json.dumps(values.model_dump(mode="json", by_alias=True)),
+            status=JobStatus.PENDING,
+            rows_done=0,
+            result_name=definition.result_name(values),
+        )
+        async with self.session_factory() as session:
+            session.add(job)
+            await session.commit()
+        self.queue.put_nowait(job.id)
+        return job
+
+    async def get(self, job_id: int) -> Job | None:
+        """
+        Retrieve a job by its ID.
+
+        - **job_id**: The ID of the job
+        """
+        async with self.session_factory() as session:
+            return await session.get(Job, job_id)
+
+    async def _work(self) -> None:
+        while True:
+            job_id = await self.queue.get()
+            try:
+                await self._run(job_id)
+            except Exception:
+                logger.exception("Job %d could not be run", job_id)
+            finally:
+                self.queue.task_done()
+
+    async def _claim(self, job_id: int) -> Job | None:
+        """
+        Move a pending job to RUNNING, None if it is missing or another worker claimed it.
+
+        - **job_id**: The ID of the job
+        """
+        async with self.session_factory() as session:
+            # Conditional update: only one worker sees the row still pending
+            result = await session.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == JobStatus.PENDING)
+                .values(status=JobStatus.RUNNING, started_at=datetime.now())
+            )
+            await session.commit()
+            if result.rowcount != 1:
+                return None
+            return await session.get(Job, job_id)
+
+    async def _run(self, job_id: int) -> None:
+        job = await self._claim(job_id)
+        if job is None:
+            return
+
+        definition = JOB_KINDS[job.kind]
+        params = definition.params.model_validate(json.loads(job.params))
+        path = self.results_dir / f"{job.id}-{job.result_name}"
+        partial = path.with_name(path.name + ".part")
+        progress = JobProgress(self.session_factory, job.id)
+        try:
+            async with self.session_factory() as session, self.read_session_factory() as read_session:
+                context = JobContext(
+                    StatsService(session, read_session), ExportService(read_session), progress
+                )
+                with open(partial, "wb") as output:
+                    async for chunk in definition.run(context, params):
+                        await asyncio.to_thread(output.write, chunk)
+            os.replace(partial, path)
+            values = {"status": JobStatus.SUCCEEDED, "result_path": str(path)}
+        except Exception as e:
+            logger.exception("Job %d (%s) failed", job.id, job.kind)
+            partial.unlink(missing_ok=True)
+            values = {"status": JobStatus.FAILED, "error": str(e) or type(e).__name__}
+
+        async with self.session_factory() as session:
+            await session.execute(
+                update(Job)
+                .where(Job.id == job.id)
+                .values(
+                    rows_done=progress.done,
+                    rows_total=progress.total,
+                    finished_at=datetime.now(),
+                    **values,
+                )
+            )
+            await session.commit()
@@ -0,0 +1,187 @@
+"""
+In-process popularity leaderboards (most borrowed books / authors).
+
+Loan counts are kept per day for the longest window only (30 days) plus one
+all-time counter per entity, so memory is bounded by the catalogue size and
+30 daily buckets. Rolling totals per window are updated on every checkout and
+when days fall out of a window, and kept in rank order, so top-N reads only
+slice the head of each window's ranking.
+"""
+from bisect import bisect_left, insort
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func, select
+from app.data.orm import Book, Loan
+
+WINDOWS = {"7d": 7, "30d": 30, "all": None}
+
+
+class RankedCounts:
+    """Loan counts by entity, ordered by count (highest first, then lowest ID)."""
+
+    def __init__(self, counts: dict | None = None):
+        self._counts: dict = {key: count for key, count in (counts or {}).items() if count > 0}
+        # Sorted (-count, key) pairs, built in one sort when loading many counts
+        self._ranking: list[tuple] = sorted((-count, key) for key, count in self._counts.items())
+
+    def __getitem__(self, key) -> int:
+        return self._counts.get(key, 0)
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def add(self, key, delta: int) -> None:
+        """Add to an entity's count (negative to remove), dropping it at zero."""
+        old = self._counts.get(key, 0)
+        if old:
+            del self._ranking[bisect_left(self._ranking, (-old, key))]
+        new = old + delta
+        if new > 0:
+            self._counts[key] = new
+            insort(self._ranking, (-new, key))
+        else:
+            self._counts.pop(key, None)
+
+    def top(self, limit: int) -> list[tuple]:
+        return [(key, -count) for count, key in self._ranking[:limit]]
+
+
+class Leaderboard:
+    def __init__(self, windows: dict[str, int | None] = WINDOWS):
+        self.windows = windows
+        self.max_days = max(days for days in windows.values() if days)
+        self.clear()
+
+    def clear(self) -> None:
+        self._days: dict[date, Counter] = {}
+        self._totals: dict[str, RankedCounts] = {name: RankedCounts() for name in self.windows}
+        self._today: date | None = None
+
+    def _window_start(self, days: int, today: date) -> date:
+        return today - timedelta(days=days - 1)
+
+    def _advance(self, today: date) -> None:
+        """Drop the days that fell out of each window since the last call."""
+        if self._today is None:
+            self._today = today
+        if today <= self._today:
+            return
+        for name, days in self.windows.items():
+            if not days:
+                continue
+            old_start = self._window_start(days, self._today)
+            new_start = self._window_start(days, today)
+            day = old_start
+            while day < new_start:
+                for key, count in self._days.get(day, {}).items():
+                    self._totals[name].add(key, -count)
+                day += timedelta(days=1)
+        oldest = self._window_start(self.max_days, today)
+        for day in [d for d in self._days if d < oldest]:
+            del self._days[day]
+        self._today = today
+
+    def record(self, key, when: datetime, count: int = 1) -> None:
+        """
+        Count loans for an entity.
+
+        - **key**: The entity ID (book or author)
+        - **when**: The loan date
+        - **count**: Number of loans to add
+        """
+        today = datetime.now().date()
+        self._advance(today)
+        day = when.date()
+        self._totals["all"].add(key, count)
+        if day < self._window_start(self.max_days, today):
+            return
+        self._days.setdefault(day, Counter())[key] += count
+        for name, days in self.windows.items():
+            if days and day >= self._window_start(days, today):
+                self._totals[name].add(key, count)
+
+    def load(self, all_time: dict, days: dict[date, Counter]) -> None:
+        """
+        Replace every count (used when loading from the database).
+
+        - **all_time**: All-time loans by entity
+        - **days**: Loans by day and entity, for the days of the longest window
+        """
+        today = datetime.now().date()
+        self._today = today
+        self._days = {
+            day: counts
+            for day, counts in days.items()
+            if day >= self._window_start(self.max_days, today)
+        }
+        for name, window_days in self.windows.items():
+            if not window_days:
+                self._totals[name] = RankedCounts(all_time)
+                continue
+            start = self._window_start(window_days, today)
+            totals = Counter()
+            for day, counts in self._days.items():
+                if day >= start:
+                    totals.update(counts)
+            self._totals[name] = RankedCounts(totals)
+
+    def top(self, window: str, limit: int) -> list[tuple]:
+        """
+        Return the `limit` entities with the most loans in the window, as (key, loans);
+        ties are ordered by ID.
+
+        - **window**: One of the configured windows (7d, 30d, all)
+        - **limit**: Number of entries
+        """
+        self._advance(datetime.now().date())
+        return self._totals[window].top(limit)
+
+
+book_leaderboard = Leaderboard()
+author_leaderboard = Leaderboard()
+
+
+def record_loan(book_id: int, author_id: int, when: datetime, count: int = 1) -> None:
+    """Count new loans in both leaderboards."""
+    book_leaderboard.record(book_id, when, count)
+    author_leaderboard.record(author_id, when, count)
+
+
+async def rebuild_leaderboards(session) -> None:
+    """
+    Reload both leaderboards from the database (called on startup).
+
+    - **session**: The database session
+    """
+    # All-time counts: one aggregate per book
+    book_totals: Counter = Counter()
+    author_totals: Counter = Counter()
+    all_time = await session.execute(
+        select(Loan.book_id, Book.author_id, func.count(Loan.id))
+        .join(Book, Book.id == Loan.book_id)
+        .group_by(Loan.book_id, Book.author_id)
+    )
+    for book_id, author_id, loans in all_time:
+        book_totals[book_id] += loans
+        author_totals[author_id] += loans
+
+    # Daily buckets for the windowed boards
+    book_days: dict[date, Counter] = {}
+    author_days: dict[date, Counter] = {}
+    since = datetime.combine(
+        datetime.now().date() - timedelta(days=book_leaderboard.max_days - 1),
+        datetime.min.time(),
+    )
+    recent = await session.stream(
+        select(Loan.book_id, Book.author_id, Loan.loan_date)
+        .join(Book, Book.id == Loan.book_id)
+        .where(Loan.loan_date >= since)
+    )
+    async for book_id, author_id, loan_date in recent:
+        book_days.setdefault(loan_date.date(), Counter())[book_id] += 1
+        author_days.setdefault(loan_date.date(), Counter())[author_id] += 1
+
+    # Each ranking is sorted once instead of once per loan
+    book_leaderboard.load(book_totals, book_days)
+    author_leaderboard.load(author_totals, author_days)
@@ -0,0 +1,169 @@
+"""
+Running per-book loan counters (`loan_histories`).
+
+LoanService updates a book's row on every checkout and return, so per-book
+statistics and the popularity ranking are read from a single row. Rebuild the
+table from the existing loans with:
+
+    python -m app.services.loan_history --backfill
+"""
+import argparse
+import asyncio
+
+from sqlalchemy import delete, func, select, update
+from app.data.orm import LoanHistory, Loan
+
+
+async def record_checkout(session, book_id: int, count: int = 1) -> None:
+    """
+    Count new loans for a book and move it up the popularity ranking.
+
+    Ranks are competition ranks (1 + number of books with a strictly higher
+    score), so only the books it overtakes or leaves a tie with move down.
+
+    - **session**: The database session (the caller commits)
+    - **book_id**: The ID of the borrowed book
+    - **count**: Number of new loans
+    """
+    result = await session.execute(
+        select(LoanHistory).where(LoanHistory.book_id == book_id)
+    )
+    history = result.scalar_one_or_none()
+    old_score = history.popularity_score if history else 0
+    new_score = old_score + count
+
+    await session.execute(
+        update(LoanHistory)
+        .where(
+            LoanHistory.popularity_score >= old_score,
+            LoanHistory.popularity_score < new_score,
+            LoanHistory.book_id != book_id,
+        )
+        .values(popularity_rank=LoanHistory.popularity_rank + 1)
+        .execution_options(synchronize_session=False)
+    )
+    higher = await session.scalar(
+        select(func.count(LoanHistory.id)).where(LoanHistory.popularity_score > new_score)
+    )
+
+    if history is None:
+        history = LoanHistory(
+            book_id=book_id,
+            total_loans=0,
+            returned_loans=0,
+            times_late=0,
+            average_duration_days=0.0,
+        )
+        session.add(history)
+    history.total_loans += count
+    history.popularity_score = new_score
+    history.popularity_rank = higher + 1
+
+
+async def record_return(session, loan: Loan) -> None:
+    """
+    Fold a returned loan into the book's running duration mean and late count.
+
+    - **session**: The database session (the caller commits)
+    - **loan**: The loan, with its return date set
+    """
+    result = await session.execute(
+        select(LoanHistory).where(LoanHistory.book_id == loan.book_id)
+    )
+    history = result.scalar_one_or_none()
+    if history is None:
+        # Loan taken before the history was maintained, fixed by a backfill
+        return
+
+    duration = (loan.return_date - loan.loan_date).total_seconds() / 86400
+    history.returned_loans += 1
+    history.average_duration_days += (
+        duration - history.average_duration_days
+    ) / history.returned_loans
+    if loan.return_date > loan.due_date:
+        history.times_late += 1
+
+
+async def refresh_popularity_ranks(session) -> None:
+    """
+    Recompute every popularity rank in one pass.
+
+    - **session**: The database session (the caller commits)
+    """
+    ranked = select(
+        LoanHistory.id,
+        func.rank().over(order_by=LoanHistory.popularity_score.desc()),
+    )
+    rows = (await session.execute(ranked)).all()
+    if rows:
+        await session.execute(
+            update(LoanHistory),
+            [{"id": history_id, "popularity_rank": rank} for history_id, rank in rows],
+        )
+
+
+async def rebuild_loan_history(session) -> int:
+    """
+    Rebuild `loan_histories` from the loans table. Returns the number of books.
+
+    - **session**: The database session (the caller commits)
+    """
+    totals: dict[int, dict] = {}
+    result = await session.stream(
+        select(Loan.book_id, Loan.loan_date, Loan.due_date, Loan.return_date)
+    )
+    async for book_id, loan_date, due_date, return_date in result:
+        entry = totals.setdefault(
+            book_id, {"total": 0, "returned": 0, "late": 0, "days": 0.0}
+        )
+        entry["total"] += 1
+        if return_date is not None:
+            entry["returned"] += 1
+            entry["days"] += (return_date - loan_date).total_seconds() / 86400
+            if return_date > due_date:
+                entry["late"] += 1
+
+    await session.execute(delete(LoanHistory))
+    session.add_all(
+        LoanHistory(
+            book_id=book_id,
+            total_loans=entry["total"],
+            returned_loans=entry["returned"],
+            times_late=entry["late"],
+            average_duration_days=(
+                entry["days"] / entry["returned"] if entry["returned"] else 0.0
+            ),
+            popularity_score=entry["total"],
+        )
+        for book_id, entry in totals.items()
+    )
+    await session.flush()
+    await refresh_popularity_ranks(session)
+    return len(totals)
+
+
+async def _backfill():
+    from app.data.migrations import upgrade_schema
+    from app.data.orm import AsyncSessionLocal, Base, engine
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(upgrade_schema)
+    async with AsyncSessionLocal() as session:
+        count = await rebuild_loan_history(session)
+        await session.commit()
+    await engine.dispose()
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the per-book loan history")
+    parser.add_argument(
+        "--backfill", action="store_true", help="Rebuild the history from the loans"
+    )
+    args = parser.parse_args()
+    if args.backfill:
+        books = asyncio.run(_backfill())
+        print(f"Loan history rebuilt for {books} books")
+    else:
+        parser.print_help()
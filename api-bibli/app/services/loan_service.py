@@ -1,54 +1,57 @@
+from collections import Counter
 from datetime import datetime, timedelta
-from sqlalchemy import select, func, or_
+from sqlalchemy import bindparam, insert, select, func, or_, update
 from fastapi import HTTPException
+from app.core.counts import table_counters
+from app.core.pagination import apply_keyset, decode_cursor, encode_cursor
+from app.core.identity_cache import identity_cache
+from app.core.response_cache import response_cache
+from app.core.retry import DatabaseBusyError, retry_on_lock
+from app.services.fines import (
+    calculate_penalty,
+    days_late_expression,
+    penalty_expression,
+)
+from app.services import borrower_activity
+from app.services.borrower_activity import record_borrower_checkouts, record_borrower_return
+from app.services.leaderboard import record_loan
+from app.services.loan_history import record_checkout, record_return
+from app.services.stats_snapshot import apply_snapshot_deltas
 from app.services.template_service import TemplateService
-from app.data.orm import Loan, Book, SessionDep
+from app.data.orm import BorrowerActivity, Loan, Book, ReadSessionDep, SessionDep
 from app.data.models import LoanStatus
 from app.schemas.loan import LoanCreate, LoanReturn
 
 # Configuration constants
 MAX_LOANS_PER_USER = 5
 LOAN_DURATION_DAYS = 14
-PENALTY_RATE_PER_DAY = 0.5
-MAX_PENALTY = 10.0
 
 
 class LoanService(TemplateService[Loan]):
-    def __init__(self, session: SessionDep):
-        super().__init__(session, Loan)
+    counter_column = "status"
 
-    def _calculate_penalty(
-        self, due_date: datetime, return_date: datetime
-    ) -> tuple[float, int]:
-        if return_date <= due_date:
-            return 0.0, 0
+    def __init__(self, session: SessionDep, read_session: ReadSessionDep = None):
+        super().__init__(session, Loan, read_session)
 
-        days_late = (return_date - due_date).days
-        penalty = min(days_late * PENALTY_RATE_PER_DAY, MAX_PENALTY)
-        return round(penalty, 2), days_late
-
-    def _enrich_loan(self, loan: Loan, book_title: str | None = None):
+    def _enrich_loan(
+        self,
+        loan: Loan,
+        book_title: str | None = None,
+        days_late: int | None = None,
+        penalty: float | None = None,
+    ):
         """Helper to attach computed fields to the ORM object for the schema"""
-        # Update status based on time if active
-        if not loan.return_date and datetime.now() > loan.due_date:
-            loan.status = LoanStatus.OVERDUE
-
-        penalty = 0.0
-        days_late = 0
-
-        calc_date = loan.return_date if loan.return_date else datetime.now()
-        if loan.status == LoanStatus.OVERDUE or (
-            loan.return_date and loan.return_date > loan.due_date
-        ):
-            penalty, days_late = self._calculate_penalty(loan.due_date, calc_date)
+        # Read only: OVERDUE statuses are written by the overdue sweeper
+        if days_late is None:
+            # Not selected with the loan, compute it here
+            calc_date = loan.return_date if loan.return_date else datetime.now()
+            penalty, days_late = calculate_penalty(loan.due_date, calc_date)
 
         # Attach attributes dynamically so Pydantic can pick them up
         setattr(loan, "penalty", penalty)
         setattr(loan, "days_late", days_late)
         if book_title:
             setattr(loan, "book_title", book_title)
-        elif loan.book:
-            setattr(loan, "book_title", loan.book.title)
 
         return loan
 
@@ -56,37 +59,49 @@ class LoanService(TemplateService[Loan]):
         """
         Create a new loan.
 
+        The copy is taken with a conditional UPDATE that also checks the
+        borrower limit, so concurrent checkouts cannot oversell a book; the
+        transaction is retried with backoff when the database is locked.
+
         - **loan_data**: The loan data to create
         """
-        # 1. Check book existence
-        book_stmt = select(Book).where(Book.id == loan_data.book_id)
-        result = await self.session.execute(book_stmt)
-        book = result.scalar_one_or_none()
-
-        if not book:
-            raise HTTPException(status_code=404, detail="Book not found")
-
-        # 2. Check availability
-        if book.available_copies <= 0:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Book '{book.title}' is not currently available",
-            )
-
-        # 3. Check user loan limit
-        count_stmt = select(func.count()).where(
-            Loan.borrower_mail == loan_data.borrower_mail,
+        try:
+            return await retry_on_lock(self.session, lambda: self._checkout(loan_data))
+        except DatabaseBusyError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+
+    def _active_loans_statement(self, borrower_mail: str):
+        if borrower_activity.COUNTERS_ENABLED:
+            # Maintained counter: one primary key lookup instead of counting loans
+            return borrower_activity.current_loans_statement(borrower_mail)
+        return select(func.count()).where(
+            Loan.borrower_mail == borrower_mail,
             or_(Loan.status == LoanStatus.ON_LOAN, Loan.status == LoanStatus.OVERDUE),
         )
-        count_res = await self.session.execute(count_stmt)
-        active_loans = count_res.scalar_one()
 
-        if active_loans >= MAX_LOANS_PER_USER:
-            raise HTTPException(
-                status_code=400, detail=f"Loan limit reached ({MAX_LOANS_PER_USER} max)"
+    async def _checkout(self, loan_data: LoanCreate) -> Loan:
+        # 1. Take a copy, if one is left and the borrower is under the limit, in one
+        # conditional UPDATE: no read-then-write window, and the write lock is taken
+        # by the first statement
+        taken = await self.session.execute(
+            update(Book)
+            .where(
+                Book.id == loan_data.book_id,
+                Book.available_copies > 0,
+                self._active_loans_statement(loan_data.borrower_mail).scalar_subquery()
+                < MAX_LOANS_PER_USER,
             )
+            .values(available_copies=Book.available_copies - 1)
+            .returning(Book.title, Book.author_id)
+            .execution_options(synchronize_session=False)
+        )
+        row = taken.first()
+        if row is None:
+            await self.session.rollback()
+            await self._raise_checkout_refused(loan_data)
+        title, author_id = row
 
-        # 4. Create loan
+        # 2. Create loan
         now = datetime.now()
         due_date = now + timedelta(days=LOAN_DURATION_DAYS)
 
@@ -95,42 +110,62 @@ class LoanService(TemplateService[Loan]):
             loan_date=now,
             due_date=due_date,
             status=LoanStatus.ON_LOAN,
+            renewed=False,
         )
 
-        # 5. Update book copies
-        book.available_copies -= 1
-
         self.session.add(db_loan)
-        self.session.add(book)
+        await apply_snapshot_deltas(
+            self.session, total_loans=1, active_loans=1, available_copies=-1
+        )
+        await record_checkout(self.session, loan_data.book_id)
+        await record_borrower_checkouts(
+            self.session, {loan_data.borrower_mail: (loan_data.borrower_name, 1)}
+        )
         await self.session.commit()
-        await self.session.refresh(db_loan)
+        identity_cache.evict(Book, loan_data.book_id)
+        await response_cache.invalidate(Book.__tablename__)
+        self._invalidate_counts()
+        table_counters.increment(Loan.__tablename__, LoanStatus.ON_LOAN)
+        record_loan(loan_data.book_id, author_id, now)
+
+        # Every field is already set (expire_on_commit=False), no refresh needed
+        return self._enrich_loan(db_loan, title)
+
+    async def _raise_checkout_refused(self, loan_data: LoanCreate):
+        # Only on the refusal path: find out which condition failed
+        result = await self.session.execute(
+            select(Book.title, Book.available_copies).where(Book.id == loan_data.book_id)
+        )
+        book = result.first()
+        if not book:
+            raise HTTPException(status_code=404, detail="Book not found")
 
-        # Eager load book for response
-        await self.session.refresh(db_loan, attribute_names=["book"])
-        return self._enrich_loan(db_loan)
+        if book.available_copies <= 0:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Book '{book.title}' is not currently available",
+            )
 
-    async def get_all_filtered(
+        raise HTTPException(
+            status_code=400, detail=f"Loan limit reached ({MAX_LOANS_PER_USER} max)"
+        )
+
+    def _filtered_statement(
         self,
-        page: int,
-        page_size: int,
         status: LoanStatus | None = None,
         borrower_mail: str | None = None,
         book_id: int | None = None,
         active_only: bool = False,
         late_only: bool = False,
     ):
-        """
-        Retrieve a paginated list of loans with optional filtering.
-
-        - **page**: Page number
-        - **page_size**: Number of items per page
-        - **status**: Filter by loan status
-        - **borrower_mail**: Filter by borrower's email
-        - **book_id**: Filter by book ID
-        - **active_only**: Show only active loans
-        - **late_only**: Show only late loans
-        """
-        statement = select(Loan).join(Book)
+        # Fetch the book title in the same statement instead of loading loan.book,
+        # and compute the penalties in the database
+        days_late = days_late_expression(
+            self.read_session.get_bind().dialect.name, datetime.now()
+        )
+        statement = select(
+            Loan, Book.title, days_late, penalty_expression(days_late)
+        ).join(Book)
 
         if status:
             statement = statement.where(Loan.status == status)
@@ -145,48 +180,232 @@ class LoanService(TemplateService[Loan]):
                 )
             )
         if late_only:
-            statement = statement.where(Loan.status == LoanStatus.OVERDUE)
+            # Late by date, whether or not the sweeper already flagged it
+            statement = statement.where(
+                Loan.return_date.is_(None), Loan.due_date < datetime.now()
+            )
 
-        statement = statement.order_by(Loan.loan_date.desc())
+        return statement
+
+    async def bulk_import(self, records, schema=LoanCreate, batch_size: int = 500) -> dict:
+        """
+        Create many loans in one transaction, reporting per-row errors.
+
+        Rows are checked in order against book availability and the borrower
+        loan limit, exactly like single checkouts.
+
+        - **records**: (index, payload) pairs
+        - **schema**: The schema each row is validated with
+        - **batch_size**: Number of rows per executemany batch
+        """
+        self._bulk_checkouts: Counter = Counter()
+        self._bulk_now = datetime.now()
+        report = await super().bulk_import(records, schema, batch_size)
+        # Available copies changed
+        for book_id, _ in self._bulk_checkouts:
+            identity_cache.evict(Book, book_id)
+        await response_cache.invalidate(Book.__tablename__)
+        for (book_id, author_id), count in self._bulk_checkouts.items():
+            record_loan(book_id, author_id, self._bulk_now, count)
+        return report
+
+    async def _flush_bulk(self, batch: list[tuple[int, dict]], report: dict) -> None:
+        if not batch:
+            return
+        book_ids = {data["book_id"] for _, data in batch}
+        mails = {data["borrower_mail"] for _, data in batch}
+
+        books_result = await self.session.execute(
+            select(Book.id, Book.author_id, Book.available_copies).where(
+                Book.id.in_(book_ids)
+            )
+        )
+        books = {
+            book_id: {"author_id": author_id, "available": available or 0}
+            for book_id, author_id, available in books_result.all()
+        }
+        if borrower_activity.COUNTERS_ENABLED:
+            active_statement = select(
+                BorrowerActivity.borrower_mail, BorrowerActivity.current_loans
+            ).where(BorrowerActivity.borrower_mail.in_(mails))
+        else:
+            active_statement = (
+                select(Loan.borrower_mail, func.count())
+                .where(
+                    Loan.borrower_mail.in_(mails),
+                    or_(Loan.status == LoanStatus.ON_LOAN, Loan.status == LoanStatus.OVERDUE),
+                )
+                .group_by(Loan.borrower_mail)
+            )
+        active = Counter(dict((await self.session.execute(active_statement)).all()))
+
+        now = self._bulk_now
+        due_date = now + timedelta(days=LOAN_DURATION_DAYS)
+        rows = []
+        taken = Counter()
+        borrowers: dict[str, tuple[str, int]] = {}
+        for index, data in batch:
+            book = books.get(data["book_id"])
+            if book is None:
+                self._bulk_error(report, index, "Book not found")
+            elif book["available"] - taken[data["book_id"]] <= 0:
+                self._bulk_error(report, index, "Book is not currently available")
+            elif active[data["borrower_mail"]] >= MAX_LOANS_PER_USER:
+                self._bulk_error(
+                    report, index, f"Loan limit reached ({MAX_LOANS_PER_USER} max)"
+                )
+            else:
+                taken[data["book_id"]] += 1
+                active[data["borrower_mail"]] += 1
+                _, count = borrowers.get(data["borrower_mail"], (None, 0))
+                borrowers[data["borrower_mail"]] = (data["borrower_name"], count + 1)
+                rows.append(
+                    {
+                        **data,
+                        "loan_date": now,
+                        "due_date": due_date,
+                        "status": LoanStatus.ON_LOAN,
+                        "renewed": False,
+                    }
+                )
+        if not rows:
+            return
+
+        await self.session.execute(insert(Loan), rows)
+        books_table = Book.__table__
+        await self.session.execute(
+            update(books_table)
+            .where(books_table.c.id == bindparam("b_id"))
+            .values(available_copies=books_table.c.available_copies - bindparam("b_taken")),
+            [{"b_id": book_id, "b_taken": count} for book_id, count in taken.items()],
+        )
+        await apply_snapshot_deltas(
+            self.session,
+            total_loans=len(rows),
+            active_loans=len(rows),
+            available_copies=-len(rows),
+        )
+        await record_borrower_checkouts(self.session, borrowers)
+        for book_id, count in taken.items():
+            await record_checkout(self.session, book_id, count)
+            self._bulk_checkouts[(book_id, books[book_id]["author_id"])] += count
+        self._bulk_groups[LoanStatus.ON_LOAN] += len(rows)
+        report["inserted"] += len(rows)
+
+    async def get_all_filtered(
+        self,
+        page: int,
+        page_size: int,
+        status: LoanStatus | None = None,
+        borrower_mail: str | None = None,
+        book_id: int | None = None,
+        active_only: bool = False,
+        late_only: bool = False,
+        include_total: bool = True,
+        count_mode: str = "exact",
+    ):
+        """
+        Retrieve a paginated list of loans with optional filtering.
+
+        - **page**: Page number
+        - **page_size**: Number of items per page
+        - **status**: Filter by loan status
+        - **borrower_mail**: Filter by borrower's email
+        - **book_id**: Filter by book ID
+        - **active_only**: Show only active loans
+        - **late_only**: Show only late loans
+        - **include_total**: Whether to compute the total count
+        - **count_mode**: How to compute the total (exact or estimated)
+        """
+        statement = self._filtered_statement(
+            status, borrower_mail, book_id, active_only, late_only
+        )
 
         # Count total
-        total_stmt = select(func.count()).select_from(statement.subquery())
-        total_res = await self.session.execute(total_stmt)
-        total = total_res.scalar_one()
+        total = await self.count_filtered(
+            statement,
+            {
+                "status": status,
+                "borrower_mail": borrower_mail,
+                "book_id": book_id,
+                "active_only": active_only,
+                "late_only": late_only,
+            },
+            include_total,
+            count_mode,
+        )
+
+        statement = statement.order_by(Loan.loan_date.desc())
 
         # Pagination
         offset = (page - 1) * page_size
         statement = statement.offset(offset).limit(page_size)
 
-        result = await self.session.execute(statement)
-        loans = result.scalars().all()
+        result = await self.read_session.execute(statement)
 
         # Enrich with details
-        enriched_loans = [self._enrich_loan(loan) for loan in loans]
-
-        # Commit any status updates (e.g. changing ON_LOAN to OVERDUE during enrichment)
-        if enriched_loans:
-            await self.session.commit()
+        enriched_loans = [self._enrich_loan(*row) for row in result.all()]
 
         return enriched_loans, total
 
+    async def get_all_keyset(
+        self,
+        page_size: int,
+        cursor: str | None = None,
+        status: LoanStatus | None = None,
+        borrower_mail: str | None = None,
+        book_id: int | None = None,
+        active_only: bool = False,
+        late_only: bool = False,
+    ):
+        """
+        Retrieve a page of loans, most recent first, using keyset (cursor) pagination.
+
+        - **page_size**: Number of items per page
+        - **cursor**: Cursor returned by the previous page, None for the first page
+        - **status**: Filter by loan status
+        - **borrower_mail**: Filter by borrower's email
+        - **book_id**: Filter by book ID
+        - **active_only**: Show only active loans
+        - **late_only**: Show only late loans
+        """
+        statement = self._filtered_statement(
+            status, borrower_mail, book_id, active_only, late_only
+        )
+
+        cursor_values = decode_cursor(cursor, "loan_date", "desc") if cursor else None
+        statement = apply_keyset(statement, Loan.loan_date, Loan.id, "desc", cursor_values)
+
+        # Fetch one extra row to know whether another page exists
+        result = await self.read_session.execute(statement.limit(page_size + 1))
+        rows = result.all()
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            last = rows[-1][0]
+            next_cursor = encode_cursor("loan_date", "desc", last.loan_date, last.id)
+
+        enriched_loans = [self._enrich_loan(*row) for row in rows]
+
+        return enriched_loans, next_cursor
+
+    async def _get_with_title(self, loan_id: int, session):
+        result = await session.execute(
+            select(Loan, Book.title).join(Book).where(Loan.id == loan_id)
+        )
+        return result.first()
+
     async def get_loan_details(self, loan_id: int) -> Loan:
         """
         Retrieve loan details by ID.
 
         - **loan_id**: The ID of the loan to retrieve
         """
-        stmt = select(Loan).where(Loan.id == loan_id)
-        result = await self.session.execute(stmt)
-        loan = result.scalar_one_or_none()
-
-        if not loan:
+        row = await self._get_with_title(loan_id, self.read_session)
+        if not row:
             raise HTTPException(status_code=404, detail="Loan not found")
 
-        await self.session.refresh(loan, attribute_names=["book"])
-        loan = self._enrich_loan(loan)
-        await self.session.commit()  # Save status updates if any
-        return loan
+        return self._enrich_loan(*row)
 
     async def return_loan(self, loan_id: int, return_data: LoanReturn) -> Loan:
         """
@@ -195,19 +414,20 @@ class LoanService(TemplateService[Loan]):
         - **loan_id**: The ID of the loan to return
         - **return_data**: Return data
         """
-        loan = await self.get_by_id(loan_id)
-        if not loan:
+        # Loan and book in one statement
+        result = await self.session.execute(
+            select(Loan, Book).join(Book).where(Loan.id == loan_id)
+        )
+        row = result.first()
+        if not row:
             raise HTTPException(status_code=404, detail="Loan not found")
+        loan, book = row
 
         if loan.return_date:
             raise HTTPException(status_code=400, detail="Loan already returned")
 
-        # Get book
-        book_stmt = select(Book).where(Book.id == loan.book_id)
-        res = await self.session.execute(book_stmt)
-        book = res.scalar_one()
-
         # Update loan
+        old_status = loan.status
         return_date = return_data.return_date or datetime.now()
         loan.return_date = return_date
         loan.status = LoanStatus.RETURNED
@@ -223,10 +443,16 @@ class LoanService(TemplateService[Loan]):
 
         self.session.add(loan)
         self.session.add(book)
+        await apply_snapshot_deltas(self.session, active_loans=-1, available_copies=1)
+        await record_return(self.session, loan)
+        await record_borrower_return(self.session, loan)
         await self.session.commit()
-        await self.session.refresh(loan, attribute_names=["book"])
+        identity_cache.evict(Book, book.id)
+        await response_cache.invalidate(Book.__tablename__)
+        self._invalidate_counts()
+        table_counters.move(Loan.__tablename__, old_status, LoanStatus.RETURNED)
 
-        return self._enrich_loan(loan)
+        return self._enrich_loan(loan, book.title)
 
     async def renew_loan(self, loan_id: int) -> Loan:
         """
@@ -234,9 +460,10 @@ class LoanService(TemplateService[Loan]):
 
         - **loan_id**: The ID of the loan to renew
         """
-        loan = await self.get_by_id(loan_id)
-        if not loan:
+        row = await self._get_with_title(loan_id, self.session)
+        if not row:
             raise HTTPException(status_code=404, detail="Loan not found")
+        loan, book_title = row
 
         if loan.return_date:
             raise HTTPException(status_code=400, detail="Cannot renew a returned loan")
@@ -248,11 +475,13 @@ class LoanService(TemplateService[Loan]):
         loan.renewed = True
 
         # Re-evaluate status (might no longer be overdue)
+        old_status = loan.status
         if loan.status == LoanStatus.OVERDUE and datetime.now() <= loan.due_date:
             loan.status = LoanStatus.ON_LOAN
 
         self.session.add(loan)
         await self.session.commit()
-        await self.session.refresh(loan, attribute_names=["book"])
+        self._invalidate_counts()
+        table_counters.move(Loan.__tablename__, old_status, loan.status)
 
-        return self._enrich_loan(loan)
+        return self._enrich_loan(loan, book_title)
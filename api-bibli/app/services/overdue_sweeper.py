@@ -0,0 +1,113 @@
+"""
+Background sweep marking late loans as OVERDUE.
+
+Read endpoints never write: the status of loans past their due date is updated
+here, in one UPDATE per sweep, by a task started in the application lifespan.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+
+from sqlalchemy import update
+from app.core.counts import count_cache, table_counters
+from app.data.models import LoanStatus
+from app.data.orm import Loan
+
+logger = logging.getLogger(__name__)
+
+SWEEP_INTERVAL_SECONDS = 60
+
+
+class SweepMetrics:
+    """Counters describing the sweeps run by this process."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.runs = 0
+        self.failures = 0
+        self.rows_updated = 0
+        self.last_rows_updated = 0
+        self.last_duration_ms = 0.0
+        self.max_duration_ms = 0.0
+        self.last_run_at: datetime | None = None
+
+    def record(self, rows: int, duration_ms: float) -> None:
+        self.runs += 1
+        self.rows_updated += rows
+        self.last_rows_updated = rows
+        self.last_duration_ms = duration_ms
+        self.max_duration_ms = max(self.max_duration_ms, duration_ms)
+        self.last_run_at = datetime.now()
+
+    def as_dict(self) -> dict:
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "rows_updated": self.rows_updated,
+            "last_rows_updated": self.last_rows_updated,
+            "last_duration_ms": self.last_duration_ms,
+            "max_duration_ms": self.max_duration_ms,
+            "last_run_at": self.last_run_at,
+        }
+
+
+sweep_metrics = SweepMetrics()
+
+
+async def sweep_overdue(session, now: datetime | None = None) -> int:
+    """
+    Mark every active loan past its due date as OVERDUE. Returns the number of loans updated.
+
+    The predicate matches the partial index on active loans' due dates.
+
+    - **session**: The database session (committed here)
+    - **now**: Reference time (default: now)
+    """
+    now = now or datetime.now()
+    started = time.perf_counter()
+    result = await session.execute(
+        update(Loan)
+        .where(
+            Loan.return_date.is_(None),
+            Loan.due_date < now,
+            Loan.status == LoanStatus.ON_LOAN,
+        )
+        .values(status=LoanStatus.OVERDUE)
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
+    rows = result.rowcount or 0
+    if rows:
+        # Status counts changed
+        count_cache.invalidate(Loan.__tablename__)
+        table_counters.move(Loan.__tablename__, LoanStatus.ON_LOAN, LoanStatus.OVERDUE, rows)
+    sweep_metrics.record(rows, (time.perf_counter() - started) * 1000)
+    return rows
+
+
+async def run_sweeper(session_factory, interval: float = SWEEP_INTERVAL_SECONDS) -> None:
+    """
+    Sweep forever, every `interval` seconds, until cancelled.
+
+    - **session_factory**: Callable returning a new AsyncSession
+    - **interval**: Seconds between two sweeps
+    """
+    while True:
+        try:
+            async with session_factory() as session:
+                rows = await sweep_overdue(session)
+            if rows:
+                logger.info(
+                    "Overdue sweep marked %d loans in %.1f ms",
+                    rows,
+                    sweep_metrics.last_duration_ms,
+                )
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            sweep_metrics.failures += 1
+            logger.exception("Overdue sweep failed")
+        await asyncio.sleep(interval)
@@ -0,0 +1,151 @@
+"""
+CPU-bound post-processing of report and export rows.
+
+Plain functions of plain rows returning plain data, so that `report_pool` can
+run them in a worker process: arguments and results are pickled, and the module
+only imports the standard library so that workers start fast.
+"""
+import array
+import csv
+import datetime
+import enum
+import heapq
+import io
+import json
+from typing import Iterable
+
+FINES_FIELDS = ("late_loans", "total_fines", "outstanding_fines")
+
+# Column types of PackedRows: text, integer, float
+ARRAY_TYPES = {"i": "q", "f": "d"}
+
+
+class PackedRows:
+    """
+    Rows of text and numbers stored column by column, to send many rows to a
+    worker process: a text column pickles as one string and its lengths, a
+    number column as one array, instead of one object per value.
+    None is stored as "" in text columns and 0 in number columns.
+
+    - **types**: One letter per column, "s" (text), "i" (integer) or "f" (float)
+    """
+
+    def __init__(self, types: str):
+        self.types = types
+        self._columns = [
+            ([], array.array("q")) if kind == "s" else array.array(ARRAY_TYPES[kind])
+            for kind in types
+        ]
+        self._count = 0
+
+    def extend(self, rows) -> None:
+        """Append rows, a chunk at a time (each text column is joined per chunk)."""
+        rows = list(rows)
+        if not rows:
+            return
+        for kind, column, values in zip(self.types, self._columns, zip(*rows)):
+            if None in values:
+                empty = "" if kind == "s" else 0
+                values = [empty if value is None else value for value in values]
+            if kind == "s":
+                chunks, lengths = column
+                chunks.append("".join(values))
+                lengths.extend(map(len, values))
+            else:
+                column.extend(values)
+        self._count += len(rows)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self):
+        columns = []
+        for kind, column in zip(self.types, self._columns):
+            if kind == "s":
+                chunks, lengths = column
+                text, start, values = "".join(chunks), 0, []
+                for length in lengths:
+                    values.append(text[start:start + length])
+                    start += length
+                column = values
+            columns.append(column)
+        return zip(*columns)
+
+    def __getstate__(self):
+        columns = [
+            (["".join(column[0])], column[1]) if kind == "s" else column
+            for kind, column in zip(self.types, self._columns)
+        ]
+        return self.types, self._count, columns
+
+    def __setstate__(self, state):
+        self.types, self._count, self._columns = state
+
+
+def _plain(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return value
+
+
+def encode_rows(names: list[str], rows: list[tuple], fmt: str, header: bool = False) -> bytes:
+    """
+    Encode rows as CSV or NDJSON.
+
+    - **names**: Column names
+    - **rows**: Row values, in column order
+    - **fmt**: csv or ndjson
+    - **header**: Start with the CSV header line
+    """
+    buffer = io.StringIO()
+    if fmt == "csv":
+        writer = csv.writer(buffer)
+        if header:
+            writer.writerow(names)
+        writer.writerows([[_plain(v) for v in row] for row in rows])
+    else:
+        for row in rows:
+            buffer.write(json.dumps({name: _plain(v) for name, v in zip(names, row)}))
+            buffer.write("\n")
+    return buffer.getvalue().encode()
+
+
+def rollup_fines(rows: Iterable[tuple], limit: int) -> dict:
+    """
+    Fines report from per (borrower, month) groups: totals, the `limit`
+    borrowers with the highest fines, and the months in order.
+
+    - **rows**: (mail, name, month, late loans, fines, outstanding fines) rows
+    - **limit**: Number of borrowers returned
+    """
+    borrowers: dict[str, dict] = {}
+    months: dict[str, dict] = {}
+    totals = {"late_loans": 0, "total_fines": 0.0, "outstanding_fines": 0.0}
+    for mail, name, loan_month, late, fines, outstanding in rows:
+        values = (late, float(fines or 0), float(outstanding or 0))
+        borrower = borrowers.get(mail)
+        if borrower is None:
+            borrower = borrowers[mail] = {
+                "borrower_mail": mail, "borrower_name": name, "late_loans": 0,
+                "total_fines": 0.0, "outstanding_fines": 0.0,
+            }
+        by_month = months.get(loan_month)
+        if by_month is None:
+            by_month = months[loan_month] = {
+                "month": loan_month, "late_loans": 0, "total_fines": 0.0,
+                "outstanding_fines": 0.0,
+            }
+        for key, value in zip(FINES_FIELDS, values):
+            borrower[key] += value
+            by_month[key] += value
+            totals[key] += value
+
+    return {
+        **totals,
+        "by_borrower": heapq.nlargest(
+            limit, borrowers.values(), key=lambda b: (b["total_fines"], b["borrower_mail"])
+        ),
+        "by_month": [months[key] for key in sorted(months)],
+    }
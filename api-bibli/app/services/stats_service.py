@@ -1,38 +1,76 @@
 from datetime import datetime, timedelta
-from sqlalchemy import func, select, case, desc, extract
-from app.data.orm import Book, Loan, Author, SessionDep
+from sqlalchemy import func, literal, select, case, desc, extract, union_all
+from app.core.months import add_months, month_range
+from app.core.offload import report_pool
+from app.core.pagination import apply_keyset, decode_cursor, encode_cursor
+from app.data.orm import Book, Loan, Author, LibraryStats, LoanHistory, ReadSessionDep, SessionDep
+from app.services.borrower_activity import activity_source
+from app.services.fines import days_late_expression, month_expression, penalty_expression
+from app.services.leaderboard import author_leaderboard, book_leaderboard
+from app.services.report_compute import PackedRows, rollup_fines
+from app.services.stats_snapshot import SNAPSHOT_ID, late_loans_statement, refresh_snapshot
+
+# Grouped rows fetched per round trip by reports rolled up in Python
+REPORT_CHUNK_ROWS = 1000
+
+
+def never_borrowed_statement():
+    """
+    Books without any loan, as an anti-join (NOT EXISTS) probing the loans
+    book_id index; only the reported columns are selected.
+    """
+    borrowed = select(Loan.id).where(Loan.book_id == Book.id).exists()
+    return select(
+        Book.id.label("book_id"), Book.title, Book.created_at.label("added_date")
+    ).where(~borrowed)
+
 
 class StatsService:
-    def __init__(self, session: SessionDep):
+    def __init__(self, session: SessionDep, read_session: ReadSessionDep = None):
         self.session = session
+        # Every report reads from here; only the snapshot refresh writes
+        self.read_session = read_session if read_session is not None else session
 
-    async def get_global_stats(self):
+    async def get_global_stats(self, fresh: bool = False):
         """
         Retrieve global statistics for the library.
+
+        Reads the maintained `library_stats` snapshot; the late loan count is
+        time dependent and is read from the active loans index in the same query.
+
+        - **fresh**: Recompute the snapshot from the tables first
         """
-        total_books = await self.session.scalar(select(func.count(Book.id)))
-        total_copies = await self.session.scalar(select(func.sum(Book.total_copies_owned))) 
-        
-        active_loans = await self.session.scalar(select(func.count(Loan.id)).where(Loan.return_date.is_(None)))
-        
-        today = datetime.now().date()
-        late_loans = await self.session.scalar(
-            select(func.count(Loan.id)).where(
-                Loan.return_date.is_(None),
-                Loan.due_date < today
-            )
-        )
+        counters = None
+        if not fresh:
+            statement = select(
+                LibraryStats, late_loans_statement().scalar_subquery()
+            ).where(LibraryStats.id == SNAPSHOT_ID)
+            row = (await self.read_session.execute(statement)).first()
+            if row is not None:
+                snapshot, late_loans = row
+                counters = {
+                    "total_books": snapshot.total_books,
+                    "total_authors": snapshot.total_authors,
+                    "total_loans": snapshot.total_loans,
+                    "active_loans": snapshot.active_loans,
+                    "available_copies": snapshot.available_copies,
+                    "late_loans": late_loans,
+                }
 
-        sum_available = await self.session.scalar(select(func.sum(Book.available_copies))) or 0
-        total_physical = active_loans + sum_available
+        if counters is None:
+            counters = await refresh_snapshot(self.session)
+            await self.session.commit()
+
+        active_loans = counters["active_loans"] or 0
+        total_physical = active_loans + (counters["available_copies"] or 0)
         occupancy_rate = (active_loans / total_physical * 100) if total_physical > 0 else 0.0
 
         return {
-            "total_books": total_books or 0,
-            "total_authors": await self.session.scalar(select(func.count(Author.id))) or 0,
-            "total_loans": await self.session.scalar(select(func.count(Loan.id))) or 0,
-            "active_loans": active_loans or 0,
-            "late_loans": late_loans or 0,
+            "total_books": counters["total_books"] or 0,
+            "total_authors": counters["total_authors"] or 0,
+            "total_loans": counters["total_loans"] or 0,
+            "active_loans": active_loans,
+            "late_loans": counters["late_loans"] or 0,
             "occupancy_rate": round(occupancy_rate, 2)
         }
 
@@ -42,32 +80,34 @@ class StatsService:
 
         - **book_id**: The ID of the book
         """
-        book = await self.session.get(Book, book_id)
-        if not book:
+        statement = (
+            select(Book.id, Book.title, LoanHistory)
+            .outerjoin(LoanHistory, LoanHistory.book_id == Book.id)
+            .where(Book.id == book_id)
+        )
+        row = (await self.read_session.execute(statement)).first()
+        if not row:
             return None
 
-        total_loans = await self.session.scalar(select(func.count(Loan.id)).where(Loan.book_id == book_id))
-        
-        # Average duration (only for returned loans)
-        avg_duration = await self.session.scalar(
-            select(func.avg(Loan.return_date - Loan.loan_date))
-            .where(Loan.book_id == book_id, Loan.return_date.is_not(None))
-        )
-        
-        times_late = await self.session.scalar(
-            select(func.count(Loan.id)).where(
-                Loan.book_id == book_id,
-                Loan.return_date > Loan.due_date
-            )
-        )
-        
+        _, title, history = row
+        if history is None:
+            # Never borrowed
+            return {
+                "book_id": book_id,
+                "book_title": title,
+                "total_loans": 0,
+                "average_loan_duration": 0.0,
+                "times_late": 0,
+                "popularity_rank": None
+            }
+
         return {
-            "book_id": book.id,
-            "book_title": book.title,
-            "total_loans": total_loans,
-            "average_loan_duration": float(avg_duration.days) if avg_duration else 0.0,
-            "times_late": times_late,
-            "popularity_rank": None
+            "book_id": book_id,
+            "book_title": title,
+            "total_loans": history.total_loans,
+            "average_loan_duration": round(history.average_duration_days, 2),
+            "times_late": history.times_late,
+            "popularity_rank": history.popularity_rank
         }
 
     async def get_author_stats(self, author_id: int):
@@ -76,13 +116,13 @@ class StatsService:
 
         - **author_id**: The ID of the author
         """
-        author = await self.session.get(Author, author_id)
+        author = await self.read_session.get(Author, author_id)
         if not author:
             return None
             
-        total_books = await self.session.scalar(select(func.count(Book.id)).where(Book.author_id == author_id))
+        total_books = await self.read_session.scalar(select(func.count(Book.id)).where(Book.author_id == author_id))
         
-        total_loans = await self.session.scalar(
+        total_loans = await self.read_session.scalar(
             select(func.count(Loan.id))
             .join(Book)
             .where(Book.author_id == author_id)
@@ -95,47 +135,200 @@ class StatsService:
             "total_loans": total_loans
         }
 
-    async def get_monthly_report(self, year: int, month: int):
+    async def get_leaderboard(self, kind: str, window: str, limit: int):
         """
-        Retrieve a monthly report for the library.
+        Retrieve the most borrowed books or authors over a time window.
 
-        - **year**: The year for the report
-        - **month**: The month for the report
+        - **kind**: "books" or "authors"
+        - **window**: Time window (7d, 30d or all)
+        - **limit**: Number of entries
         """
-        start_date = datetime(year, month, 1)
-        if month == 12:
-            end_date = datetime(year + 1, 1, 1)
+        if kind == "books":
+            top = book_leaderboard.top(window, limit)
+            statement = select(Book.id, Book.title)
+            model = Book
         else:
-            end_date = datetime(year, month + 1, 1)
+            top = author_leaderboard.top(window, limit)
+            statement = select(
+                Author.id, Author.first_name + " " + Author.last_name
+            )
+            model = Author
+        if not top:
+            return []
 
-        new_books = await self.session.scalar(
-            select(func.count(Book.id)).where(Book.publication_year == year)
+        result = await self.read_session.execute(
+            statement.where(model.id.in_([key for key, _ in top]))
         )
-        
-        total_loans = await self.session.scalar(
-            select(func.count(Loan.id)).where(Loan.loan_date >= start_date, Loan.loan_date < end_date)
+        names = dict(result.all())
+
+        entries = []
+        for position, (key, loans) in enumerate(top, start=1):
+            rank = entries[-1]["rank"] if entries and entries[-1]["loans"] == loans else position
+            entries.append(
+                {"rank": rank, "id": key, "name": names.get(key, ""), "loans": loans}
+            )
+        return entries
+
+    async def get_fines_report(self, limit: int = 100):
+        """
+        Aggregate late penalties per borrower and per month (of the due date).
+
+        The loans table is read once, grouped by (borrower, month) in the
+        database; both breakdowns are rolled up from that result. Fines of
+        active loans are outstanding, they keep growing until the return.
+
+        - **limit**: Number of borrowers returned, highest fines first
+        """
+        dialect = self.read_session.get_bind().dialect.name
+        now = datetime.now()
+        days_late = days_late_expression(dialect, now)
+        penalty = penalty_expression(days_late)
+        month = month_expression(dialect, Loan.due_date)
+        statement = (
+            select(
+                Loan.borrower_mail,
+                func.max(Loan.borrower_name),
+                month,
+                func.count(Loan.id),
+                func.sum(penalty),
+                func.sum(case((Loan.return_date.is_(None), penalty), else_=0)),
+            )
+            .where(Loan.due_date < func.coalesce(Loan.return_date, now))
+            .group_by(Loan.borrower_mail, month)
         )
-        
-        returned_loans = await self.session.scalar(
-            select(func.count(Loan.id)).where(Loan.return_date >= start_date, Loan.return_date < end_date)
+
+        # Packed in chunks that let other requests run in between
+        rows = PackedRows("sssiff")
+        result = await self.read_session.stream(statement)
+        async for partition in result.partitions(REPORT_CHUNK_ROWS):
+            rows.extend(partition)
+        # Rolled up in a worker process when large
+        return await report_pool.run(rollup_fines, rows, limit, rows=len(rows))
+
+    async def get_monthly_report(self, start: str, end: str):
+        """
+        Retrieve monthly activity for a range of months, in one grouped query.
+
+        Loans, returns, books added and new borrowers (first loan) are
+        gathered as dated events and counted per month in a single pass;
+        months without activity are reported with zeros.
+
+        - **start**: First month, "YYYY-MM"
+        - **end**: Last month (included), "YYYY-MM"
+        """
+        months = month_range(start, end)
+        start_date = datetime.strptime(months[0], "%Y-%m")
+        end_date = add_months(start_date, len(months))
+        dialect = self.read_session.get_bind().dialect.name
+
+        def events(column, loans=0, returns=0, books=0, users=0, source=None):
+            statement = select(
+                month_expression(dialect, column).label("month"),
+                literal(loans).label("loans"),
+                literal(returns).label("returns"),
+                literal(books).label("books"),
+                literal(users).label("users"),
+            )
+            if source is not None:
+                statement = statement.select_from(source)
+            return statement.where(column >= start_date, column < end_date)
+
+        first_loans = (
+            select(func.min(Loan.loan_date).label("first_loan"))
+            .group_by(Loan.borrower_mail)
+            .subquery()
         )
+        timeline = union_all(
+            events(Loan.loan_date, loans=1),
+            events(Loan.return_date, returns=1),
+            events(Book.created_at, books=1),
+            events(first_loans.c.first_loan, users=1, source=first_loans),
+        ).subquery()
+        statement = select(
+            timeline.c.month,
+            func.sum(timeline.c.loans),
+            func.sum(timeline.c.returns),
+            func.sum(timeline.c.books),
+            func.sum(timeline.c.users),
+        ).group_by(timeline.c.month)
 
-        return {
-            "month": start_date.strftime("%Y-%m"),
-            "new_books": new_books or 0,
-            "total_loans": total_loans or 0,
-            "returned_loans": returned_loans or 0
+        report = {
+            month: {
+                "month": month,
+                "new_books": 0,
+                "new_users": 0,
+                "total_loans": 0,
+                "returned_loans": 0,
+            }
+            for month in months
         }
+        result = await self.read_session.execute(statement)
+        for month, loans, returns, books, users in result.all():
+            if month in report:
+                report[month].update(
+                    new_books=books or 0,
+                    new_users=users or 0,
+                    total_loans=loans or 0,
+                    returned_loans=returns or 0,
+                )
+        return list(report.values())
+
+    async def get_borrower_activity(self, page_size: int = 100, cursor: str | None = None):
+        """
+        Retrieve a page of borrowers with their loan counters, by email.
+
+        - **page_size**: Number of borrowers per page
+        - **cursor**: Cursor returned by the previous page, None for the first page
+        """
+        statement, mail = activity_source()
+        if cursor:
+            last_mail, _ = decode_cursor(cursor, "borrower_mail", "asc")
+            statement = statement.where(mail > last_mail)
+        # Fetch one extra row to know whether another page exists
+        result = await self.read_session.execute(
+            statement.order_by(mail).limit(page_size + 1)
+        )
+        rows = [dict(row._mapping) for row in result.all()]
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            next_cursor = encode_cursor("borrower_mail", "asc", rows[-1]["borrower_mail"], 0)
+        return rows, next_cursor
 
-    async def get_never_borrowed_books(self):
+    async def get_borrower_activity_for(self, borrower_mail: str):
         """
-        Retrieve a list of books that have never been borrowed.
+        Retrieve the loan counters of one borrower.
+
+        - **borrower_mail**: The borrower's email
+        """
+        statement, mail = activity_source()
+        row = (await self.read_session.execute(statement.where(mail == borrower_mail))).first()
+        return dict(row._mapping) if row else None
+
+    async def get_never_borrowed_books(self, page_size: int = 100, cursor: str | None = None):
         """
-        subquery = select(Loan.book_id).distinct()
-        statement = select(Book).where(Book.id.not_in(subquery))
-        result = await self.session.execute(statement)
-        books = result.scalars().all()
-        return [
-            {"book_id": b.id, "title": b.title, "added_date": str(b.publication_year)} 
-            for b in books
+        Retrieve a page of books that have never been borrowed, by title.
+
+        - **page_size**: Number of books per page
+        - **cursor**: Cursor returned by the previous page, None for the first page
+        """
+        cursor_values = decode_cursor(cursor, "title", "asc") if cursor else None
+        statement = apply_keyset(
+            never_borrowed_statement(), Book.title, Book.id, "asc", cursor_values
+        )
+        # Fetch one extra row to know whether another page exists
+        result = await self.read_session.execute(statement.limit(page_size + 1))
+        rows = result.all()
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            next_cursor = encode_cursor("title", "asc", rows[-1].title, rows[-1].book_id)
+        items = [
+            {
+                "book_id": row.book_id,
+                "title": row.title,
+                "added_date": row.added_date.isoformat() if row.added_date else None,
+            }
+            for row in rows
         ]
+        return items, next_cursor
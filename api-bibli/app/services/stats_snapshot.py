@@ -0,0 +1,90 @@
+from datetime import datetime
+from sqlalchemy import and_, case, func, select, true, update
+from app.data.orm import Author, Book, LibraryStats, Loan
+
+SNAPSHOT_ID = 1
+
+
+def _late_condition(now: datetime):
+    return and_(Loan.return_date.is_(None), Loan.due_date < now)
+
+
+def global_stats_statement():
+    """
+    Build one SELECT computing every global counter.
+
+    Each table is aggregated once in a single-row derived table, and the three
+    rows are joined, so the database is hit in one round trip.
+    """
+    now = datetime.now()
+    books = select(
+        func.count(Book.id).label("total_books"),
+        func.coalesce(func.sum(Book.total_copies_owned), 0).label("total_copies"),
+        func.coalesce(func.sum(Book.available_copies), 0).label("available_copies"),
+    ).subquery()
+    loans = select(
+        func.count(Loan.id).label("total_loans"),
+        func.coalesce(
+            func.sum(case((Loan.return_date.is_(None), 1), else_=0)), 0
+        ).label("active_loans"),
+        func.coalesce(
+            func.sum(case((_late_condition(now), 1), else_=0)), 0
+        ).label("late_loans"),
+    ).subquery()
+    authors = select(func.count(Author.id).label("total_authors")).subquery()
+
+    return select(
+        books.c.total_books,
+        books.c.total_copies,
+        books.c.available_copies,
+        authors.c.total_authors,
+        loans.c.total_loans,
+        loans.c.active_loans,
+        loans.c.late_loans,
+    ).select_from(books.join(loans, true()).join(authors, true()))
+
+
+def late_loans_statement():
+    """Count active loans past their due date (served by the partial due_date index)."""
+    return select(func.count(Loan.id)).where(_late_condition(datetime.now()))
+
+
+async def refresh_snapshot(session) -> dict:
+    """
+    Recompute the snapshot from the tables and store it.
+
+    - **session**: The database session (the caller commits)
+    """
+    row = (await session.execute(global_stats_statement())).one()
+    counters = dict(row._mapping)
+    late_loans = counters.pop("late_loans")
+    await session.merge(
+        LibraryStats(id=SNAPSHOT_ID, updated_at=datetime.now(), **counters)
+    )
+    return {**counters, "late_loans": late_loans}
+
+
+async def apply_snapshot_deltas(session, **deltas: int) -> None:
+    """
+    Increment snapshot counters in the caller's transaction.
+
+    Does nothing if the snapshot has not been built yet: the first read
+    computes it from the tables, including this write.
+
+    - **session**: The database session (the caller commits)
+    - **deltas**: Counter name to increment, e.g. active_loans=-1
+    """
+    values = {
+        name: getattr(LibraryStats, name) + delta
+        for name, delta in deltas.items()
+        if delta
+    }
+    if not values:
+        return
+    statement = (
+        update(LibraryStats)
+        .where(LibraryStats.id == SNAPSHOT_ID)
+        .values(**values, updated_at=datetime.now())
+        .execution_options(synchronize_session=False)
+    )
+    await session.execute(statement)
@@ -1,34 +1,158 @@
-from typing import TypeVar, Generic, Type, List, Optional, Any
+from collections import Counter
+from typing import TypeVar, Generic, Type, List, Optional, Any, AsyncIterator, Sequence
+from pydantic import BaseModel, ValidationError
 from sqlalchemy.future import select
-from sqlalchemy import delete
+from sqlalchemy import delete, func, insert, inspect
+from sqlalchemy.orm import load_only
 
-from app.data.orm import SessionDep
+from app.core.counts import count_cache, normalize_filters, table_counters
+from app.core.identity_cache import identity_cache, to_entity
+from app.core.response_cache import response_cache
+from app.data.orm import ReadSessionDep, SessionDep
+from app.services.stats_snapshot import apply_snapshot_deltas
 
 T = TypeVar("T")
 
+# Per-row errors returned by bulk imports beyond this are only counted
+MAX_REPORTED_ERRORS = 1000
+# Columns loaded by every column projection: the ID and the HTTP validators
+PROJECTION_COLUMNS = ("id", "version", "updated_at")
+# IDs per `IN (...)` list, well below the bound parameter limits of every backend
+IN_CHUNK_SIZE = 500
+
 
 class TemplateService(Generic[T]):
-    def __init__(self, session: SessionDep, model: Type[T]):
+    # Column whose values get their own counter for estimated totals
+    counter_column: str | None = None
+    # Library stats snapshot counters kept up to date on writes:
+    # snapshot_count is incremented per row, snapshot_sums maps a counter to the summed column
+    snapshot_count: str | None = None
+    snapshot_sums: dict[str, str] = {}
+    # Column tuples identifying an entity besides its ID, for cached lookups
+    unique_keys: tuple[tuple[str, ...], ...] = ()
+
+    def __init__(
+        self,
+        session: SessionDep,
+        model: Type[T],
+        read_session: ReadSessionDep | None = None,
+    ):
         self.session = session
         self.model = model
+        # Listing and detail reads; writes always go through `session`
+        self.read_session = read_session if read_session is not None else session
 
     async def get_all(self) -> List[T]:
         """
         Retrieve all entities of the model.
         """
-        result = await self.session.execute(select(self.model))
+        result = await self.read_session.execute(select(self.model))
         return result.scalars().all()
 
-    async def get_by_id(self, id: Any) -> Optional[T]:
+    def _project_columns(self, statement, columns: Sequence[str] | None, *extra: str):
+        """
+        Load only the given columns of the model, plus the ID, validators and `extra`.
+        Other columns raise instead of being lazy loaded.
+
+        - **statement**: Select statement of the model
+        - **columns**: Column names, None loads every column
+        - **extra**: Columns needed by the caller, e.g. the keyset sort column
+        """
+        if columns is None:
+            return statement
+        mapped = {attr.key for attr in inspect(self.model).column_attrs}
+        names = [
+            name
+            for name in dict.fromkeys((*PROJECTION_COLUMNS, *columns, *extra))
+            if name in mapped
+        ]
+        return statement.options(
+            load_only(*(getattr(self.model, name) for name in names), raiseload=True)
+        )
+
+    async def get_by_id(
+        self, id: Any, read_only: bool = False, columns: Sequence[str] | None = None
+    ) -> Optional[T]:
         """
         Retrieve an entity by its ID.
 
         - **id**: The ID of the entity to retrieve
+        - **read_only**: Read it from the read-only session or the identity cache
+          (not for entities about to be modified, which are always read from the database)
+        - **columns**: Load only these columns when read from the database (read_only only)
+        """
+        session = self.read_session if read_only else self.session
+        if read_only and identity_cache.enabled:
+            snapshot = identity_cache.get(self.model, id)
+            if snapshot is not None:
+                return to_entity(self.model, snapshot)
+
+        token = identity_cache.token(self.model)
+        statement = select(self.model).where(self.model.id == id)
+        if read_only:
+            statement = self._project_columns(statement, columns)
+        result = await session.execute(statement)
+        entity = result.scalar_one_or_none()
+        if entity is not None and self._caches_reads_from(session):
+            # Skipped by the cache when only some columns were loaded
+            identity_cache.put(entity, self.unique_keys, token)
+        return entity
+
+    async def get_by_ids(
+        self, ids: list[Any], chunk_size: int = IN_CHUNK_SIZE
+    ) -> list[Optional[T]]:
+        """
+        Retrieve many entities by ID with one `IN` query per chunk, for reads only.
+
+        Returns one entry per requested ID, in request order, None when the
+        entity does not exist. IDs found in the identity cache are not queried.
+
+        - **ids**: The IDs to retrieve (duplicates allowed)
+        - **chunk_size**: Maximum number of IDs per query
         """
-        result = await self.session.execute(
-            select(self.model).where(self.model.id == id)
+        found = {}
+        missing = []
+        for id in dict.fromkeys(ids):
+            snapshot = identity_cache.get(self.model, id) if identity_cache.enabled else None
+            if snapshot is not None:
+                found[id] = to_entity(self.model, snapshot)
+            else:
+                missing.append(id)
+
+        token = identity_cache.token(self.model)
+        cache_reads = self._caches_reads_from(self.read_session)
+        for start in range(0, len(missing), chunk_size):
+            chunk = missing[start:start + chunk_size]
+            result = await self.read_session.execute(
+                select(self.model).where(self.model.id.in_(chunk))
+            )
+            for entity in result.scalars():
+                found[entity.id] = entity
+                if cache_reads:
+                    identity_cache.put(entity, self.unique_keys, token)
+        return [found.get(id) for id in ids]
+
+    async def get_by_unique(self, names: tuple[str, ...], values: tuple) -> Optional[T]:
+        """
+        Retrieve an entity by one of its `unique_keys`, for reads only (e.g.
+        duplicate checks): it may come from the identity cache.
+
+        - **names**: The key columns
+        - **values**: The values of those columns
+        """
+        if identity_cache.enabled:
+            snapshot = identity_cache.get_by_key(self.model, names, values)
+            if snapshot is not None:
+                return to_entity(self.model, snapshot)
+
+        token = identity_cache.token(self.model)
+        statement = select(self.model).where(
+            *(getattr(self.model, name) == value for name, value in zip(names, values))
         )
-        return result.scalar_one_or_none()
+        entity = (await self.session.execute(statement)).scalars().first()
+        if entity is not None:
+            identity_cache.put(entity, self.unique_keys, token)
+        return entity
 
     async def add(self, entity: T) -> T:
         """
@@ -37,8 +161,13 @@ class TemplateService(Generic[T]):
         - **entity**: The entity to add
         """
         self.session.add(entity)
+        await apply_snapshot_deltas(self.session, **self._snapshot_deltas(entity, 1))
         await self.session.commit()
         await self.session.refresh(entity)
+        identity_cache.put(entity, self.unique_keys)
+        await response_cache.invalidate(self.model.__tablename__)
+        count_cache.invalidate(self.model.__tablename__)
+        table_counters.increment(self.model.__tablename__, self._group(entity))
         return entity
 
     async def delete(self, id: Any) -> None:
@@ -47,8 +176,16 @@ class TemplateService(Generic[T]):
 
         - **id**: The ID of the entity to delete
         """
+        entity = await self.session.get(self.model, id)
+        if entity is not None and self.snapshot_count:
+            await apply_snapshot_deltas(self.session, **self._snapshot_deltas(entity, -1))
         await self.session.execute(delete(self.model).where(self.model.id == id))
         await self.session.commit()
+        identity_cache.evict(self.model, id)
+        await response_cache.invalidate(self.model.__tablename__)
+        self._invalidate_counts()
+        if entity is not None:
+            table_counters.increment(self.model.__tablename__, self._group(entity), -1)
 
     async def update(self, entity: T) -> T:
         """
@@ -56,6 +193,231 @@ class TemplateService(Generic[T]):
 
         - **entity**: The entity to update
         """
+        counted = [*self.snapshot_sums.values()]
+        if self.counter_column:
+            counted.append(self.counter_column)
+        previous = await self._previous_values(entity, counted)
+        await apply_snapshot_deltas(
+            self.session, **self._snapshot_update_deltas(entity, previous)
+        )
         merged_entity = await self.session.merge(entity)
         await self.session.commit()
+        # Evict first so reads started before the commit cannot store the old row
+        identity_cache.evict(self.model, merged_entity.id)
+        identity_cache.put(merged_entity, self.unique_keys)
+        await response_cache.invalidate(self.model.__tablename__)
+        self._invalidate_counts()
+        if self.counter_column:
+            table_counters.move(
+                self.model.__tablename__, previous[self.counter_column], self._group(merged_entity)
+            )
         return merged_entity
+
+    def _caches_reads_from(self, session) -> bool:
+        """Whether rows read from `session` may be cached (not from a lagging replica)."""
+        if session is self.session:
+            return True
+        return session.get_bind().url == self.session.get_bind().url
+
+    def _snapshot_deltas(self, entity: T, sign: int) -> dict[str, int]:
+        deltas = {
+            name: sign * (getattr(entity, column) or 0)
+            for name, column in self.snapshot_sums.items()
+        }
+        if self.snapshot_count:
+            deltas[self.snapshot_count] = sign
+        return deltas
+
+    async def _previous_values(self, entity: T, names: list[str]) -> dict[str, Any]:
+        """
+        Database values of some columns of an entity about to be updated.
+
+        Taken from the attribute history when the entity was loaded in this
+        session; otherwise (detached or merged entity, expired attribute) the
+        row is read back, without flushing the pending changes.
+
+        - **entity**: The modified entity
+        - **names**: The column names
+        """
+        state = inspect(entity)
+        loaded_here = state.persistent and state.session_id == self.session.sync_session.hash_key
+        previous, unknown = {}, []
+        for name in names:
+            history = state.attrs[name].history if loaded_here else None
+            if history is not None and history.deleted:
+                previous[name] = history.deleted[0]
+            elif history is not None and not history.added and name in state.dict:
+                previous[name] = state.dict[name]
+            else:
+                unknown.append(name)
+        if unknown:
+            statement = select(*(getattr(self.model, name) for name in unknown)).where(
+                self.model.id == entity.id
+            )
+            with self.session.no_autoflush:
+                row = (await self.session.execute(statement)).first()
+            previous.update(zip(unknown, row or (None,) * len(unknown)))
+        return previous
+
+    def _snapshot_update_deltas(self, entity: T, previous: dict[str, Any]) -> dict[str, int]:
+        return {
+            name: (getattr(entity, column) or 0) - (previous[column] or 0)
+            for name, column in self.snapshot_sums.items()
+        }
+
+    def _group(self, entity: T) -> Any:
+        """The entity's group in the estimated counters (None without `counter_column`)."""
+        return getattr(entity, self.counter_column) if self.counter_column else None
+
+    def _invalidate_counts(self) -> None:
+        # Exact counts are memoized per filter set; the estimated counters
+        # are kept current with deltas by each write
+        count_cache.invalidate(self.model.__tablename__)
+
+    async def _seed_counters(self) -> None:
+        table = self.model.__tablename__
+        if self.counter_column:
+            column = getattr(self.model, self.counter_column)
+            result = await self.read_session.execute(
+                select(column, func.count()).group_by(column)
+            )
+            table_counters.seed(table, {group: count for group, count in result.all()})
+        else:
+            total = await self.read_session.scalar(select(func.count()).select_from(self.model))
+            table_counters.seed(table, {None: total or 0})
+
+    async def count_filtered(
+        self,
+        statement,
+        filters: dict,
+        include_total: bool = True,
+        count_mode: str = "exact",
+    ) -> int | None:
+        """
+        Count the rows matched by a filtered statement.
+
+        - **statement**: The filtered select statement, without ordering or pagination
+        - **filters**: The filter values used to build the statement
+        - **include_total**: If False, skip counting and return None
+        - **count_mode**: "exact" (memoized COUNT) or "estimated" (maintained counters)
+        """
+        if not include_total:
+            return None
+
+        table = self.model.__tablename__
+        key = normalize_filters(filters)
+
+        active = {name for name, _ in key}
+        if count_mode == "estimated" and active <= {self.counter_column}:
+            if not table_counters.is_seeded(table):
+                await self._seed_counters()
+            group = filters.get(self.counter_column) if active else None
+            return table_counters.get(table, group)
+
+        cached = count_cache.get(table, key)
+        if cached is not None:
+            return cached
+
+        total_statement = select(func.count()).select_from(statement.subquery())
+        total = (await self.read_session.execute(total_statement)).scalar_one()
+        count_cache.set(table, key, total)
+        return total
+
+    def _bulk_key(self, data: dict) -> Any:
+        """Unique key of a bulk row, used to detect duplicates (None disables detection)."""
+        return None
+
+    async def _existing_bulk_keys(self, keys: set) -> set:
+        """Return the keys among `keys` that already exist in the database."""
+        return set()
+
+    async def bulk_import(
+        self,
+        records: AsyncIterator[tuple[int, Any]],
+        schema: Type[BaseModel],
+        batch_size: int = 500,
+    ) -> dict:
+        """
+        Validate and insert many rows in one transaction, reporting per-row errors.
+
+        - **records**: (index, payload) pairs, payload may be an exception for unparsable rows
+        - **schema**: The Pydantic schema each row is validated with
+        - **batch_size**: Number of rows per executemany batch
+        """
+        report = {"received": 0, "inserted": 0, "failed": 0, "errors": []}
+        # Inserted rows per counter group, added to the estimated counters once committed
+        self._bulk_groups: Counter = Counter()
+        seen = set()
+        batch = []
+        try:
+            async for index, payload in records:
+                report["received"] += 1
+                if isinstance(payload, Exception):
+                    self._bulk_error(report, index, str(payload))
+                    continue
+                try:
+                    data = schema.model_validate(payload).model_dump()
+                except ValidationError as e:
+                    self._bulk_error(report, index, self._validation_message(e))
+                    continue
+
+                key = self._bulk_key(data)
+                if key is not None:
+                    if key in seen:
+                        self._bulk_error(report, index, "Duplicate row in payload")
+                        continue
+                    seen.add(key)
+                batch.append((index, data))
+                if len(batch) >= batch_size:
+                    await self._flush_bulk(batch, report)
+                    batch = []
+            await self._flush_bulk(batch, report)
+            await self.session.commit()
+        except Exception:
+            await self.session.rollback()
+            raise
+        await response_cache.invalidate(self.model.__tablename__)
+        self._invalidate_counts()
+        for group, count in self._bulk_groups.items():
+            table_counters.increment(self.model.__tablename__, group, count)
+        return report
+
+    async def _flush_bulk(self, batch: list[tuple[int, dict]], report: dict) -> None:
+        if not batch:
+            return
+        keys = {self._bulk_key(data) for _, data in batch} - {None}
+        existing = await self._existing_bulk_keys(keys) if keys else set()
+
+        rows = []
+        for index, data in batch:
+            if self._bulk_key(data) in existing:
+                self._bulk_error(report, index, "Already exists")
+            else:
+                rows.append(data)
+        if not rows:
+            return
+
+        await self.session.execute(insert(self.model), rows)
+        deltas = Counter()
+        for row in rows:
+            for name, column in self.snapshot_sums.items():
+                deltas[name] += row.get(column) or 0
+        if self.snapshot_count:
+            deltas[self.snapshot_count] += len(rows)
+        await apply_snapshot_deltas(self.session, **deltas)
+        for row in rows:
+            self._bulk_groups[row.get(self.counter_column) if self.counter_column else None] += 1
+        report["inserted"] += len(rows)
+
+    @staticmethod
+    def _bulk_error(report: dict, index: int, message: str) -> None:
+        report["failed"] += 1
+        if len(report["errors"]) < MAX_REPORTED_ERRORS:
+            report["errors"].append({"index": index, "message": message})
+
+    @staticmethod
+    def _validation_message(error: ValidationError) -> str:
+        return "; ".join(
+            f"{'.'.join(str(part) for part in e['loc']) or 'row'}: {e['msg']}"
+            for e in error.errors()
+        )
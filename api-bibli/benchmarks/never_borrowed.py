@@ -0,0 +1,145 @@
+"""
+Never borrowed books report at scale: NOT IN + full materialization versus
+the NOT EXISTS anti-join with keyset pages and streaming.
+
+A SQLite file is seeded with books and loans (1M by default, a quarter of the
+books never borrowed), then each variant is timed:
+
+    python -m benchmarks.never_borrowed --books 50000 --loans 1000000
+"""
+import argparse
+import asyncio
+import datetime
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.data.models import BookCategory, LoanStatus
+from app.data.orm import Author, Base, Book, Loan
+from app.services.export_service import ExportService
+from app.services.stats_service import StatsService
+
+CHUNK = 50000
+
+
+async def seed(session_factory, books: int, loans: int) -> None:
+    now = datetime.datetime.now()
+    async with session_factory() as session:
+        session.add(
+            Author(
+                id=1,
+                first_name="Emile",
+                last_name="Zola",
+                date_of_birth=datetime.date(1840, 4, 2),
+                nationality="FR",
+            )
+        )
+        await session.flush()
+        for start in range(0, books, CHUNK):
+            await session.execute(
+                insert(Book),
+                [
+                    {
+                        "title": f"Book {i:07d}",
+                        "isbn": f"978{i:010d}",
+                        "year": 1900,
+                        "author_id": 1,
+                        "available_copies": 1,
+                        "total_copies_owned": 1,
+                        "category": BookCategory.FICTION,
+                        "language": "FR",
+                        "pages": 100,
+                        "publisher": "Bench",
+                    }
+                    for i in range(start, min(start + CHUNK, books))
+                ],
+            )
+        # Loans only touch the first three quarters of the books
+        borrowed = max(1, books * 3 // 4)
+        for start in range(0, loans, CHUNK):
+            await session.execute(
+                insert(Loan),
+                [
+                    {
+                        "book_id": i % borrowed + 1,
+                        "borrower_name": "Bench",
+                        "borrower_mail": f"user{i % 5000}@example.com",
+                        "card_number": "123456",
+                        "loan_date": now,
+                        "due_date": now + datetime.timedelta(days=14),
+                        "return_date": now,
+                        "status": LoanStatus.RETURNED,
+                        "renewed": False,
+                    }
+                    for i in range(start, min(start + CHUNK, loans))
+                ],
+            )
+        await session.commit()
+
+
+async def not_in(session) -> int:
+    # The previous implementation: NOT IN a DISTINCT subquery, every Book loaded
+    subquery = select(Loan.book_id).distinct()
+    result = await session.execute(select(Book).where(Book.id.not_in(subquery)))
+    return len(result.scalars().all())
+
+
+async def keyset_pages(session, page_size: int) -> int:
+    service = StatsService(session)
+    count, cursor = 0, None
+    while True:
+        items, cursor = await service.get_never_borrowed_books(page_size, cursor)
+        count += len(items)
+        if cursor is None:
+            return count
+
+
+async def first_page(session, page_size: int) -> int:
+    items, _ = await StatsService(session).get_never_borrowed_books(page_size)
+    return len(items)
+
+
+async def stream(session) -> int:
+    lines = 0
+    async for chunk in ExportService(session).stream_never_borrowed("ndjson"):
+        lines += chunk.count(b"\n")
+    return lines
+
+
+async def main(books: int, loans: int, page_size: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{Path(directory) / 'bench.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+        started = time.perf_counter()
+        await seed(session_factory, books, loans)
+        print(f"seeded {books} books and {loans} loans in {time.perf_counter() - started:.1f}s")
+
+        variants = {
+            "NOT IN + materialize (before)": not_in,
+            f"anti-join first page ({page_size})": lambda s: first_page(s, page_size),
+            f"anti-join all pages ({page_size})": lambda s: keyset_pages(s, page_size),
+            "anti-join stream (ndjson)": stream,
+        }
+        for name, variant in variants.items():
+            async with session_factory() as session:
+                started = time.perf_counter()
+                count = await variant(session)
+                elapsed = time.perf_counter() - started
+            print(f"{name:34} {elapsed * 1000:9.1f} ms  ({count} books)")
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the never borrowed books report")
+    parser.add_argument("--books", type=int, default=50000, help="Number of books")
+    parser.add_argument("--loans", type=int, default=1000000, help="Number of loans")
+    parser.add_argument("--page-size", type=int, default=100, help="Keyset page size")
+    args = parser.parse_args()
+    asyncio.run(main(args.books, args.loans, args.page_size))
@@ -0,0 +1,103 @@
+"""
+Per-item cost of serializing read schemas from ORM rows.
+
+"validated" is what a route returning ORM rows with a `response_model` costs:
+FastAPI validates the rows against the schema, dumps them in JSON mode and
+renders the result with json.dumps. "trusted" is the projection used by the
+read routes (app.core.serialization): rows to dicts, one JSON serialization.
+
+    python -m benchmarks.serialization --items 100 --rounds 200
+"""
+import argparse
+import datetime
+import json
+import timeit
+
+from app.core.serialization import adapter, orjson, project, render
+from app.data.models import BookCategory, LoanStatus
+from app.data.orm import Author, Book, Loan
+from app.schemas.author import AuthorRead
+from app.schemas.book import BookRead
+from app.schemas.loan import LoanRead
+
+
+def _rows(count: int) -> dict:
+    now = datetime.datetime(2024, 1, 1, 12, 0, 0)
+    loans = []
+    for i in range(count):
+        loan = Loan(
+            id=i,
+            book_id=i,
+            borrower_name="Test User",
+            borrower_mail="test@example.com",
+            card_number="123456",
+            loan_date=now,
+            due_date=now + datetime.timedelta(days=14),
+            status=LoanStatus.ON_LOAN,
+            renewed=False,
+        )
+        # Computed columns attached by LoanService
+        loan.book_title, loan.days_late, loan.penalty = f"Book {i}", 0, 0.0
+        loans.append(loan)
+    return {
+        BookRead: [
+            Book(
+                id=i,
+                title=f"Book {i}",
+                isbn=f"978{i:010d}",
+                year=1900,
+                author_id=1,
+                available_copies=1,
+                total_copies_owned=1,
+                description="Lorem ipsum " * 40,
+                category=BookCategory.FICTION,
+                language="FR",
+                pages=100,
+                publisher="Bench",
+            )
+            for i in range(count)
+        ],
+        AuthorRead: [
+            Author(
+                id=i,
+                first_name="Emile",
+                last_name=f"Zola {i}",
+                date_of_birth=datetime.date(1840, 4, 2),
+                nationality="FR",
+                biography="Lorem ipsum " * 40,
+            )
+            for i in range(count)
+        ],
+        LoanRead: loans,
+    }
+
+
+def validated(schema, rows) -> bytes:
+    items = adapter(list[schema])
+    content = items.dump_python(items.validate_python(rows, from_attributes=True), mode="json")
+    return json.dumps(content).encode()
+
+
+def trusted(schema, rows) -> bytes:
+    return render([project(schema, row) for row in rows])
+
+
+def main(items: int, rounds: int) -> None:
+    print(f"JSON backend: {'orjson' if orjson is not None else 'pydantic-core'}")
+    for schema, rows in _rows(items).items():
+        assert json.loads(validated(schema, rows)) == json.loads(trusted(schema, rows))
+        before = timeit.timeit(lambda: validated(schema, rows), number=rounds)
+        after = timeit.timeit(lambda: trusted(schema, rows), number=rounds)
+        per_item = 1e6 / (rounds * items)
+        print(
+            f"{schema.__name__:10} validated {before * per_item:7.2f} us/item   "
+            f"trusted {after * per_item:7.2f} us/item   x{before / after:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark read schema serialization")
+    parser.add_argument("--items", type=int, default=100, help="Rows per serialization")
+    parser.add_argument("--rounds", type=int, default=200, help="Serializations per schema")
+    args = parser.parse_args()
+    main(args.items, args.rounds)
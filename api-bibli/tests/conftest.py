@@ -0,0 +1,162 @@
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
+from pathlib import Path
+from typing import Any
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.counts import count_cache, table_counters
+from app.core.identity_cache import identity_cache
+from app.core.response_cache import response_cache
+from app.data.orm import Base, get_db, get_read_db
+from app.services.leaderboard import author_leaderboard, book_leaderboard
+from tests.factories import make_author, make_book
+
+
+@pytest.fixture(autouse=True)
+def reset_process_caches():
+    """Tests use their own databases: never let cached rows or counts leak between them."""
+    count_cache.clear()
+    table_counters.clear()
+    identity_cache.clear()
+    book_leaderboard.clear()
+    author_leaderboard.clear()
+    asyncio.run(response_cache.clear())
+    yield
+
+
+class LibraryDatabase:
+    """
+    A SQLite file for one test.
+
+    `seed` creates the schema and adds rows; `connect` opens an engine on the
+    running event loop and `client` serves routers from the file. Statements run
+    by those engines are recorded in `executed`, as (statement, parameters).
+
+    - **path**: Path of the database file
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.url = f"sqlite+aiosqlite:///{path}"
+        self.executed: list[tuple[str, Any]] = []
+
+    @property
+    def statements(self) -> list[str]:
+        return [statement for statement, _ in self.executed]
+
+    @property
+    def selects(self) -> list[str]:
+        return [s for s in self.statements if s.lstrip().upper().startswith("SELECT")]
+
+    def _engine(self, **options):
+        engine = create_async_engine(self.url, **options)
+
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def record(conn, cursor, statement, parameters, context, executemany):
+            self.executed.append((statement, parameters))
+
+        return engine
+
+    def seed(self, *groups) -> None:
+        """
+        Create the schema, then add and commit rows, flushed group by group.
+
+        - **groups**: ORM objects, lists of them, or callables taking a sync session
+        """
+
+        async def run():
+            async with self.connect() as session_factory:
+                async with session_factory.kw["bind"].begin() as conn:
+                    await conn.run_sync(Base.metadata.create_all)
+                async with session_factory() as session:
+                    for group in groups:
+                        if callable(group):
+                            await session.run_sync(group)
+                        elif isinstance(group, (list, tuple)):
+                            session.add_all(group)
+                        else:
+                            session.add(group)
+                        await session.flush()
+                    await session.commit()
+
+        asyncio.run(run())
+        self.executed.clear()
+
+    @asynccontextmanager
+    async def connect(self, **engine_options):
+        """Session factory on the file for the running event loop, disposed on exit."""
+        engine = self._engine(**engine_options)
+        try:
+            yield sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        finally:
+            await engine.dispose()
+
+    def serve(self, app: FastAPI, session_factory) -> FastAPI:
+        """Open the database sessions of the app's routes from `session_factory`."""
+
+        async def override_get_db():
+            async with session_factory() as session:
+                yield session
+
+        app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[get_read_db] = override_get_db
+        return app
+
+    @contextmanager
+    def client(self, *routers, app: FastAPI | None = None, lifespan: bool = True, **engine_options):
+        """
+        TestClient of an app serving the routers from the file.
+
+        - **routers**: Routers to include
+        - **app**: The app (default: a new one); its database overrides are removed on exit
+        - **lifespan**: Enter the app lifespan; without it each request runs on its
+          own event loop, so pass `poolclass=NullPool`
+        - **engine_options**: Options of the engine
+        """
+        app = app or FastAPI()
+        for router in routers:
+            app.include_router(router)
+        engine = self._engine(**engine_options)
+        self.serve(app, sessionmaker(engine, class_=AsyncSession, expire_on_commit=False))
+        try:
+            if lifespan:
+                with TestClient(app) as client:
+                    yield client
+                    # Close the pooled connections on the loop that opened them
+                    client.portal.call(engine.dispose)
+            else:
+                yield TestClient(app)
+                asyncio.run(engine.dispose())
+        finally:
+            app.dependency_overrides.pop(get_db, None)
+            app.dependency_overrides.pop(get_read_db, None)
+
+    @asynccontextmanager
+    async def async_client(self, session_factory, *routers):
+        """httpx client of an app serving the routers, on the running event loop."""
+        app = self.serve(FastAPI(), session_factory)
+        for router in routers:
+            app.include_router(router)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            yield client
+
+
+@pytest.fixture
+def database(tmp_path) -> LibraryDatabase:
+    """An empty SQLite file (no schema until seeded)."""
+    return LibraryDatabase(tmp_path / "library.db")
+
+
+@pytest.fixture
+def catalogue(database) -> LibraryDatabase:
+    """The database holding Emile Zola (author 1) and Germinal (book 1)."""
+    database.seed(make_author(), make_book())
+    return database
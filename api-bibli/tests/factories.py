@@ -0,0 +1,48 @@
+"""Rows for test databases: by default Emile Zola (author 1) and Germinal (book 1)."""
+import datetime
+
+from app.data.models import BookCategory, LoanStatus
+from app.data.orm import Author, Book, Loan
+
+
+def make_author(**fields) -> Author:
+    values = {
+        "first_name": "Emile",
+        "last_name": "Zola",
+        "date_of_birth": datetime.date(1840, 4, 2),
+        "nationality": "FR",
+    }
+    return Author(**{**values, **fields})
+
+
+def make_book(**fields) -> Book:
+    values = {
+        "title": "Germinal",
+        "isbn": "9780000000001",
+        "year": 1885,
+        "author_id": 1,
+        "available_copies": 3,
+        "total_copies_owned": 3,
+        "category": BookCategory.FICTION,
+        "language": "FR",
+        "pages": 500,
+        "publisher": "Charpentier",
+    }
+    return Book(**{**values, **fields})
+
+
+def make_loan(**fields) -> Loan:
+    """A loan of book 1 due 14 days after `loan_date` (default: now), returned if `return_date` is set."""
+    loan_date = fields.pop("loan_date", None) or datetime.datetime.now()
+    returned = fields.get("return_date") is not None
+    values = {
+        "book_id": 1,
+        "borrower_name": "ann",
+        "borrower_mail": "ann@example.com",
+        "card_number": "123456",
+        "loan_date": loan_date,
+        "due_date": loan_date + datetime.timedelta(days=14),
+        "status": LoanStatus.RETURNED if returned else LoanStatus.ON_LOAN,
+        "renewed": False,
+    }
+    return Loan(**{**values, **fields})
@@ -47,3 +47,35 @@ def test_delete_author():
 
     response = client.delete("/authors/1")
     assert response.status_code == 200
+
+def test_bulk_create_authors_ndjson():
+    received = []
+
+    async def bulk_import(records, schema, batch_size):
+        async for index, payload in records:
+            received.append(payload)
+        return {"received": len(received), "inserted": len(received), "failed": 0, "errors": []}
+
+    mock_service = AsyncMock()
+    mock_service.bulk_import.side_effect = bulk_import
+    app.dependency_overrides[AuthorService] = lambda: mock_service
+
+    response = client.post(
+        "/authors/bulk",
+        content=b'{"first_name": "John"}\n{"first_name": "Jane"}\n',
+        headers={"content-type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    assert response.json()["received"] == 2
+    assert received[1]["first_name"] == "Jane"
+
+def test_batch_get_authors():
+    mock_service = AsyncMock()
+    mock_service.get_by_ids.return_value = [AuthorRead(id=2, first_name="John", last_name="Doe", date_of_birth="1970-01-01", nationality="USA"), None]
+    app.dependency_overrides[AuthorService] = lambda: mock_service
+
+    response = client.post("/authors/batch-get", json={"ids": [2, 5]})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["items"][0]["item"]["last_name"] == "Doe"
+    assert data["not_found"] == [5]
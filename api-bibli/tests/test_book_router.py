@@ -5,6 +5,7 @@ from app.main import app
 from app.routers.book_router import router
 from app.services.book_service import BookService
 from app.schemas.book import BookRead
+from app.core.pagination import InvalidCursorError
 
 app = FastAPI()
 app.include_router(router)
@@ -49,3 +50,83 @@ def test_delete_book():
 
     response = client.delete("/books/1")
     assert response.status_code == 200
+
+def test_list_books_cursor():
+    mock_service = AsyncMock()
+    mock_service.get_all_keyset.return_value = ([], "abc")
+    app.dependency_overrides[BookService] = lambda: mock_service
+
+    response = client.get("/books/cursor", params={"page_size": 10})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["next_cursor"] == "abc"
+    assert data["has_more"] is True
+
+def test_list_books_cursor_invalid():
+    mock_service = AsyncMock()
+    mock_service.get_all_keyset.side_effect = InvalidCursorError("Invalid cursor")
+    app.dependency_overrides[BookService] = lambda: mock_service
+
+    response = client.get("/books/cursor", params={"cursor": "garbage"})
+    assert response.status_code == 400
+
+def test_list_books_without_total():
+    mock_service = AsyncMock()
+    mock_service.get_all_filtered.return_value = ([], None)
+    app.dependency_overrides[BookService] = lambda: mock_service
+
+    response = client.get("/books/", params={"include_total": "false"})
+    assert response.status_code == 200
+    assert response.json()["total"] is None
+    assert mock_service.get_all_filtered.call_args.kwargs["include_total"] is False
+
+def test_list_books_search_by_relevance():
+    mock_service = AsyncMock()
+    mock_service.get_all_filtered.return_value = ([], 0)
+    app.dependency_overrides[BookService] = lambda: mock_service
+
+    response = client.get("/books/", params={"search": "germ", "sort_by": "relevance"})
+    assert response.status_code == 200
+    assert mock_service.get_all_filtered.call_args.kwargs["sort_by"] == "relevance"
+
+def test_bulk_create_books():
+    mock_service = AsyncMock()
+    mock_service.bulk_import.return_value = {
+        "received": 2, "inserted": 1, "failed": 1,
+        "errors": [{"index": 1, "message": "Already exists"}],
+    }
+    app.dependency_overrides[BookService] = lambda: mock_service
+
+    response = client.post("/books/bulk", json=[{}, {}])
+    assert response.status_code == 200
+    assert response.json()["errors"][0]["index"] == 1
+
+def test_get_books_batch():
+    book = BookRead(id=1, title="Test Book", isbn="9786413332929", author_id=1, year=2023, total_copies_owned=5, available_copies=5, category="Fiction", language="EN", publisher="Test Publisher", pages=100)
+    mock_service = AsyncMock()
+    mock_service.get_by_ids.return_value = [None, book]
+    app.dependency_overrides[BookService] = lambda: mock_service
+
+    response = client.get("/books/batch", params={"ids": "7,1"})
+    assert response.status_code == 200
+    data = response.json()
+    assert [item["found"] for item in data["items"]] == [False, True]
+    assert data["items"][1]["item"]["title"] == "Test Book"
+    assert data["not_found"] == [7]
+    mock_service.get_by_ids.assert_awaited_once_with([7, 1])
+
+def test_get_books_batch_invalid_ids():
+    app.dependency_overrides[BookService] = lambda: AsyncMock()
+
+    assert client.get("/books/batch", params={"ids": "1,abc"}).status_code == 400
+    assert client.get("/books/batch", params={"ids": ","}).status_code == 400
+
+def test_batch_get_books():
+    mock_service = AsyncMock()
+    mock_service.get_by_ids.return_value = [None]
+    app.dependency_overrides[BookService] = lambda: mock_service
+
+    response = client.post("/books/batch-get", json={"ids": [3]})
+    assert response.status_code == 200
+    assert response.json() == {"items": [{"id": 3, "found": False, "item": None}], "not_found": [3]}
+    assert client.post("/books/batch-get", json={"ids": []}).status_code == 422
@@ -0,0 +1,221 @@
+import asyncio
+import datetime
+
+import pytest
+from sqlalchemy import select
+
+from app.data.orm import Author, Book, LibraryStats, LoanHistory
+from app.schemas.author import AuthorBase
+from app.schemas.book import BookBase
+from app.schemas.loan import LoanCreate
+from app.services.author_service import AuthorService
+from app.services.book_service import BookService
+from app.services.leaderboard import (
+    author_leaderboard,
+    book_leaderboard,
+    rebuild_leaderboards,
+)
+from app.services.loan_history import rebuild_loan_history
+from app.services.loan_service import LoanService
+from app.services.stats_snapshot import refresh_snapshot
+from tests.factories import make_author, make_book, make_loan
+
+SNAPSHOT_FIELDS = (
+    "total_books", "total_copies", "available_copies", "total_authors",
+    "total_loans", "active_loans",
+)
+
+
+@pytest.fixture
+def database(database):
+    # One loan short of the limit
+    loan_date = datetime.datetime.now() - datetime.timedelta(days=1)
+    database.seed(
+        make_author(),
+        [
+            make_book(
+                id=book_id,
+                title=f"Book {book_id}",
+                isbn=f"978{book_id:010d}",
+                available_copies=available,
+                total_copies_owned=total,
+                pages=100,
+            )
+            for book_id, available, total in ((1, 2, 2), (2, 5, 9))
+        ],
+        [
+            make_loan(
+                book_id=2,
+                borrower_name="zoe",
+                borrower_mail="zoe@example.com",
+                loan_date=loan_date,
+            )
+            for _ in range(4)
+        ],
+    )
+    return database
+
+
+async def _records(rows):
+    for index, row in enumerate(rows):
+        yield index, row
+
+
+async def _run(database, scenario):
+    """Run `scenario(session)` on the seeded database with the snapshot and history built."""
+    async with database.connect() as session_factory, session_factory() as session:
+        await refresh_snapshot(session)
+        await rebuild_loan_history(session)
+        await session.commit()
+        await rebuild_leaderboards(session)
+        return await scenario(session)
+
+
+async def _snapshot_matches_tables(session) -> bool:
+    """The maintained snapshot equals a recomputation from the tables."""
+    session.expire_all()
+    stored = await session.get(LibraryStats, 1)
+    maintained = {name: getattr(stored, name) for name in SNAPSHOT_FIELDS}
+    recomputed = await refresh_snapshot(session)
+    return maintained == {name: recomputed[name] for name in SNAPSHOT_FIELDS}
+
+
+def _author(first_name: str, last_name: str = "Hugo") -> dict:
+    return {
+        "first_name": first_name,
+        "last_name": last_name,
+        "date_of_birth": "1802-02-26",
+        "nationality": "FR",
+    }
+
+
+def _book(isbn: str, copies: int = 3) -> dict:
+    return {
+        "title": f"Book {isbn}",
+        "isbn": isbn,
+        "year": 1862,
+        "author_id": 1,
+        "available_copies": copies,
+        "total_copies_owned": copies,
+        "category": "Fiction",
+        "language": "FR",
+        "pages": 100,
+        "publisher": "Lacroix",
+    }
+
+
+def test_bulk_authors_report_duplicates_and_existing_rows(database):
+    rows = [
+        _author("Victor"),
+        _author("Emile", "Zola"),
+        ValueError("Invalid JSON: line 3"),
+        _author("Adele"),
+        # Same key as row 0, in another batch
+        _author("Victor"),
+        {"first_name": "Nameless"},
+        _author("Leopoldine"),
+    ]
+
+    async def scenario(session):
+        report = await AuthorService(session).bulk_import(_records(rows), AuthorBase, batch_size=2)
+        names = (await session.execute(select(Author.first_name).order_by(Author.id))).scalars()
+        return report, list(names), await _snapshot_matches_tables(session)
+
+    report, names, snapshot_ok = asyncio.run(_run(database, scenario))
+    assert (report["received"], report["inserted"], report["failed"]) == (7, 3, 4)
+    errors = {error["index"]: error["message"] for error in report["errors"]}
+    assert errors[1] == "Already exists"
+    assert errors[2] == "Invalid JSON: line 3"
+    assert errors[4] == "Duplicate row in payload"
+    assert errors[5].startswith("last_name: Field required")
+    assert names == ["Emile", "Victor", "Adele", "Leopoldine"]
+    assert snapshot_ok
+
+
+def test_bulk_books_dedupe_against_database_and_payload(database):
+    rows = [
+        _book("9780000000010", copies=2),
+        _book("9780000000001"),
+        _book("9780000000011", copies=5),
+        _book("9780000000010"),
+        _book("9780000000002"),
+    ]
+
+    async def scenario(session):
+        report = await BookService(session).bulk_import(_records(rows), BookBase, batch_size=2)
+        isbns = (await session.execute(select(Book.isbn).order_by(Book.id))).scalars()
+        return report, list(isbns), await _snapshot_matches_tables(session)
+
+    report, isbns, snapshot_ok = asyncio.run(_run(database, scenario))
+    assert (report["inserted"], report["failed"]) == (2, 3)
+    assert report["errors"] == [
+        {"index": 1, "message": "Already exists"},
+        {"index": 3, "message": "Duplicate row in payload"},
+        {"index": 4, "message": "Already exists"},
+    ]
+    assert isbns == ["9780000000001", "9780000000002", "9780000000010", "9780000000011"]
+    # Totals and available copies of the new books were added to the snapshot
+    assert snapshot_ok
+
+
+def test_bulk_loans_check_availability_and_limit_across_batches(database):
+    def loan(name: str, book_id: int, mail: str | None = None) -> dict:
+        return {
+            "borrower_name": name,
+            "borrower_mail": mail or f"{name}@example.com",
+            "card_number": "654321",
+            "book_id": book_id,
+        }
+
+    rows = [
+        # Batch 1: the second loan of book 1 takes its last copy, the third fails
+        loan("ann", 1),
+        loan("bob", 1),
+        loan("cat", 1),
+        # Batch 2: book 1 was exhausted by the previous batch
+        loan("zoe", 2),
+        loan("dan", 1),
+        loan("ann", 99),
+        # Batch 3: zoe reached the limit in the previous batch
+        loan("zoe", 2),
+        loan("eve", 2, mail="not a mail"),
+        loan("ann", 2),
+    ]
+
+    async def scenario(session):
+        report = await LoanService(session).bulk_import(_records(rows), LoanCreate, batch_size=3)
+        session.expire_all()
+        available = {
+            book.id: book.available_copies
+            for book in (await session.execute(select(Book))).scalars()
+        }
+        maintained = {
+            history.book_id: (history.total_loans, history.popularity_rank)
+            for history in (await session.execute(select(LoanHistory))).scalars()
+        }
+        snapshot_ok = await _snapshot_matches_tables(session)
+        await rebuild_loan_history(session)
+        session.expire_all()
+        rebuilt = {
+            history.book_id: (history.total_loans, history.popularity_rank)
+            for history in (await session.execute(select(LoanHistory))).scalars()
+        }
+        leaders = (book_leaderboard.top("all", 10), author_leaderboard.top("7d", 10))
+        return report, available, maintained, rebuilt, snapshot_ok, leaders
+
+    report, available, maintained, rebuilt, snapshot_ok, leaders = asyncio.run(
+        _run(database, scenario)
+    )
+    assert (report["received"], report["inserted"], report["failed"]) == (9, 4, 5)
+    errors = {error["index"]: error["message"] for error in report["errors"]}
+    assert errors[2] == errors[4] == "Book is not currently available"
+    assert errors[5] == "Book not found"
+    assert errors[6] == "Loan limit reached (5 max)"
+    assert errors[7].startswith("borrower_mail:")
+    assert available == {1: 0, 2: 3}
+    # History, snapshot and leaderboards include the imported loans
+    assert maintained == rebuilt == {1: (2, 2), 2: (6, 1)}
+    assert snapshot_ok
+    book_top, author_top = leaders
+    assert book_top == [(2, 6), (1, 2)]
+    assert author_top == [(1, 8)]
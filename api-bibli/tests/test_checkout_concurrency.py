@@ -0,0 +1,82 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+
+from app.core.retry import DatabaseBusyError, retry_on_lock
+from app.data.orm import Book, Loan
+from app.schemas.loan import LoanCreate
+from app.services.loan_service import MAX_LOANS_PER_USER, LoanService
+from tests.factories import make_author, make_book
+
+COPIES = 50
+CHECKOUTS = 500
+
+
+@pytest.fixture
+def database(database):
+    database.seed(make_author(), make_book(available_copies=COPIES, total_copies_owned=COPIES))
+    return database
+
+
+async def _checkouts(database, mails):
+    """Run one checkout per mail concurrently, each on its own session. Returns (created, refused, state)."""
+
+    async def checkout(mail):
+        async with session_factory() as session:
+            try:
+                await LoanService(session).create_loan(
+                    LoanCreate(
+                        book_id=1,
+                        borrower_name="Test User",
+                        borrower_mail=mail,
+                        card_number="123456",
+                    )
+                )
+                return True
+            except HTTPException as e:
+                assert e.status_code == 400
+                return False
+
+    async with database.connect(pool_size=20, max_overflow=0) as session_factory:
+        results = await asyncio.gather(*(checkout(mail) for mail in mails))
+        async with session_factory() as session:
+            state = {
+                "available": await session.scalar(select(Book.available_copies)),
+                "loans": await session.scalar(select(func.count(Loan.id))),
+            }
+    return results.count(True), results.count(False), state
+
+
+def test_concurrent_checkouts_never_oversell(database):
+    mails = [f"user{i}@example.com" for i in range(CHECKOUTS)]
+    created, refused, state = asyncio.run(_checkouts(database, mails))
+
+    assert created == COPIES
+    assert refused == CHECKOUTS - COPIES
+    assert state == {"available": 0, "loans": COPIES}
+
+
+def test_concurrent_checkouts_respect_borrower_limit(database):
+    created, refused, state = asyncio.run(_checkouts(database, ["same@example.com"] * 20))
+
+    assert created == MAX_LOANS_PER_USER
+    assert state["loans"] == MAX_LOANS_PER_USER
+    assert state["available"] == COPIES - MAX_LOANS_PER_USER
+
+
+def test_retry_on_lock_retries_then_gives_up():
+    session = AsyncMock()
+    calls = []
+
+    async def locked():
+        calls.append(1)
+        raise OperationalError("UPDATE books", {}, Exception("database is locked"))
+
+    with pytest.raises(DatabaseBusyError):
+        asyncio.run(retry_on_lock(session, locked, attempts=3, base_delay=0))
+    assert len(calls) == 3
+    assert session.rollback.await_count == 3
@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.core.config import DatabaseSettings
+from app.data.engine import build_engine, build_read_engine
+
+
+async def _pragmas(engine):
+    async with engine.connect() as conn:
+        values = {
+            name: (await conn.execute(text(f"PRAGMA {name}"))).scalar()
+            for name in ("journal_mode", "synchronous", "busy_timeout", "mmap_size")
+        }
+    await engine.dispose()
+    return values
+
+
+def test_sqlite_file_engine_applies_pragmas(tmp_path):
+    engine = build_engine(
+        DatabaseSettings(url=f"sqlite+aiosqlite:///{tmp_path / 'library.db'}", pool_size=3)
+    )
+    assert engine.pool.size() == 3
+
+    pragmas = asyncio.run(_pragmas(engine))
+    # synchronous NORMAL is 1
+    assert pragmas == {
+        "journal_mode": "wal",
+        "synchronous": 1,
+        "busy_timeout": 5000,
+        "mmap_size": 268435456,
+    }
+
+
+def test_memory_engine_skips_file_pragmas():
+    pragmas = asyncio.run(_pragmas(build_engine(DatabaseSettings(url="sqlite+aiosqlite://"))))
+    assert pragmas["journal_mode"] == "memory"
+    assert pragmas["busy_timeout"] == 5000
+
+
+def test_settings_from_env(monkeypatch):
+    monkeypatch.setenv("LIBRARY_DATABASE_URL", "postgresql+asyncpg://u:p@db/library")
+    monkeypatch.setenv("LIBRARY_DB_POOL_SIZE", "25")
+    monkeypatch.setenv("LIBRARY_SQLITE_SYNCHRONOUS", "FULL")
+
+    settings = DatabaseSettings.from_env()
+    assert settings.url == "postgresql+asyncpg://u:p@db/library"
+    assert settings.pool_size == 25
+    assert settings.max_overflow == DatabaseSettings().max_overflow
+    assert settings.sqlite_pragmas["synchronous"] == "FULL"
+
+
+def test_read_engine_sees_writes_but_refuses_them(tmp_path):
+    settings = DatabaseSettings(url=f"sqlite+aiosqlite:///{tmp_path / 'library.db'}")
+
+    async def run():
+        primary = build_engine(settings)
+        reader = build_read_engine(settings, primary)
+        assert reader is not primary
+        async with primary.begin() as conn:
+            await conn.execute(text("CREATE TABLE t (x INTEGER)"))
+            await conn.execute(text("INSERT INTO t VALUES (1)"))
+        try:
+            async with reader.connect() as conn:
+                assert (await conn.execute(text("SELECT count(*) FROM t"))).scalar() == 1
+                with pytest.raises(OperationalError, match="readonly"):
+                    await conn.execute(text("INSERT INTO t VALUES (2)"))
+        finally:
+            await reader.dispose()
+            await primary.dispose()
+
+    asyncio.run(run())
+
+
+def test_memory_read_engine_is_the_primary():
+    settings = DatabaseSettings(url="sqlite+aiosqlite://")
+    primary = build_engine(settings)
+    assert build_read_engine(settings, primary) is primary
@@ -0,0 +1,182 @@
+import asyncio
+import datetime
+import types
+
+from sqlalchemy import func, select
+
+from app.core import counts as counts_module
+from app.core.counts import table_counters
+from app.data.models import BookCategory, LoanStatus
+from app.data.orm import Author, Book, Loan
+from app.schemas.loan import LoanCreate, LoanReturn
+from app.services.author_service import AuthorService
+from app.services.book_service import BookService
+from app.services.loan_service import LoanService
+from app.services.overdue_sweeper import sweep_overdue
+from tests.factories import make_author, make_book
+
+NATIONALITIES = ("FR", "GB", "US")
+
+
+def _author(first_name: str, nationality: str) -> Author:
+    return make_author(first_name=first_name, last_name="Doe", nationality=nationality)
+
+
+def _book(isbn: int, category: BookCategory) -> Book:
+    return make_book(
+        title=f"Book {isbn}",
+        isbn=f"978{isbn:010d}",
+        available_copies=2,
+        total_copies_owned=2,
+        category=category,
+        pages=100,
+    )
+
+
+async def _mismatches(session) -> list:
+    """Estimated totals (maintained counters) that differ from a COUNT of the table."""
+    checks = [
+        (BookService(session), Book.category, "category", [*BookCategory, None]),
+        (AuthorService(session), Author.nationality, "nationality", [*NATIONALITIES, None]),
+        (LoanService(session), Loan.status, "status", [*LoanStatus, None]),
+    ]
+    mismatches = []
+    for service, column, name, groups in checks:
+        for group in groups:
+            _, estimated = await service.get_all_filtered(
+                page=1, page_size=1, count_mode="estimated", **{name: group}
+            )
+            statement = select(func.count()).select_from(column.table)
+            if group is not None:
+                statement = statement.where(column == group)
+            exact = await session.scalar(statement)
+            if estimated != exact:
+                mismatches.append((name, group, estimated, exact))
+    return mismatches
+
+
+def test_estimated_totals_follow_every_write(database):
+    database.seed(
+        [_author("Emile", "FR"), _author("Jane", "GB")],
+        [_book(1, BookCategory.FICTION), _book(2, BookCategory.FICTION),
+         _book(3, BookCategory.HISTORY)],
+    )
+
+    async def scenario():
+        async with database.connect() as session_factory:
+            steps = {}
+
+            async def check(step):
+                # Kept current by deltas since the first check, never dropped and re-seeded
+                steps[step + " seeded"] = all(
+                    table_counters.is_seeded(table) for table in ("books", "authors", "loans")
+                )
+                async with session_factory() as session:
+                    steps[step] = await _mismatches(session)
+
+            await check("seed")
+            async with session_factory() as session:
+                await AuthorService(session).add(_author("Mark", "US"))
+                await BookService(session).add(_book(4, BookCategory.SCIENCE))
+            await check("add")
+
+            async with session_factory() as session:
+                service = AuthorService(session)
+                author = await service.get_by_id(1)
+                author.nationality = "US"
+                await service.update(author)
+                service = BookService(session)
+                book = await service.get_by_id(1)
+                book.category = BookCategory.HISTORY
+                await service.update(book)
+                # Unchanged group
+                book = await service.get_by_id(2)
+                book.title = "Renamed"
+                await service.update(book)
+            await check("update")
+
+            async with session_factory() as session:
+                await BookService(session).delete(3)
+                await AuthorService(session).delete(2)
+                await BookService(session).delete(999)
+            await check("delete")
+
+            async with session_factory() as session:
+                service = LoanService(session)
+                loans = [
+                    await service.create_loan(
+                        LoanCreate(
+                            book_id=book_id,
+                            borrower_name="ann",
+                            borrower_mail="ann@example.com",
+                            card_number="123456",
+                        )
+                    )
+                    for book_id in (1, 2, 4)
+                ]
+            await check("checkout")
+
+            async with session_factory() as session:
+                await LoanService(session).return_loan(loans[0].id, LoanReturn())
+                await sweep_overdue(session, now=datetime.datetime.now() + datetime.timedelta(days=30))
+            await check("return and sweep")
+
+            async with session_factory() as session:
+                await LoanService(session).renew_loan(loans[1].id)
+            await check("renew")
+            return steps
+
+    steps = asyncio.run(scenario())
+    assert steps == {
+        step: result
+        for name in ("seed", "add", "update", "delete", "checkout", "return and sweep", "renew")
+        for step, result in ((name, []), (name + " seeded", name != "seed"))
+    }
+
+
+def test_exact_counts_are_cached_per_filter_value(database):
+    database.seed(
+        _author("Emile", "FR"), [_book(1, BookCategory.FICTION), _book(2, BookCategory.HISTORY)]
+    )
+
+    async def scenario():
+        async with database.connect() as session_factory, session_factory() as session:
+            service = BookService(session)
+            totals = []
+            # The language filter is case-sensitive: "fr" matches no book
+            for language in ("fr", "FR"):
+                books, total = await service.get_all_filtered(
+                    page=1, page_size=10, language=language
+                )
+                totals.append((len(books), total))
+            return totals
+
+    assert asyncio.run(scenario()) == [(0, 0), (2, 2)]
+
+
+def test_estimated_totals_converge_after_writes_of_another_worker(database, monkeypatch):
+    clock = types.SimpleNamespace(monotonic=lambda: 1000.0)
+    monkeypatch.setattr(counts_module, "time", clock)
+    database.seed(_author("Emile", "FR"))
+
+    async def scenario():
+        async with database.connect() as session_factory:
+
+            async def estimated(nationality=None):
+                async with session_factory() as session:
+                    _, total = await AuthorService(session).get_all_filtered(
+                        page=1, page_size=1, count_mode="estimated", nationality=nationality
+                    )
+                    return total
+
+            totals = [await estimated()]
+            # Written by another worker: no delta reaches this process's counters
+            async with session_factory() as session:
+                session.add_all([_author("Jane", "GB"), _author("Mark", "GB")])
+                await session.commit()
+            totals.append(await estimated())
+            clock.monotonic = lambda: 1000.0 + table_counters.ttl_seconds + 1
+            totals.append((await estimated(), await estimated("GB")))
+            return totals
+
+    assert asyncio.run(scenario()) == [1, 1, (3, 2)]
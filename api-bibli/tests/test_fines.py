@@ -0,0 +1,71 @@
+import asyncio
+import datetime
+
+import pytest
+
+from app.services.fines import MAX_PENALTY, calculate_penalty
+from app.services.loan_service import LoanService
+from app.services.stats_service import StatsService
+from tests.factories import make_loan
+
+NOW = datetime.datetime.now()
+
+# (borrower, due date offset in days, return date offset or None)
+LOANS = [
+    ("a@example.com", -3, None),    # 3 days late, active
+    ("a@example.com", -40, None),   # capped, active
+    ("b@example.com", -20, -16),    # returned 4 days late
+    ("b@example.com", -10, -12),    # returned on time
+    ("c@example.com", 5, None),     # not due yet
+]
+
+
+@pytest.fixture
+def database(catalogue):
+    catalogue.seed(
+        [
+            make_loan(
+                borrower_name=mail.split("@")[0],
+                borrower_mail=mail,
+                loan_date=NOW + datetime.timedelta(days=due - 14, hours=-1),
+                return_date=NOW + datetime.timedelta(days=returned) if returned else None,
+            )
+            for mail, due, returned in LOANS
+        ]
+    )
+    return catalogue
+
+
+async def _run(database, check):
+    async with database.connect() as session_factory:
+        async with session_factory() as session:
+            await check(session)
+
+
+def test_page_penalties_match_python_rule(database):
+    async def check(session):
+        loans, _ = await LoanService(session).get_all_filtered(
+            page=1, page_size=10, include_total=False
+        )
+        assert len(loans) == len(LOANS)
+        for loan in loans:
+            expected = calculate_penalty(loan.due_date, loan.return_date or datetime.datetime.now())
+            assert (loan.penalty, loan.days_late) == expected
+
+    asyncio.run(_run(database, check))
+
+
+def test_fines_report(database):
+    async def check(session):
+        report = await StatsService(session).get_fines_report()
+
+        assert report["late_loans"] == 3
+        assert report["outstanding_fines"] == 1.5 + MAX_PENALTY
+        assert report["total_fines"] == 1.5 + MAX_PENALTY + 2.0
+        by_borrower = {b["borrower_mail"]: b for b in report["by_borrower"]}
+        assert set(by_borrower) == {"a@example.com", "b@example.com"}
+        assert by_borrower["b@example.com"]["outstanding_fines"] == 0
+        assert report["by_borrower"][0]["borrower_mail"] == "a@example.com"
+        assert sum(m["late_loans"] for m in report["by_month"]) == 3
+
+    asyncio.run(_run(database, check))
@@ -0,0 +1,134 @@
+import asyncio
+import shutil
+import types
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.core import identity_cache as identity_cache_module
+from app.core.identity_cache import identity_cache
+from app.data.orm import Book
+from app.schemas.loan import LoanCreate
+from app.services.book_service import BookService
+from app.services.loan_service import LoanService
+
+
+@pytest.fixture(autouse=True)
+def enable_identity_cache(monkeypatch):
+    # Off by default
+    monkeypatch.setattr(identity_cache, "max_entries", 1024)
+
+
+async def _run(database, check):
+    """Run check(session_factory, database); `database.selects` lists the SELECTs issued so far."""
+    async with database.connect() as session_factory:
+        await check(session_factory, database)
+
+
+def test_lookups_hit_the_cache(catalogue):
+    async def check(session_factory, database):
+        async with session_factory() as session:
+            book = await BookService(session).get_by_id(1)
+        assert len(database.selects) == 1
+
+        async with session_factory() as session:
+            service = BookService(session)
+            cached = await service.get_by_id(1, read_only=True)
+            by_isbn = await service.get_by_isbn("9780000000001")
+        assert len(database.selects) == 1
+        assert cached is not book
+        assert (cached.title, by_isbn.id) == ("Germinal", 1)
+
+    asyncio.run(_run(catalogue, check))
+    assert identity_cache.stats()["books"]["hits"] == 2
+
+
+def test_writes_refresh_or_evict_cached_entities(catalogue):
+    async def check(session_factory, database):
+        async with session_factory() as session:
+            service = BookService(session)
+            book = await service.get_by_id(1)
+            book.title = "Germinal (2nd ed.)"
+            await service.update(book)
+
+        async with session_factory() as session:
+            assert (await BookService(session).get_by_id(1)).title == "Germinal (2nd ed.)"
+
+        async with session_factory() as session:
+            await LoanService(session).create_loan(
+                LoanCreate(
+                    book_id=1,
+                    borrower_name="Test User",
+                    borrower_mail="test@example.com",
+                    card_number="123456",
+                )
+            )
+
+        async with session_factory() as session:
+            book = await BookService(session).get_by_id(1)
+        assert book.available_copies == 2
+
+        async with session_factory() as session:
+            await BookService(session).delete(1)
+        async with session_factory() as session:
+            assert await BookService(session).get_by_id(1) is None
+
+    asyncio.run(_run(catalogue, check))
+
+
+def test_get_by_ids_keeps_request_order_and_chunks(catalogue):
+    async def check(session_factory, database):
+        async with session_factory() as session:
+            books = await BookService(session).get_by_ids([99, 1, 99, 1])
+        assert [book.id if book else None for book in books] == [None, 1, None, 1]
+        assert len(database.selects) == 1
+
+        async with session_factory() as session:
+            service = BookService(session)
+            assert (await service.get_by_ids([1]))[0].title == "Germinal"
+            assert len(database.selects) == 1
+            await service.get_by_ids([2, 3, 4], chunk_size=2)
+        assert len(database.selects) == 3
+
+    asyncio.run(_run(catalogue, check))
+
+
+def test_writes_never_use_cached_snapshots_and_snapshots_expire(catalogue, monkeypatch):
+    clock = types.SimpleNamespace(monotonic=lambda: 1000.0)
+    monkeypatch.setattr(identity_cache_module, "time", clock)
+
+    async def check(session_factory, database):
+        async with session_factory() as session:
+            await BookService(session).get_by_id(1, read_only=True)
+            # Written by another process: this one does not evict its cache
+            await session.execute(Book.__table__.update().values(available_copies=0))
+            await session.commit()
+
+        async with session_factory() as session:
+            service = BookService(session)
+            stale = await service.get_by_id(1, read_only=True)
+            fresh = await service.get_by_id(1)
+        assert (stale.available_copies, fresh.available_copies) == (3, 0)
+
+        clock.monotonic = lambda: 1000.0 + identity_cache.ttl + 1
+        async with session_factory() as session:
+            service = BookService(session)
+            assert (await service.get_by_id(1, read_only=True)).available_copies == 0
+
+    asyncio.run(_run(catalogue, check))
+
+
+def test_reads_from_a_replica_are_not_cached(catalogue, tmp_path):
+    async def check(session_factory, database):
+        shutil.copy(database.path, tmp_path / "replica.db")
+        replica = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+        try:
+            async with session_factory() as session, AsyncSession(replica) as read_session:
+                service = BookService(session, read_session)
+                assert (await service.get_by_id(1, read_only=True)).title == "Germinal"
+                assert (await service.get_by_ids([1]))[0].title == "Germinal"
+        finally:
+            await replica.dispose()
+        assert identity_cache.get(Book, 1) is None
+
+    asyncio.run(_run(catalogue, check))
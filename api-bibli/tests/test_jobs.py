@@ -0,0 +1,144 @@
+import asyncio
+import datetime
+import gzip
+import json
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.data.models import JobStatus
+from app.data.orm import Job
+from app.routers.job_router import router as job_router
+from app.schemas.job import StreamParams
+from app.services.job_queue import JOB_KINDS, JobDefinition, JobQueue
+from tests.factories import make_author, make_book, make_loan
+
+
+@contextmanager
+def _client(database, tmp_path):
+    """Job router on a seeded database, with the queue started in the lifespan."""
+    database.seed(
+        make_author(),
+        [
+            make_book(
+                title=f"Book {i}",
+                isbn=f"978{i:010d}",
+                pages=100,
+                created_at=datetime.datetime(2024, 1, 10),
+            )
+            for i in range(3)
+        ],
+        make_loan(loan_date=datetime.datetime(2024, 1, 15)),
+        # Left running by a previous process
+        Job(
+            kind="export",
+            params=json.dumps({"table": "authors", "format": "csv", "gzip": False}),
+            status=JobStatus.RUNNING,
+            rows_done=0,
+            result_name="authors.csv",
+            started_at=datetime.datetime(2024, 1, 1),
+        ),
+    )
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        async with database.connect() as session_factory:
+            app.state.job_queue = JobQueue(session_factory, results_dir=tmp_path / "results")
+            await app.state.job_queue.start()
+            yield
+            await app.state.job_queue.stop()
+
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(job_router)
+    with TestClient(app) as client:
+        yield client
+
+
+def _wait(client, job_id: int) -> dict:
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        job = client.get(f"/jobs/{job_id}").json()
+        if job["status"] in (JobStatus.SUCCEEDED.value, JobStatus.FAILED.value):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+def test_jobs_run_in_background_and_store_results(database, tmp_path):
+    with _client(database, tmp_path) as client:
+        response = client.post(
+            "/jobs/", json={"kind": "monthly_report", "params": {"from": "2024-01", "to": "2024-02"}}
+        )
+        assert response.status_code == 202
+        assert response.headers["location"].endswith(f"/jobs/{response.json()['id']}")
+        job = _wait(client, response.json()["id"])
+        assert job["status"] == "Succeeded" and job["progress"] == 1.0
+        result = client.get(f"/jobs/{job['id']}/result")
+        assert result.headers["content-type"] == "application/json"
+        assert [month["total_loans"] for month in result.json()] == [1, 0]
+
+        response = client.post(
+            "/jobs/", json={"kind": "export", "params": {"table": "books", "format": "ndjson", "gzip": True}}
+        )
+        job = _wait(client, response.json()["id"])
+        assert (job["rows_done"], job["rows_total"]) == (3, 3)
+        result = client.get(f"/jobs/{job['id']}/result")
+        assert 'filename="books.ndjson.gz"' in result.headers["content-disposition"]
+        lines = gzip.decompress(result.content).decode().splitlines()
+        assert [json.loads(line)["title"] for line in lines] == ["Book 0", "Book 1", "Book 2"]
+
+        # The job interrupted by the previous process ran again on startup
+        job = _wait(client, 1)
+        assert job["status"] == "Succeeded" and job["rows_done"] == 1
+        assert "Zola" in client.get("/jobs/1/result").text
+
+
+def test_job_errors(database, tmp_path, monkeypatch):
+    async def fail(context, params):
+        raise RuntimeError("disk full")
+        yield b""
+
+    monkeypatch.setitem(JOB_KINDS, "broken", JobDefinition(StreamParams, fail, lambda p: "broken.csv"))
+    with _client(database, tmp_path) as client:
+        assert client.post("/jobs/", json={"kind": "unknown"}).status_code == 400
+        response = client.post(
+            "/jobs/", json={"kind": "monthly_report", "params": {"from": "2024-03", "to": "2024-01"}}
+        )
+        assert response.status_code == 400
+        assert client.get("/jobs/999").status_code == 404
+
+        job = _wait(client, client.post("/jobs/", json={"kind": "broken"}).json()["id"])
+        assert job["status"] == "Failed" and job["error"] == "disk full"
+        assert client.get(f"/jobs/{job['id']}/result").status_code == 409
+        assert not list((tmp_path / "results").glob("*broken*"))
+
+
+def test_job_queued_twice_runs_once(database, tmp_path, monkeypatch):
+    runs = []
+
+    async def count(context, params):
+        runs.append(params)
+        await asyncio.sleep(0.05)
+        yield b"done"
+
+    monkeypatch.setitem(JOB_KINDS, "counted", JobDefinition(StreamParams, count, lambda p: "counted.csv"))
+
+    async def scenario():
+        async with database.connect() as session_factory:
+            queue = JobQueue(session_factory, results_dir=tmp_path / "results", workers=2)
+            await queue.start()
+            try:
+                job = await queue.submit("counted", {})
+                # Both workers pick the job up: only one claims it
+                queue.queue.put_nowait(job.id)
+                await queue.join()
+            finally:
+                await queue.stop()
+            return await queue.get(job.id)
+
+    database.seed()
+    job = asyncio.run(scenario())
+    assert job.status == JobStatus.SUCCEEDED
+    assert len(runs) == 1
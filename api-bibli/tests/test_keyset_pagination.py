@@ -0,0 +1,156 @@
+import asyncio
+import datetime
+
+import pytest
+
+from app.services.author_service import AuthorService
+from app.services.book_service import BookService
+from app.services.loan_service import LoanService
+from tests.factories import make_author, make_book, make_loan
+
+# Few distinct values, so that pages often end in the middle of a run of ties
+YEARS = (1880, 1885, 1885, 1885, 1862, 1880, 1885, 1862, 1885, 1880, 1885)
+TITLES = ("Nana", "Germinal", "Nana", "Germinal", "Nana", "L'Oeuvre", "Germinal", "Nana",
+          "L'Oeuvre", "Germinal", "Nana")
+LAST_NAMES = ("Zola", "Hugo", "Zola", "Sand", "Hugo", "Zola", "Zola")
+LOAN_DATES = [
+    datetime.datetime(2024, 1, 15),
+    datetime.datetime(2024, 1, 15, 10, 30, 0, 250000),
+    datetime.datetime(2024, 1, 1),
+]
+PAGE_SIZES = (1, 2, 3, 4, 100)
+
+
+@pytest.fixture
+def database(database):
+    database.seed(
+        [make_author(last_name=last_name) for last_name in LAST_NAMES],
+        [
+            make_book(title=title, isbn=f"978{index:010d}", year=year, author_id=index % 3 + 1)
+            for index, (title, year) in enumerate(zip(TITLES, YEARS), 1)
+        ],
+        # Four loans share each date
+        [
+            make_loan(book_id=index % 5 + 1, loan_date=LOAN_DATES[index % 3])
+            for index in range(12)
+        ],
+    )
+    return database
+
+
+def _run(database, check):
+    async def run():
+        async with database.connect() as session_factory, session_factory() as session:
+            return await check(session)
+
+    return asyncio.run(run())
+
+
+async def _walk(get_page, page_size: int) -> list:
+    """Every item returned by following the cursors until the last page."""
+    items, cursor = await get_page(page_size, None)
+    while cursor is not None:
+        page, cursor = await get_page(page_size, cursor)
+        # A cursor that does not move past its row would never run out
+        assert page and len(items) < 100, "pages do not end"
+        items.extend(page)
+    return items
+
+
+def _expected(rows, sort_by: str, order: str) -> list[int]:
+    """IDs ordered by (sort column, id), as the keyset is."""
+    ordered = sorted(rows, key=lambda row: (getattr(row, sort_by), row.id))
+    if order == "desc":
+        ordered.reverse()
+    return [row.id for row in ordered]
+
+
+def test_book_pages_list_every_book_once(database):
+    async def check(session):
+        service = BookService(session)
+        books, _ = await service.get_all_filtered(page=1, page_size=100)
+        walks = {}
+        for sort_by in ("year", "title", "author_id"):
+            for order in ("asc", "desc"):
+                expected = _expected(books, sort_by, order)
+                for page_size in PAGE_SIZES:
+
+                    async def get_page(size, cursor):
+                        return await service.get_all_keyset(
+                            page_size=size, cursor=cursor, sort_by=sort_by, order=order
+                        )
+
+                    ids = [book.id for book in await _walk(get_page, page_size)]
+                    walks[sort_by, order, page_size] = ids == expected
+        return walks
+
+    walks = _run(database, check)
+    assert walks and all(walks.values()), [key for key, ok in walks.items() if not ok]
+
+
+def test_book_pages_with_projected_columns_and_filter(database):
+    async def check(session):
+        service = BookService(session)
+
+        async def get_page(size, cursor):
+            return await service.get_all_keyset(
+                page_size=size, cursor=cursor, category="Fiction", sort_by="year",
+                order="desc", columns=["title"],
+            )
+
+        return [(book.id, book.year) for book in await _walk(get_page, 2)]
+
+    rows = _run(database, check)
+    assert [book_id for book_id, _ in rows] == [
+        book_id for _, book_id in sorted(
+            ((year, book_id) for book_id, year in enumerate(YEARS, 1)), reverse=True
+        )
+    ]
+
+
+def test_author_pages_list_every_author_once(database):
+    async def check(session):
+        service = AuthorService(session)
+        authors, _ = await service.get_all_filtered(page=1, page_size=100)
+        walks = {}
+        for sort_by in ("last_name", "first_name"):
+            for order in ("asc", "desc"):
+                expected = _expected(authors, sort_by, order)
+                for page_size in PAGE_SIZES:
+
+                    async def get_page(size, cursor):
+                        return await service.get_all_keyset(
+                            page_size=size, cursor=cursor, sort_by=sort_by, order=order
+                        )
+
+                    ids = [author.id for author in await _walk(get_page, page_size)]
+                    walks[sort_by, order, page_size] = ids == expected
+        return walks
+
+    walks = _run(database, check)
+    assert walks and all(walks.values()), [key for key, ok in walks.items() if not ok]
+
+
+def test_loan_pages_list_loans_with_equal_dates_once(database):
+    async def check(session):
+        service = LoanService(session)
+        loans, _ = await service.get_all_filtered(page=1, page_size=100)
+        expected = _expected(loans, "loan_date", "desc")
+        walks = {}
+        for page_size in PAGE_SIZES:
+
+            async def get_page(size, cursor):
+                return await service.get_all_keyset(page_size=size, cursor=cursor)
+
+            walks[page_size] = [loan.id for loan in await _walk(get_page, page_size)]
+
+        async def get_book_page(size, cursor):
+            return await service.get_all_keyset(page_size=size, cursor=cursor, book_id=1)
+
+        by_book = [loan.id for loan in await _walk(get_book_page, 1)]
+        return expected, walks, by_book
+
+    expected, walks, by_book = _run(database, check)
+    assert len(expected) == 12
+    assert walks == {page_size: expected for page_size in PAGE_SIZES}
+    assert by_book == [loan_id for loan_id in expected if (loan_id - 1) % 5 == 0]
@@ -0,0 +1,109 @@
+import asyncio
+import datetime
+
+import pytest
+
+from app.services import leaderboard as leaderboard_module
+from app.services.leaderboard import (
+    Leaderboard,
+    author_leaderboard,
+    book_leaderboard,
+    rebuild_leaderboards,
+)
+from tests.factories import make_author, make_book, make_loan
+
+
+class FrozenDatetime(datetime.datetime):
+    current = datetime.datetime(2024, 3, 10, 12)
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.current
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    monkeypatch.setattr(leaderboard_module, "datetime", FrozenDatetime)
+    yield FrozenDatetime
+    FrozenDatetime.current = datetime.datetime(2024, 3, 10, 12)
+
+
+def _day(month: int, day: int) -> datetime.datetime:
+    return datetime.datetime(2024, month, day, 9)
+
+
+def test_days_fall_out_of_each_window(clock):
+    board = Leaderboard()
+    board.record(1, _day(3, 10), 2)
+    # First day of the 7 day window
+    board.record(2, _day(3, 4), 3)
+    board.record(3, _day(2, 15), 5)
+    # Older than the longest window: all-time only
+    board.record(4, _day(1, 1), 9)
+    assert board.top("7d", 10) == [(2, 3), (1, 2)]
+    assert board.top("30d", 10) == [(3, 5), (2, 3), (1, 2)]
+    assert board.top("all", 10) == [(4, 9), (3, 5), (2, 3), (1, 2)]
+
+    clock.current = datetime.datetime(2024, 3, 11, 8)
+    assert board.top("7d", 10) == [(1, 2)]
+    assert board.top("30d", 10) == [(3, 5), (2, 3), (1, 2)]
+
+    # Several days at once
+    clock.current = datetime.datetime(2024, 3, 20, 8)
+    assert board.top("7d", 10) == []
+    assert board.top("30d", 10) == [(2, 3), (1, 2)]
+    assert board.top("all", 2) == [(4, 9), (3, 5)]
+    assert min(board._days) >= datetime.date(2024, 2, 20)
+
+
+def test_ties_are_ordered_by_id_and_ranks_follow_counts(clock):
+    board = Leaderboard()
+    for key in (5, 3, 8):
+        board.record(key, _day(3, 10))
+    assert board.top("7d", 10) == [(3, 1), (5, 1), (8, 1)]
+    board.record(8, _day(3, 9), 2)
+    board.record(5, _day(3, 10))
+    assert board.top("7d", 2) == [(8, 3), (5, 2)]
+    assert board.top("7d", 10) == [(8, 3), (5, 2), (3, 1)]
+
+
+def test_rebuild_matches_recorded_loans(database):
+    now = datetime.datetime.now()
+    # (book, author, days ago)
+    loans = [(1, 1, 0), (1, 1, 2), (2, 1, 3), (2, 1, 10), (3, 2, 10), (3, 2, 40), (3, 2, 400)]
+
+    database.seed(
+        [make_author(id=author_id, last_name=f"Zola {author_id}") for author_id in (1, 2)],
+        [
+            make_book(
+                id=book_id,
+                title=f"Book {book_id}",
+                isbn=f"978{book_id:010d}",
+                author_id=author_id,
+                available_copies=10,
+                total_copies_owned=10,
+                pages=100,
+            )
+            for book_id, author_id in ((1, 1), (2, 1), (3, 2))
+        ],
+        [
+            make_loan(book_id=book_id, loan_date=now - datetime.timedelta(days=days), due_date=now)
+            for book_id, _, days in loans
+        ],
+    )
+
+    async def scenario():
+        async with database.connect() as session_factory, session_factory() as session:
+            await rebuild_leaderboards(session)
+
+    expected_books, expected_authors = Leaderboard(), Leaderboard()
+    for book_id, author_id, days in loans:
+        expected_books.record(book_id, now - datetime.timedelta(days=days))
+        expected_authors.record(author_id, now - datetime.timedelta(days=days))
+
+    asyncio.run(scenario())
+    for window in ("7d", "30d", "all"):
+        assert book_leaderboard.top(window, 10) == expected_books.top(window, 10)
+        assert author_leaderboard.top(window, 10) == expected_authors.top(window, 10)
+    assert book_leaderboard.top("7d", 10) == [(1, 2), (2, 1)]
+    assert author_leaderboard.top("all", 10) == [(1, 4), (2, 3)]
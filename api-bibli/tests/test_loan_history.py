@@ -0,0 +1,141 @@
+import asyncio
+import datetime
+
+import pytest
+from sqlalchemy import select
+
+from app.data.orm import Loan, LoanHistory
+from app.services.loan_history import (
+    rebuild_loan_history,
+    record_checkout,
+    record_return,
+    refresh_popularity_ranks,
+)
+from tests.factories import make_author, make_book, make_loan
+
+START = datetime.datetime(2024, 1, 1)
+
+
+def _loan(book_id: int, days: int | None, late: bool = False) -> Loan:
+    """A loan returned after `days` days (None: not returned), after its due date if late."""
+    returned = days is not None
+    return make_loan(
+        book_id=book_id,
+        loan_date=START,
+        due_date=START + datetime.timedelta(days=days - 1 if late else 30),
+        return_date=START + datetime.timedelta(days=days) if returned else None,
+    )
+
+
+@pytest.fixture
+def database(database):
+    database.seed(
+        make_author(),
+        [
+            make_book(
+                id=i,
+                title=f"Book {i}",
+                isbn=f"978{i:010d}",
+                available_copies=10,
+                total_copies_owned=10,
+                pages=100,
+            )
+            for i in range(1, 5)
+        ],
+    )
+    return database
+
+
+async def _run(database, scenario):
+    async with database.connect() as session_factory, session_factory() as session:
+        return await scenario(session)
+
+
+async def _histories(session) -> dict[int, tuple]:
+    session.expire_all()
+    result = await session.execute(select(LoanHistory))
+    return {
+        h.book_id: (
+            h.total_loans,
+            h.returned_loans,
+            h.times_late,
+            round(h.average_duration_days, 6),
+            h.popularity_score,
+            h.popularity_rank,
+        )
+        for h in result.scalars()
+    }
+
+
+async def _ranks(session) -> dict[int, int]:
+    await session.flush()
+    return {book_id: values[-1] for book_id, values in (await _histories(session)).items()}
+
+
+def test_record_checkout_keeps_competition_ranks(database):
+    async def scenario(session):
+        steps = []
+        await record_checkout(session, 1)
+        steps.append(await _ranks(session))
+        # Tie: both books share rank 1
+        await record_checkout(session, 2)
+        steps.append(await _ranks(session))
+        # Book 2 overtakes book 1
+        await record_checkout(session, 2)
+        steps.append(await _ranks(session))
+        # Book 3 overtakes both at once
+        await record_checkout(session, 3, count=3)
+        steps.append(await _ranks(session))
+        # Book 4 enters tied with book 1, which then catches up with book 2
+        await record_checkout(session, 4)
+        await record_checkout(session, 1)
+        steps.append(await _ranks(session))
+        await refresh_popularity_ranks(session)
+        steps.append(await _ranks(session))
+        return steps
+
+    steps = asyncio.run(_run(database, scenario))
+    assert steps[0] == {1: 1}
+    assert steps[1] == {1: 1, 2: 1}
+    assert steps[2] == {1: 2, 2: 1}
+    assert steps[3] == {1: 3, 2: 2, 3: 1}
+    assert steps[4] == {1: 2, 2: 2, 3: 1, 4: 4}
+    # Same as recomputing every rank
+    assert steps[5] == steps[4]
+
+
+def test_record_return_keeps_running_mean_and_late_count(database):
+    async def scenario(session):
+        loans = [_loan(1, 10), _loan(1, 4, late=True), _loan(1, 7)]
+        session.add_all(loans)
+        await record_checkout(session, 1, count=len(loans))
+        for loan in loans:
+            await record_return(session, loan)
+        await session.flush()
+        return await _histories(session)
+
+    histories = asyncio.run(_run(database, scenario))
+    assert histories == {1: (3, 3, 1, 7.0, 3, 1)}
+
+
+def test_maintained_history_matches_rebuild(database):
+    durations = {1: [3, 12, None], 2: [20, 5], 3: [None], 4: [9, 9, 9, None]}
+
+    async def scenario(session):
+        for book_id, days_list in durations.items():
+            for i, days in enumerate(days_list):
+                loan = _loan(book_id, days, late=days is not None and i % 2 == 1)
+                session.add(loan)
+                await record_checkout(session, book_id)
+                if days is not None:
+                    await record_return(session, loan)
+        await session.flush()
+        maintained = await _histories(session)
+        await rebuild_loan_history(session)
+        return maintained, await _histories(session)
+
+    maintained, rebuilt = asyncio.run(_run(database, scenario))
+    assert rebuilt == maintained
+    assert {book_id: values[-1] for book_id, values in rebuilt.items()} == {
+        1: 2, 2: 3, 3: 4, 4: 1,
+    }
@@ -51,3 +51,12 @@ def test_return_loan():
     response = client.post("/loans/1/return", json={"condition": "Good"})
     assert response.status_code == 200
     assert response.json()["status"] == "Returned"
+
+def test_list_loans_cursor():
+    mock_service = AsyncMock()
+    mock_service.get_all_keyset.return_value = ([], None)
+    app.dependency_overrides[LoanService] = lambda: mock_service
+
+    response = client.get("/loans/cursor")
+    assert response.status_code == 200
+    assert response.json()["has_more"] is False
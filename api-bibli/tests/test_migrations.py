@@ -0,0 +1,163 @@
+import asyncio
+
+import pytest
+from sqlalchemy import inspect
+
+from app.data.migrations import upgrade_schema
+from app.data.orm import Base
+from app.routers.book_router import router as book_router
+from app.routers.stats_router import router as stats_router
+from app.services.author_service import AuthorService
+from app.services.book_service import BookService
+
+# Tables as created by the first version of the application
+BASELINE_SCHEMA = [
+    """CREATE TABLE authors (
+        id INTEGER NOT NULL, first_name VARCHAR NOT NULL, last_name VARCHAR NOT NULL,
+        date_of_birth DATE NOT NULL, date_of_death DATE, nationality VARCHAR NOT NULL,
+        biography TEXT, website VARCHAR, PRIMARY KEY (id)
+    )""",
+    "CREATE INDEX ix_authors_id ON authors (id)",
+    """CREATE TABLE books (
+        id INTEGER NOT NULL, title VARCHAR NOT NULL, isbn VARCHAR NOT NULL,
+        year INTEGER NOT NULL, author_id INTEGER NOT NULL, available_copies INTEGER,
+        total_copies_owned INTEGER, description TEXT, category VARCHAR(10) NOT NULL,
+        language VARCHAR NOT NULL, pages INTEGER NOT NULL, publisher VARCHAR NOT NULL,
+        PRIMARY KEY (id), UNIQUE (isbn), FOREIGN KEY(author_id) REFERENCES authors (id)
+    )""",
+    "CREATE INDEX ix_books_id ON books (id)",
+    """CREATE TABLE loan_histories (
+        id INTEGER NOT NULL, book_id INTEGER NOT NULL, total_loans INTEGER,
+        average_duration_days FLOAT, popularity_score INTEGER, PRIMARY KEY (id),
+        UNIQUE (book_id), FOREIGN KEY(book_id) REFERENCES books (id)
+    )""",
+    "CREATE INDEX ix_loan_histories_id ON loan_histories (id)",
+    """CREATE TABLE loans (
+        id INTEGER NOT NULL, book_id INTEGER NOT NULL, borrower_name VARCHAR NOT NULL,
+        borrower_mail VARCHAR NOT NULL, card_number VARCHAR NOT NULL,
+        loan_date DATETIME NOT NULL, due_date DATETIME NOT NULL, return_date DATETIME,
+        status VARCHAR(8), comments TEXT, renewed BOOLEAN, PRIMARY KEY (id),
+        FOREIGN KEY(book_id) REFERENCES books (id)
+    )""",
+    "CREATE INDEX ix_loans_id ON loans (id)",
+    "INSERT INTO authors VALUES (1, 'Emile', 'Zola', '1840-04-02', NULL, 'FR', NULL, NULL)",
+    "INSERT INTO books VALUES (1, 'Germinal', '9780000000001', 1885, 1, 2, 3, NULL, "
+    "'FICTION', 'FR', 500, 'Charpentier')",
+    "INSERT INTO loan_histories VALUES (1, 1, 2, 10.0, 2)",
+    "INSERT INTO loans VALUES (1, 1, 'ann', 'ann@example.com', '123456', "
+    "'2024-01-15 00:00:00.000000', '2024-01-29 00:00:00.000000', NULL, 'ON_LOAN', NULL, 0)",
+    "INSERT INTO loans VALUES (2, 1, 'bob', 'bob@example.com', '654321', "
+    "'2024-01-01 00:00:00.000000', '2024-01-15 00:00:00.000000', "
+    "'2024-01-21 00:00:00.000000', 'RETURNED', NULL, 0)",
+]
+
+
+@pytest.fixture
+def database(database):
+    """The database as created by the first version of the application."""
+
+    async def create():
+        async with database.connect() as session_factory:
+            async with session_factory.kw["bind"].begin() as conn:
+                for statement in BASELINE_SCHEMA:
+                    await conn.exec_driver_sql(statement)
+
+    asyncio.run(create())
+    return database
+
+
+async def _upgrade(conn) -> dict:
+    """Upgrade the database as in the application lifespan."""
+    await conn.run_sync(Base.metadata.create_all)
+    return await conn.run_sync(upgrade_schema)
+
+
+def test_upgrade_schema_adds_missing_columns_and_indexes(database):
+    async def scenario():
+        async with database.connect() as session_factory:
+            async with session_factory.kw["bind"].begin() as conn:
+                added = await conn.run_sync(upgrade_schema)
+                again = await conn.run_sync(upgrade_schema)
+                versions = (await conn.exec_driver_sql(
+                    "SELECT (SELECT version FROM authors), version, updated_at FROM books"
+                )).one()
+                indexes = await conn.run_sync(
+                    lambda sync: {i["name"] for i in inspect(sync).get_indexes("books")}
+                )
+        return added, again, versions, indexes
+
+    added, again, versions, indexes = asyncio.run(scenario())
+    assert set(added["authors"]) == {"version", "updated_at"}
+    assert set(added["books"]) >= {"version", "updated_at"}
+    # Existing rows get the server default, not NULL; columns without one stay NULL
+    assert tuple(versions) == (1, 1, None)
+    assert {"ix_books_title", "ix_books_author_id"} <= indexes
+    # Idempotent
+    assert again == {}
+
+
+def test_upgraded_database_serves_books_and_reports(database):
+    async def scenario():
+        async with database.connect() as session_factory:
+            async with session_factory.kw["bind"].begin() as conn:
+                added = await _upgrade(conn)
+            async with database.async_client(session_factory, book_router, stats_router) as client:
+                books = await client.get("/books/")
+                book = await client.get("/books/1")
+                report = await client.get(
+                    "/stats/reports/monthly", params={"from": "2024-01", "to": "2024-01"}
+                )
+        return added, books, book, report
+
+    added, books, book, report = asyncio.run(scenario())
+    assert "created_at" in added["books"]
+    assert set(added["loan_histories"]) == {"returned_loans", "times_late", "popularity_rank"}
+    assert books.status_code == 200 and books.json()["items"][0]["title"] == "Germinal"
+    assert book.status_code == 200 and book.headers["etag"]
+    # The creation date of existing books is unknown: they are not counted as new books
+    assert report.status_code == 200
+    assert report.json() == [
+        {"month": "2024-01", "new_books": 0, "new_users": 2, "total_loans": 2, "returned_loans": 1}
+    ]
+
+
+def test_upgraded_database_indexes_existing_rows_for_search(database):
+    async def scenario():
+        async with database.connect() as session_factory:
+            engine = session_factory.kw["bind"]
+            async with engine.begin() as conn:
+                await conn.exec_driver_sql(
+                    "INSERT INTO books VALUES (2, 'Nana', '9780000000002', 1880, 1, 1, 1, NULL, "
+                    "'FICTION', 'FR', 400, 'Charpentier')"
+                )
+            async with engine.begin() as conn:
+                await _upgrade(conn)
+
+            async def titles(session, term):
+                books, _ = await BookService(session).get_all_filtered(
+                    page=1, page_size=10, search=term
+                )
+                return [book.title for book in books]
+
+            async with session_factory() as session:
+                found = await titles(session, "germinal")
+                service = BookService(session)
+                # The update and delete triggers remove the index entries of the old rows
+                book = await service.get_by_id(1)
+                book.title = "Germinal (poche)"
+                await service.update(book)
+                await service.delete(2)
+                author_service = AuthorService(session)
+                author = await author_service.get_by_id(1)
+                author.last_name = "Zola-Hugo"
+                await author_service.update(author)
+                after = await titles(session, "poche"), await titles(session, "nana")
+                authors, _ = await author_service.get_all_filtered(
+                    page=1, page_size=10, search="hugo"
+                )
+        return found, after, [author.last_name for author in authors]
+
+    found, after, authors = asyncio.run(scenario())
+    assert found == ["Germinal"]
+    assert after == (["Germinal (poche)"], [])
+    assert authors == ["Zola-Hugo"]
@@ -0,0 +1,67 @@
+import asyncio
+import datetime
+
+import pytest
+
+from app.data.models import LoanStatus
+from app.services.loan_service import LoanService
+from app.services.overdue_sweeper import sweep_metrics, sweep_overdue
+from tests.factories import make_author, make_book, make_loan
+
+
+@pytest.fixture
+def database(database):
+    now = datetime.datetime.now()
+    database.seed(
+        make_author(),
+        make_book(available_copies=1),
+        # Due 3 days ago, and in 5 days
+        [
+            make_loan(
+                borrower_name="Test User",
+                borrower_mail="test@example.com",
+                loan_date=now - datetime.timedelta(days=14 - days_left),
+            )
+            for days_left in (-3, 5)
+        ],
+    )
+    return database
+
+
+async def _run(database, check):
+    async with database.connect() as session_factory, session_factory() as session:
+        await check(session)
+
+
+def test_reads_do_not_write_overdue_status(database):
+    async def check(session):
+        service = LoanService(session)
+        late, _ = await service.get_all_filtered(page=1, page_size=10, late_only=True)
+        assert len(late) == 1
+        assert late[0].days_late == 3
+
+        await service.get_loan_details(late[0].id)
+        assert not session.dirty
+        assert late[0].status == LoanStatus.ON_LOAN
+
+    asyncio.run(_run(database, check))
+
+
+def test_sweep_marks_overdue_loans_once(database):
+    sweep_metrics.reset()
+
+    async def check(session):
+        assert await sweep_overdue(session) == 1
+        assert await sweep_overdue(session) == 0
+
+        service = LoanService(session)
+        overdue, total = await service.get_all_filtered(
+            page=1, page_size=10, status=LoanStatus.OVERDUE
+        )
+        assert total == 1
+        assert overdue[0].penalty > 0
+
+    asyncio.run(_run(database, check))
+    assert sweep_metrics.runs == 2
+    assert sweep_metrics.rows_updated == 1
+    assert sweep_metrics.last_rows_updated == 0
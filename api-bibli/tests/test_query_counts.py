@@ -0,0 +1,67 @@
+import datetime
+
+import pytest
+
+from app.routers.loan_router import router
+from tests.factories import make_author, make_book, make_loan
+
+BOOKS = 60
+
+
+@pytest.fixture
+def client(database):
+    """Loan router on BOOKS books, each with one active loan."""
+    now = datetime.datetime.now()
+    database.seed(
+        make_author(),
+        [
+            make_book(title=f"Book {i}", isbn=f"978{i:010d}", available_copies=2, pages=100)
+            for i in range(BOOKS)
+        ],
+        [
+            make_loan(
+                book_id=i + 1,
+                borrower_name=f"User {i}",
+                borrower_mail="test@example.com",
+                card_number=f"{i:06d}",
+                loan_date=now - datetime.timedelta(minutes=i),
+            )
+            for i in range(BOOKS)
+        ],
+    )
+    with database.client(router) as client:
+        yield client
+
+
+def _count(client, database, url):
+    database.executed.clear()
+    response = client.get(url)
+    assert response.status_code == 200
+    return len(database.statements), response.json()
+
+
+def test_loan_list_query_count_does_not_grow_with_page_size(client, database):
+    small, page = _count(client, database, "/loans/?page_size=5&include_total=false")
+    large, page_large = _count(client, database, "/loans/?page_size=50&include_total=false")
+
+    assert len(page["items"]) == 5
+    assert len(page_large["items"]) == 50
+    assert all(item["book_title"] for item in page_large["items"])
+    assert small == large == 1
+
+
+def test_loan_cursor_query_count_does_not_grow_with_page_size(client, database):
+    small, page = _count(client, database, "/loans/cursor?page_size=5")
+    large, _ = _count(client, database, "/loans/cursor?page_size=50")
+    following, _ = _count(
+        client, database, f"/loans/cursor?page_size=50&cursor={page['next_cursor']}"
+    )
+
+    assert small == large == following == 1
+
+
+def test_loan_detail_single_query(client, database):
+    count, loan = _count(client, database, "/loans/1")
+
+    assert loan["book_title"] == "Book 0"
+    assert count == 1
@@ -0,0 +1,148 @@
+import asyncio
+import re
+
+import pytest
+
+from app.data.models import BookCategory, LoanStatus
+from app.services.author_service import AuthorService
+from app.services.book_service import BookService
+from app.services.loan_service import LoanService
+from app.services.stats_service import StatsService
+from app.schemas.loan import LoanCreate
+from tests.factories import make_book, make_loan
+
+# "SCAN loans" reads the whole table. "SCAN loans USING INDEX ix" is only fine
+# when it walks the index in ORDER BY order (stopped early by LIMIT), i.e. when
+# no temp b-tree sort follows.
+TABLE_SCAN = re.compile(r"^SCAN (books|authors|loans|loan_histories)\b")
+
+
+@pytest.fixture
+def database(catalogue):
+    catalogue.seed(make_loan(borrower_name="Test User", borrower_mail="test@example.com"))
+    return catalogue
+
+
+async def _capture_plans(database, run):
+    """Run service calls on the seeded database and EXPLAIN every SELECT they issued."""
+    async with database.connect() as session_factory:
+        async with session_factory() as session:
+            await run(session)
+        statements = [
+            (statement, parameters)
+            for statement, parameters in database.executed
+            if statement.lstrip().upper().startswith("SELECT")
+        ]
+        plans = []
+        async with session_factory.kw["bind"].connect() as conn:
+            raw = await conn.get_raw_connection()
+            for statement, parameters in statements:
+                cursor = await raw.driver_connection.execute(
+                    f"EXPLAIN QUERY PLAN {statement}", parameters
+                )
+                rows = await cursor.fetchall()
+                plans.append((statement, [row[-1] for row in rows]))
+    return plans
+
+
+def _full_scans(plans):
+    scans = []
+    for statement, steps in plans:
+        sorted_after = any("TEMP B-TREE FOR ORDER BY" in step for step in steps)
+        for step in steps:
+            if TABLE_SCAN.match(step) and ("USING" not in step or sorted_after):
+                scans.append((statement, step))
+    return scans
+
+
+def test_book_queries_use_indexes(database):
+    async def run(session):
+        service = BookService(session)
+        await service.get_by_id(1)
+        await service.get_by_isbn("9780000000001")
+        await service.get_all_filtered(page=3, page_size=10)
+        await service.get_all_filtered(page=1, page_size=10, sort_by="year", order="desc")
+        await service.get_all_filtered(page=1, page_size=10, sort_by="author_id")
+        await service.get_all_filtered(page=1, page_size=10, category=BookCategory.FICTION)
+        await service.get_all_filtered(page=1, page_size=10, language="FR")
+        await service.get_all_filtered(page=1, page_size=10, search="germ", sort_by="relevance")
+        _, cursor = await service.get_all_keyset(page_size=1, sort_by="year")
+        await service.get_all_keyset(page_size=1, cursor=cursor, sort_by="year")
+
+    assert _full_scans(asyncio.run(_capture_plans(database, run))) == []
+
+
+def test_author_queries_use_indexes(database):
+    async def run(session):
+        service = AuthorService(session)
+        await service.get_by_id(1)
+        await service.get_by_fullname("Emile", "Zola")
+        await service.get_all_filtered(page=2, page_size=10)
+        await service.get_all_filtered(page=1, page_size=10, sort_by="first_name")
+        await service.get_all_filtered(page=1, page_size=10, nationality="fr")
+        await service.get_all_filtered(page=1, page_size=10, search="zol")
+        await service.get_all_keyset(page_size=10)
+
+    assert _full_scans(asyncio.run(_capture_plans(database, run))) == []
+
+
+def test_loan_queries_use_indexes(database):
+    async def run(session):
+        service = LoanService(session)
+        await service.create_loan(
+            LoanCreate(
+                book_id=1,
+                borrower_name="Test User",
+                borrower_mail="test@example.com",
+                card_number="123456",
+            )
+        )
+        await service.get_all_filtered(page=1, page_size=10)
+        await service.get_all_filtered(page=1, page_size=10, book_id=1)
+        await service.get_all_filtered(page=1, page_size=10, status=LoanStatus.RETURNED)
+        await service.get_all_filtered(page=1, page_size=10, active_only=True)
+        await service.get_all_filtered(page=1, page_size=10, late_only=True)
+        await service.get_all_keyset(page_size=10)
+        await service.get_loan_details(1)
+
+    assert _full_scans(asyncio.run(_capture_plans(database, run))) == []
+
+
+def test_stats_queries_use_indexes(database):
+    async def run(session):
+        service = StatsService(session)
+        await service.get_book_stats(1)
+        await service.get_author_stats(1)
+
+    assert _full_scans(asyncio.run(_capture_plans(database, run))) == []
+
+
+def test_report_queries_use_indexes(database):
+    database.seed(
+        [
+            make_book(title=title, isbn=f"978000000000{index}")
+            for index, title in enumerate(("Nana", "L'Oeuvre", "La Bete humaine"), 2)
+        ],
+        [
+            make_loan(borrower_name=name, borrower_mail=f"{name}@example.com")
+            for name in ("ann", "bob", "cid")
+        ],
+    )
+
+    async def run(session):
+        service = StatsService(session)
+        # UNION ALL of the dated events of each month
+        await service.get_monthly_report("2024-01", "2024-12")
+        _, cursor = await service.get_never_borrowed_books(page_size=1)
+        await service.get_never_borrowed_books(page_size=1, cursor=cursor)
+        _, cursor = await service.get_borrower_activity(page_size=1)
+        await service.get_borrower_activity(page_size=1, cursor=cursor)
+        await service.get_borrower_activity_for("ann@example.com")
+
+    plans = asyncio.run(_capture_plans(database, run))
+    assert _full_scans(plans) == []
+    steps = "\n".join(step for _, statement_steps in plans for step in statement_steps)
+    # Each dated event is a range search, each book a lookup of its loans
+    for index in ("ix_loans_loan_date", "ix_loans_return_date", "ix_books_created_at"):
+        assert f"SEARCH {index.split('_')[1]} USING COVERING INDEX {index}" in steps
+    assert "SEARCH loans USING COVERING INDEX ix_loans_book_id (book_id=?)" in steps
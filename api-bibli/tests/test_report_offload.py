@@ -0,0 +1,123 @@
+import asyncio
+import json
+import multiprocessing
+import pickle
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+
+from app.core.offload import report_pool
+from app.routers.book_router import router as book_router
+from app.routers.stats_router import router as stats_router
+from app.services.export_service import ExportService
+from app.services.report_compute import PackedRows, rollup_fines
+
+# Late loans of distinct borrowers: as many groups to roll up in the fines report
+LATE_LOANS = 5000
+
+
+def _late_loans(count: int):
+    """Seeder of `count` loans of book 1 returned 3 days late, one per borrower."""
+
+    def add(session):
+        session.connection().exec_driver_sql(
+            "INSERT INTO loans (book_id, borrower_name, borrower_mail, card_number, loan_date, "
+            "due_date, return_date, status, renewed) VALUES (1, ?, ?, '123456', "
+            "'2023-12-18 00:00:00.000000', '2024-01-01 00:00:00.000000', "
+            "'2024-01-04 00:00:00.000000', 'RETURNED', 0)",
+            [(f"user{i}", f"user{i}@example.com") for i in range(count)],
+        )
+
+    return add
+
+
+class GatedExecutor(ProcessPoolExecutor):
+    """Process pool recording the submitted functions and holding their results until `release`."""
+
+    def __init__(self):
+        super().__init__(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        self.submitted = []
+        self.release = threading.Event()
+
+    def submit(self, fn, /, *args, **kwargs):
+        self.submitted.append(fn.func if isinstance(fn, partial) else fn)
+        running = super().submit(fn, *args, **kwargs)
+        gated = Future()
+
+        def hold():
+            self.release.wait(10)
+            try:
+                gated.set_result(running.result())
+            except Exception as e:
+                gated.set_exception(e)
+
+        threading.Thread(target=hold, daemon=True).start()
+        return gated
+
+
+def test_books_are_served_while_fines_rollup_runs_in_pool(catalogue, monkeypatch):
+    executor = GatedExecutor()
+    monkeypatch.setattr(report_pool, "processes", 1)
+    monkeypatch.setattr(report_pool, "min_rows", 1000)
+    monkeypatch.setattr(report_pool, "_executor", executor)
+    catalogue.seed(_late_loans(LATE_LOANS))
+
+    async def scenario():
+        try:
+            async with (
+                catalogue.connect() as session_factory,
+                catalogue.async_client(session_factory, book_router, stats_router) as client,
+            ):
+                report = asyncio.create_task(
+                    client.get("/stats/reports/fines", params={"limit": 10})
+                )
+                while not executor.submitted and not report.done():
+                    await asyncio.sleep(0.01)
+                # The rollup is held in the pool: the loop keeps serving other requests
+                served = [(await client.get("/books/1")).status_code for _ in range(20)]
+                pending = not report.done()
+                executor.release.set()
+                return executor.submitted, served, pending, await report
+        finally:
+            executor.release.set()
+            report_pool.shutdown()
+
+    submitted, served, pending, report = asyncio.run(scenario())
+    assert submitted == [rollup_fines]
+    assert served == [200] * 20 and pending
+    assert report.status_code == 200
+    assert report.json()["late_loans"] == LATE_LOANS and len(report.json()["by_borrower"]) == 10
+
+
+def test_offloaded_export_matches_inline(catalogue, monkeypatch):
+    catalogue.seed(_late_loans(2500))
+
+    async def export(min_rows: int) -> bytes:
+        monkeypatch.setattr(report_pool, "min_rows", min_rows)
+        async with catalogue.connect() as session_factory, session_factory() as session:
+            chunks = [c async for c in ExportService(session).stream_table("loans", "ndjson")]
+        return b"".join(chunks)
+
+    async def scenario():
+        inline = await export(min_rows=10**9)
+        try:
+            offloaded = await export(min_rows=1)
+        finally:
+            report_pool.shutdown()
+        return inline, offloaded
+
+    monkeypatch.setattr(report_pool, "processes", 1)
+    inline, offloaded = asyncio.run(scenario())
+    assert offloaded == inline
+    first = json.loads(inline.split(b"\n", 1)[0])
+    assert first["status"] == "Returned" and first["due_date"] == "2024-01-01T00:00:00"
+
+
+def test_packed_rows_round_trip():
+    rows = PackedRows("sif")
+    rows.extend([("Zola", 1, 1.5), ("Hugo", None, 0.25)])
+    rows.extend([])
+    rows.extend([(None, 3, None), ("Émile", 4, 2.0)])
+    expected = [("Zola", 1, 1.5), ("Hugo", 0, 0.25), ("", 3, 0.0), ("Émile", 4, 2.0)]
+    assert list(rows) == expected and len(rows) == 4
+    assert list(pickle.loads(pickle.dumps(rows))) == expected
@@ -0,0 +1,139 @@
+from contextlib import contextmanager
+
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+from sqlalchemy.pool import NullPool
+
+from app.core.response_cache import ResponseCacheMiddleware
+from app.main import app as main_app
+from app.routers.book_router import router as book_router
+from app.routers.loan_router import router as loan_router
+
+
+@contextmanager
+def _client(catalogue):
+    """Book and loan routers behind the response cache."""
+    app = FastAPI()
+    app.add_middleware(ResponseCacheMiddleware, prefixes={"/books": "books"})
+    with catalogue.client(book_router, loan_router, app=app) as client:
+        yield client
+
+
+def test_book_detail_cached_with_etag(catalogue):
+    with _client(catalogue) as client:
+        first = client.get("/books/1")
+        second = client.get("/books/1")
+        not_modified = client.get("/books/1", headers={"If-None-Match": first.headers["etag"]})
+
+    assert first.headers["etag"] == '"books-1-v1"'
+    assert first.headers["x-cache"] == "MISS"
+    assert "last-modified" in first.headers
+    assert second.headers["x-cache"] == "HIT"
+    assert second.json() == first.json()
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+
+def test_writes_invalidate_cached_books(catalogue):
+    with _client(catalogue) as client:
+        before = client.get("/books/1")
+        page = client.get("/books/?page_size=10")
+
+        loan = client.post(
+            "/loans/",
+            json={
+                "book_id": 1,
+                "borrower_name": "Test User",
+                "borrower_mail": "test@example.com",
+                "card_number": "123456",
+            },
+        )
+        assert loan.status_code == 201
+        after_checkout = client.get("/books/1", headers={"If-None-Match": before.headers["etag"]})
+        page_after = client.get("/books/?page_size=10", headers={"If-None-Match": page.headers["etag"]})
+
+        client.patch("/books/1", json={"title": "Germinal (2nd ed.)"})
+        after_update = client.get("/books/1")
+
+    assert after_checkout.status_code == 200
+    assert after_checkout.headers["etag"] == '"books-1-v2"'
+    assert after_checkout.json()["available_copies"] == 2
+    assert page_after.status_code == 200
+    assert page_after.headers["etag"] != page.headers["etag"]
+    assert after_update.headers["etag"] == '"books-1-v3"'
+    assert after_update.json()["title"] == "Germinal (2nd ed.)"
+
+
+def test_collections_are_validated_by_etag_only(catalogue):
+    with _client(catalogue) as client:
+        created = client.post(
+            "/books/",
+            json={
+                "title": "Nana",
+                "isbn": "9780000000002",
+                "year": 1880,
+                "author_id": 1,
+                "available_copies": 1,
+                "total_copies_owned": 1,
+                "category": "Fiction",
+                "language": "FR",
+                "pages": 400,
+                "publisher": "Charpentier",
+            },
+        )
+        assert created.status_code == 200
+        page = client.get("/books/?page_size=10")
+        assert client.delete(f"/books/{created.json()['id']}").status_code == 200
+        # A deletion does not make any remaining item newer
+        after_delete = client.get(
+            "/books/?page_size=10", headers={"If-Modified-Since": "Fri, 01 Jan 2100 00:00:00 GMT"}
+        )
+        cursor = client.get("/books/cursor?page_size=10")
+
+    assert "last-modified" not in page.headers and len(page.json()["items"]) == 2
+    assert after_delete.status_code == 200
+    assert [book["title"] for book in after_delete.json()["items"]] == ["Germinal"]
+    assert "last-modified" not in cursor.headers and cursor.headers["etag"]
+
+
+def test_cached_responses_keep_cors_headers(catalogue):
+    origin = {"Origin": "http://example.com"}
+    # The main app is not entered (its lifespan would start the sweeper and the
+    # job queue): each request then runs on its own event loop, so no pooling
+    with catalogue.client(app=main_app, lifespan=False, poolclass=NullPool) as client:
+        miss = client.get("/api/v1/books/1", headers=origin)
+        hit = client.get("/api/v1/books/1", headers=origin)
+        authors = client.get("/api/v1/authors/", headers=origin)
+        loans = client.get("/api/v1/loans/", headers=origin)
+        same_origin = client.get("/api/v1/books/1")
+
+    assert (miss.headers["x-cache"], hit.headers["x-cache"]) == ("MISS", "HIT")
+    # CORS headers are added around the cache, never stored in it
+    assert same_origin.headers["x-cache"] == "HIT"
+    assert "access-control-allow-origin" not in same_origin.headers
+    for response in (miss, hit, authors, loans):
+        assert response.status_code == 200
+        assert "access-control-allow-origin" in response.headers
+
+
+def test_cached_responses_keep_route_headers():
+    app = FastAPI()
+    app.add_middleware(ResponseCacheMiddleware, prefixes={"/books": "books"})
+
+    @app.get("/books/count")
+    async def count(response: Response):
+        response.headers["X-Total-Count"] = "42"
+        response.set_cookie("seen", "1")
+        return {"count": 42}
+
+    client = TestClient(app)
+    miss = client.get("/books/count")
+    hit = client.get("/books/count")
+    not_modified = client.get("/books/count", headers={"If-None-Match": miss.headers["etag"]})
+
+    assert hit.headers["x-cache"] == "HIT"
+    for response in (miss, hit, not_modified):
+        assert response.headers["x-total-count"] == "42"
+    assert "set-cookie" in miss.headers and "set-cookie" not in hit.headers
+    assert hit.headers["content-length"] == str(len(hit.content))
+    assert hit.json() == {"count": 42}
@@ -0,0 +1,137 @@
+import asyncio
+
+from sqlalchemy import select, text
+
+from app.data.orm import Author, Book
+from app.data.search import authors_fts, books_fts, build_match_query, rebuild_search_index
+from app.services.book_service import BookService
+from tests.factories import make_author, make_book
+
+
+def _book(book_id: int, title: str, description: str | None = None) -> Book:
+    return make_book(
+        id=book_id,
+        title=title,
+        isbn=f"978{book_id:010d}",
+        available_copies=1,
+        total_copies_owned=1,
+        description=description,
+        pages=100,
+    )
+
+
+def _run(database, scenario):
+    """Run `scenario(session)` on a database holding Emile Zola (author 1)."""
+    database.seed(make_author(biography="Naturaliste"))
+
+    async def run():
+        async with database.connect() as session_factory, session_factory() as session:
+            return await scenario(session)
+
+    return asyncio.run(run())
+
+
+async def _matches(session, fts, term: str) -> list[int]:
+    statement = (
+        select(fts.c.rowid)
+        .where(fts.c[fts.name].match(build_match_query(term)))
+        .order_by(fts.c.rowid)
+    )
+    return list((await session.execute(statement)).scalars())
+
+
+def test_triggers_keep_indexes_in_sync(database):
+    async def scenario(session):
+        steps = []
+        session.add(_book(1, "Germinal", "La mine"))
+        await session.flush()
+        steps.append(await _matches(session, books_fts, "germinal"))
+
+        book = await session.get(Book, 1)
+        book.title = "Nana"
+        await session.flush()
+        steps.append(
+            (await _matches(session, books_fts, "germinal"), await _matches(session, books_fts, "nana"))
+        )
+        # Not an indexed column: the update trigger does not fire
+        book.available_copies = 0
+        await session.flush()
+        steps.append(await _matches(session, books_fts, "mine"))
+
+        await session.delete(book)
+        await session.flush()
+        steps.append(await _matches(session, books_fts, "nana"))
+
+        author = await session.get(Author, 1)
+        steps.append(await _matches(session, authors_fts, "naturaliste"))
+        author.last_name = "Hugo"
+        await session.flush()
+        steps.append(
+            (await _matches(session, authors_fts, "zola"), await _matches(session, authors_fts, "hugo"))
+        )
+        await session.delete(author)
+        await session.flush()
+        steps.append(await _matches(session, authors_fts, "hugo"))
+        return steps
+
+    steps = _run(database, scenario)
+    assert steps == [[1], ([], [1]), [1], [], [1], ([], [1]), []]
+
+
+def test_prefix_matching_ignores_case_and_accents(database):
+    async def scenario(session):
+        session.add_all([_book(1, "Germinal"), _book(2, "L'Assommoir", "Gervaise à Paris")])
+        await session.flush()
+        return [
+            await _matches(session, books_fts, term)
+            for term in ("germ", "GER", "assom", "gervaise pari", "a paris", "zzz")
+        ]
+
+    assert _run(database, scenario) == [[1], [1, 2], [2], [2], [2], []]
+
+
+def test_search_sorted_by_relevance_and_punctuation_only(database):
+    async def scenario(session):
+        session.add_all(
+            [
+                _book(1, "Abysses", "Une histoire de la mine, parmi bien d'autres choses"),
+                _book(2, "Mine", "Dans la mine, toujours la mine"),
+                _book(3, "Nana"),
+                _book(4, "Hourra !!!"),
+            ]
+        )
+        await session.commit()
+        service = BookService(session)
+        by_relevance, _ = await service.get_all_filtered(
+            page=1, page_size=10, search="mine", sort_by="relevance"
+        )
+        by_title, _ = await service.get_all_filtered(page=1, page_size=10, search="mine")
+        # No word to match: substring search instead of every book
+        punctuation, total = await service.get_all_filtered(page=1, page_size=10, search="!!!")
+        return (
+            [book.id for book in by_relevance],
+            [book.id for book in by_title],
+            [book.id for book in punctuation],
+            total,
+        )
+
+    by_relevance, by_title, punctuation, total = _run(database, scenario)
+    assert by_relevance == [2, 1]
+    assert by_title == [1, 2]
+    assert (punctuation, total) == ([4], 1)
+
+
+def test_rebuild_restores_an_empty_index(database):
+    async def scenario(session):
+        session.add_all([_book(1, "Germinal"), _book(2, "Nana")])
+        await session.flush()
+        # As for a database filled before the index existed
+        await session.execute(text("INSERT INTO books_fts(books_fts) VALUES ('delete-all')"))
+        before = await _matches(session, books_fts, "nana")
+        connection = await session.connection()
+        await connection.run_sync(rebuild_search_index)
+        return before, await _matches(session, books_fts, "nana"), await _matches(
+            session, authors_fts, "zola"
+        )
+
+    assert _run(database, scenario) == ([], [2], [1])
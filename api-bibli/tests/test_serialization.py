@@ -0,0 +1,79 @@
+import datetime
+import json
+
+from fastapi import Response
+
+from app.core import serialization
+from app.core.serialization import project, render, trusted_response
+from app.data.models import BookCategory, LoanStatus
+from app.data.orm import Author, Book, Loan
+from app.schemas.author import AuthorRead
+from app.schemas.book import BookRead
+from app.schemas.loan import LoanRead
+
+
+def _rows():
+    loan = Loan(
+        id=1,
+        book_id=1,
+        borrower_name="Test User",
+        borrower_mail="test@example.com",
+        card_number="123456",
+        loan_date=datetime.datetime(2024, 1, 1, 12, 30, 15, 250),
+        due_date=datetime.datetime(2024, 1, 15, 12, 30, 15, 250),
+        status=LoanStatus.ON_LOAN,
+        renewed=False,
+    )
+    # book_title is left unset, as for loans whose title was not selected
+    loan.days_late, loan.penalty = 3, 1.5
+    return [
+        (
+            BookRead,
+            Book(
+                id=1,
+                title="Germinal",
+                isbn="9780000000001",
+                year=1885,
+                author_id=1,
+                available_copies=3,
+                total_copies_owned=3,
+                category=BookCategory.FICTION,
+                language="FR",
+                pages=500,
+                publisher="Charpentier",
+            ),
+        ),
+        (
+            AuthorRead,
+            Author(
+                id=1,
+                first_name="Emile",
+                last_name="Zola",
+                date_of_birth=datetime.date(1840, 4, 2),
+                nationality="FR",
+            ),
+        ),
+        (LoanRead, loan),
+    ]
+
+
+def test_projection_matches_validated_output(monkeypatch):
+    for schema, row in _rows():
+        expected = schema.model_validate(row, from_attributes=True).model_dump(mode="json")
+        assert json.loads(render(project(schema, row))) == expected
+
+        # Without orjson, pydantic-core renders the same JSON
+        monkeypatch.setattr(serialization, "orjson", None)
+        assert json.loads(render(project(schema, row))) == expected
+        monkeypatch.undo()
+
+
+def test_trusted_response_keeps_route_headers():
+    route_response = Response()
+    route_response.headers["ETag"] = '"abc"'
+
+    response = trusted_response(BookRead, project(BookRead, _rows()[0][1]), route_response)
+    assert response.headers["etag"] == '"abc"'
+    assert response.headers.getlist("content-length") == [str(len(response.body))]
+    assert response.media_type == "application/json"
+    assert json.loads(response.body)["title"] == "Germinal"
@@ -0,0 +1,42 @@
+import pytest
+
+from app.routers.author_router import router as author_router
+from app.routers.book_router import router as book_router
+from tests.factories import make_author, make_book
+
+
+@pytest.fixture
+def client(database):
+    """Book and author routers on a catalogue with long text columns."""
+    database.seed(make_author(biography="Novelist " * 100), make_book(description="Mining " * 100))
+    with database.client(book_router, author_router) as client:
+        yield client
+
+
+def test_lists_defer_heavy_text_columns(client, database):
+    book = client.get("/books/").json()["items"][0]
+    assert "description" not in book and book["title"] == "Germinal"
+    assert "description" not in database.selects[-1]
+
+    author = client.get("/authors/cursor").json()["items"][0]
+    assert "biography" not in author and author["last_name"] == "Zola"
+    assert "biography" not in database.selects[-1]
+
+    book = client.get("/books/", params={"fields": "*"}).json()["items"][0]
+    assert book["description"].startswith("Mining")
+
+
+def test_fields_project_lists_and_details(client, database):
+    page = client.get("/books/cursor", params={"fields": "title", "sort_by": "year"})
+    assert page.json()["items"] == [{"title": "Germinal", "id": 1}]
+    assert "books.isbn" not in database.selects[-1]
+
+    response = client.get("/books/1", params={"fields": "description"})
+    assert response.json() == {"description": "Mining " * 100, "id": 1}
+    assert "books.title" not in database.selects[-1]
+    assert response.headers["etag"] != client.get("/books/1").headers["etag"]
+
+    author = client.get("/authors/1", params={"fields": "first_name,last_name"}).json()
+    assert author == {"first_name": "Emile", "last_name": "Zola", "id": 1}
+
+    assert client.get("/books/", params={"fields": "title,secret"}).status_code == 400
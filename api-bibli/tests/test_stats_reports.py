@@ -0,0 +1,158 @@
+import asyncio
+import datetime
+import json
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import update
+
+from app.core.months import month_range
+from app.data.orm import Book, BorrowerActivity, Loan
+from app.schemas.loan import LoanCreate, LoanReturn
+from app.services import borrower_activity
+from app.services.export_service import ExportService
+from app.services.loan_service import MAX_LOANS_PER_USER, LoanService
+from app.services.stats_service import StatsService
+from tests.factories import make_author, make_book, make_loan
+
+
+def _book(index: int, created_at: datetime.datetime) -> Book:
+    return make_book(
+        title=f"Book {index}", isbn=f"978{index:010d}", pages=100, created_at=created_at
+    )
+
+
+def _loan(book_id: int, mail: str, loan_date, return_date=None) -> Loan:
+    return make_loan(
+        book_id=book_id,
+        borrower_name=mail.split("@")[0],
+        borrower_mail=mail,
+        loan_date=loan_date,
+        return_date=return_date,
+    )
+
+
+@pytest.fixture
+def database(database):
+    database.seed(
+        make_author(),
+        [
+            _book(1, datetime.datetime(2023, 12, 5)),
+            _book(2, datetime.datetime(2024, 1, 10)),
+            _book(3, datetime.datetime(2024, 3, 1)),
+            # Never borrowed, added before the reported months
+            _book(4, datetime.datetime(2022, 6, 1)),
+            _book(5, datetime.datetime(2022, 6, 2)),
+        ],
+        [
+            _loan(1, "ann@example.com", datetime.datetime(2023, 12, 20),
+                  datetime.datetime(2024, 1, 2)),
+            _loan(2, "ann@example.com", datetime.datetime(2024, 1, 15),
+                  datetime.datetime(2024, 3, 3)),
+            _loan(1, "bob@example.com", datetime.datetime(2024, 1, 25)),
+        ],
+    )
+    return database
+
+
+async def _run(database, check):
+    """Run check(service, database); `database.selects` lists the SELECTs issued so far."""
+    async with database.connect() as session_factory:
+        async with session_factory() as session:
+            await check(StatsService(session), database)
+
+
+def test_monthly_report_is_one_grouped_query(database):
+    async def check(service, database):
+        report = await service.get_monthly_report("2023-12", "2024-03")
+        assert len(database.selects) == 1
+        assert report == [
+            {"month": "2023-12", "new_books": 1, "new_users": 1, "total_loans": 1, "returned_loans": 0},
+            {"month": "2024-01", "new_books": 1, "new_users": 1, "total_loans": 2, "returned_loans": 1},
+            {"month": "2024-02", "new_books": 0, "new_users": 0, "total_loans": 0, "returned_loans": 0},
+            {"month": "2024-03", "new_books": 1, "new_users": 0, "total_loans": 0, "returned_loans": 1},
+        ]
+
+    asyncio.run(_run(database, check))
+
+
+def test_month_range_bounds():
+    assert month_range("2023-11", "2024-02") == ["2023-11", "2023-12", "2024-01", "2024-02"]
+    with pytest.raises(ValueError):
+        month_range("2024-02", "2024-01")
+    with pytest.raises(ValueError):
+        month_range("2000-01", "2024-01")
+
+
+def test_never_borrowed_books_anti_join_pages(database):
+    async def check(service, database):
+        first, cursor = await service.get_never_borrowed_books(page_size=2)
+        assert [book["title"] for book in first] == ["Book 3", "Book 4"]
+        assert first[1]["added_date"] == "2022-06-01T00:00:00"
+        last = database.selects[-1]
+        assert "NOT (EXISTS" in last and "NOT IN" not in last
+
+        last, cursor = await service.get_never_borrowed_books(page_size=2, cursor=cursor)
+        assert last == [{"book_id": 5, "title": "Book 5", "added_date": "2022-06-02T00:00:00"}]
+        assert cursor is None
+
+        chunks = [c async for c in ExportService(service.read_session).stream_never_borrowed("ndjson")]
+        records = [json.loads(line) for line in b"".join(chunks).decode().splitlines()]
+        assert [record["book_id"] for record in records] == [3, 4, 5]
+
+    asyncio.run(_run(database, check))
+
+
+EXPECTED_ACTIVITY = [
+    {"borrower_mail": "ann@example.com", "full_name": "ann", "total_loans": 2,
+     "current_loans": 0, "late_returns": 1},
+    {"borrower_mail": "bob@example.com", "full_name": "bob", "total_loans": 1,
+     "current_loans": 1, "late_returns": 0},
+]
+
+
+def test_borrower_activity_is_one_conditional_aggregation(database):
+    async def check(service, database):
+        first, cursor = await service.get_borrower_activity(page_size=1)
+        (select,) = database.selects
+        assert "CASE" in select and "GROUP BY" in select
+        rest, cursor = await service.get_borrower_activity(page_size=1, cursor=cursor)
+        assert first + rest == EXPECTED_ACTIVITY and cursor is None
+        assert await service.get_borrower_activity_for("nobody@example.com") is None
+
+    asyncio.run(_run(database, check))
+
+
+def test_maintained_borrower_counters(database, monkeypatch):
+    monkeypatch.setattr(borrower_activity, "COUNTERS_ENABLED", True)
+
+    async def check(service, database):
+        await borrower_activity.rebuild_borrower_activity(service.session)
+        await service.session.commit()
+        rows, _ = await service.get_borrower_activity()
+        assert rows == EXPECTED_ACTIVITY
+        last = database.selects[-1]
+        assert "borrower_activity" in last and "GROUP BY" not in last
+
+        loans = LoanService(service.session)
+        loan = await loans.create_loan(
+            LoanCreate(book_id=3, borrower_name="bob", borrower_mail="bob@example.com",
+                       card_number="123456")
+        )
+        await loans.return_loan(loan.id, LoanReturn(return_date=loan.due_date + datetime.timedelta(days=1)))
+        bob = await service.get_borrower_activity_for("bob@example.com")
+        assert (bob["total_loans"], bob["current_loans"], bob["late_returns"]) == (2, 1, 1)
+
+        # The loan limit reads the counter
+        await service.session.execute(
+            update(BorrowerActivity).values(current_loans=MAX_LOANS_PER_USER)
+        )
+        await service.session.commit()
+        with pytest.raises(HTTPException) as refused:
+            await loans.create_loan(
+                LoanCreate(book_id=3, borrower_name="ann", borrower_mail="ann@example.com",
+                           card_number="123456")
+            )
+        assert "Loan limit" in refused.value.detail
+
+    asyncio.run(_run(database, check))
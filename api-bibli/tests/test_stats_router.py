@@ -1,8 +1,8 @@
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, MagicMock
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
-from app.main import app
-from app.routers.stats_router import router, get_service
+from app.main import app as main_app
+from app.routers.stats_router import router, get_service, get_export_service
 
 app = FastAPI()
 app.include_router(router)
@@ -49,3 +49,127 @@ def test_export_csv():
     response = client.get("/stats/export/csv")
     assert response.status_code == 200
     assert response.headers["content-type"] == "text/csv; charset=utf-8"
+
+def test_get_statistics_fresh():
+    mock_service = AsyncMock()
+    mock_service.get_global_stats.return_value = {
+        "total_books": 1,
+        "total_authors": 1,
+        "active_loans": 0,
+        "total_loans": 0,
+        "late_loans": 0,
+        "occupancy_rate": 0.0
+    }
+    app.dependency_overrides[get_service] = lambda: mock_service
+
+    response = client.get("/stats/", params={"fresh": "true"})
+    assert response.status_code == 200
+    mock_service.get_global_stats.assert_awaited_once_with(fresh=True)
+
+def test_get_leaderboard():
+    mock_service = AsyncMock()
+    mock_service.get_leaderboard.return_value = [
+        {"rank": 1, "id": 3, "name": "Germinal", "loans": 12}
+    ]
+    app.dependency_overrides[get_service] = lambda: mock_service
+
+    response = client.get("/stats/leaderboard/books", params={"window": "7d"})
+    assert response.status_code == 200
+    assert response.json()[0]["name"] == "Germinal"
+    mock_service.get_leaderboard.assert_awaited_once_with("books", "7d", 10)
+
+def test_get_leaderboard_invalid_window():
+    app.dependency_overrides[get_service] = lambda: AsyncMock()
+
+    response = client.get("/stats/leaderboard/authors", params={"window": "1y"})
+    assert response.status_code == 422
+
+def test_export_table_ndjson_gzip():
+    async def stream_table(table, fmt, compress):
+        yield b"chunk"
+
+    mock_service = MagicMock()
+    mock_service.stream_table.side_effect = stream_table
+    app.dependency_overrides[get_export_service] = lambda: mock_service
+
+    response = client.get("/stats/export/loans", params={"format": "ndjson", "gzip": "true"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/gzip"
+    assert "loans.ndjson.gz" in response.headers["content-disposition"]
+    mock_service.stream_table.assert_called_once_with("loans", "ndjson", True)
+
+def test_get_sweeper_metrics():
+    response = client.get("/stats/sweeper")
+    assert response.status_code == 200
+    assert {"runs", "rows_updated", "last_duration_ms"} <= response.json().keys()
+
+def test_get_fines_report():
+    mock_service = AsyncMock()
+    mock_service.get_fines_report.return_value = {
+        "late_loans": 1,
+        "total_fines": 1.5,
+        "outstanding_fines": 1.5,
+        "by_borrower": [{
+            "borrower_mail": "test@example.com", "borrower_name": "Test User",
+            "late_loans": 1, "total_fines": 1.5, "outstanding_fines": 1.5
+        }],
+        "by_month": [{"month": "2025-01", "late_loans": 1, "total_fines": 1.5, "outstanding_fines": 1.5}]
+    }
+    app.dependency_overrides[get_service] = lambda: mock_service
+
+    response = client.get("/stats/reports/fines", params={"limit": 10})
+    assert response.status_code == 200
+    assert response.json()["by_borrower"][0]["total_fines"] == 1.5
+    mock_service.get_fines_report.assert_awaited_once_with(10)
+
+def test_get_cache_metrics():
+    response = client.get("/stats/cache")
+    assert response.status_code == 200
+    assert {"responses", "identities"} <= response.json().keys()
+
+def test_get_monthly_report_range():
+    mock_service = AsyncMock()
+    mock_service.get_monthly_report.return_value = [
+        {"month": "2024-01", "new_books": 1, "new_users": 2, "total_loans": 3, "returned_loans": 1}
+    ]
+    app.dependency_overrides[get_service] = lambda: mock_service
+
+    response = client.get("/stats/reports/monthly", params={"from": "2024-01", "to": "2024-01"})
+    assert response.status_code == 200
+    assert response.json()[0]["new_users"] == 2
+    mock_service.get_monthly_report.assert_awaited_once_with("2024-01", "2024-01")
+
+    mock_service.get_monthly_report.side_effect = ValueError("The end month is before the start month")
+    response = client.get("/stats/reports/monthly", params={"from": "2024-02", "to": "2024-01"})
+    assert response.status_code == 400
+    assert client.get("/stats/reports/monthly", params={"from": "2024-13", "to": "2024-01"}).status_code == 422
+
+def test_stats_router_is_mounted():
+    assert "/api/v1/stats/reports/monthly" in {route.path for route in main_app.routes}
+
+def test_get_never_borrowed_books_page():
+    mock_service = AsyncMock()
+    mock_service.get_never_borrowed_books.return_value = (
+        [{"book_id": 3, "title": "Book 3", "added_date": "2024-03-01T00:00:00"}], "abc"
+    )
+    app.dependency_overrides[get_service] = lambda: mock_service
+
+    response = client.get("/stats/reports/never-borrowed", params={"page_size": 1})
+    assert response.status_code == 200
+    assert response.json()["next_cursor"] == "abc"
+    mock_service.get_never_borrowed_books.assert_awaited_once_with(1, None)
+
+def test_get_borrower_activity():
+    mock_service = AsyncMock()
+    mock_service.get_borrower_activity_for.return_value = {
+        "borrower_mail": "test@example.com", "full_name": "Test User",
+        "total_loans": 3, "current_loans": 1, "late_returns": 1
+    }
+    app.dependency_overrides[get_service] = lambda: mock_service
+
+    response = client.get("/stats/borrowers/test@example.com")
+    assert response.status_code == 200
+    assert response.json()["late_returns"] == 1
+
+    mock_service.get_borrower_activity_for.return_value = None
+    assert client.get("/stats/borrowers/nobody@example.com").status_code == 404
@@ -0,0 +1,113 @@
+import asyncio
+
+from app.data.orm import Book, LibraryStats
+from app.routers.book_router import router as book_router
+from app.routers.loan_router import router as loan_router
+from app.routers.stats_router import router as stats_router
+from app.services.book_service import BookService
+from app.services.stats_snapshot import refresh_snapshot
+from tests.factories import make_author
+
+SNAPSHOT_FIELDS = (
+    "total_books", "total_copies", "available_copies", "total_authors",
+    "total_loans", "active_loans",
+)
+
+
+def _book(isbn: str, copies: int) -> dict:
+    return {
+        "title": f"Book {isbn}",
+        "isbn": isbn,
+        "year": 1885,
+        "author_id": 1,
+        "available_copies": copies,
+        "total_copies_owned": copies,
+        "category": "Fiction",
+        "language": "FR",
+        "pages": 100,
+        "publisher": "Charpentier",
+    }
+
+
+def test_snapshot_follows_writes(database):
+    database.seed(make_author())
+
+    async def scenario():
+        async with database.connect() as session_factory:
+            steps = {}
+
+            async def check(step):
+                """Compare the maintained snapshot with a recomputation from the tables."""
+                stats = (await client.get("/stats/")).json()
+                async with session_factory() as session:
+                    stored = await session.get(LibraryStats, 1)
+                    maintained = {name: getattr(stored, name) for name in SNAPSHOT_FIELDS}
+                    recomputed = await refresh_snapshot(session)
+                    await session.commit()
+                fresh = (await client.get("/stats/", params={"fresh": True})).json()
+                steps[step] = (
+                    maintained == {name: recomputed[name] for name in SNAPSHOT_FIELDS}
+                    and stats == fresh
+                )
+
+            async with database.async_client(
+                session_factory, book_router, loan_router, stats_router
+            ) as client:
+                # Builds the snapshot
+                await client.get("/stats/")
+                first = (await client.post("/books/", json=_book("9780000000001", 3))).json()
+                second = (await client.post("/books/", json=_book("9780000000002", 2))).json()
+                await check("create")
+
+                response = await client.patch(
+                    f"/books/{first['id']}", json={"total_copies_owned": 5, "available_copies": 4}
+                )
+                assert response.status_code == 200
+                await check("update")
+
+                loan = (
+                    await client.post(
+                        "/loans/",
+                        json={
+                            "book_id": first["id"],
+                            "borrower_name": "ann",
+                            "borrower_mail": "ann@example.com",
+                            "card_number": "123456",
+                        },
+                    )
+                ).json()
+                await check("checkout")
+
+                response = await client.post(f"/loans/{loan['id']}/return", json={})
+                assert response.status_code == 200
+                await check("return")
+
+                assert (await client.delete(f"/books/{second['id']}")).status_code == 200
+                await check("delete")
+
+                # Entities not loaded by the updating session: old values are read back
+                async with session_factory() as session:
+                    detached = await session.get(Book, first["id"])
+                async with session_factory() as session:
+                    detached.total_copies_owned = 8
+                    detached.available_copies = 7
+                    await BookService(session).update(detached)
+                await check("detached update")
+
+                columns = [column.key for column in Book.__table__.columns]
+                rebuilt = Book(**{name: getattr(detached, name) for name in columns})
+                rebuilt.total_copies_owned = 6
+                rebuilt.available_copies = 6
+                async with session_factory() as session:
+                    # Merged without history, as built from a request payload
+                    await BookService(session).update(rebuilt)
+                await check("merged update")
+            return steps
+
+    steps = asyncio.run(scenario())
+    assert steps == {
+        step: True
+        for step in (
+            "create", "update", "checkout", "return", "delete", "detached update", "merged update"
+        )
+    }